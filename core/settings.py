@@ -194,6 +194,13 @@ CACHES = {
         'OPTIONS': {
             'MAX_ENTRIES': 1000  # Máximo de objetos en caché
         }
+    },
+    # Caché compartida entre workers (token SCADA, candados de refresco)
+    'scada': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/{os.getenv('REDIS_DB', '0')}",
+        'KEY_PREFIX': 'sivet',
+        'TIMEOUT': None,
     }
 }
 
@@ -217,6 +224,65 @@ CELERY_RESULT_EXTENDED = True
 # Usar el programador basado en base de datos
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# ========================= Ingesta SCADA =========================
+
+# Escribe cada página de mediciones con un único INSERT ... ON CONFLICT
+SCADA_BULK_INGEST = os.getenv('SCADA_BULK_INGEST', 'True').lower() == 'true'
+
+# Solape aplicado al cursor de ingesta de cada dispositivo para recoger datos tardíos
+SCADA_INGEST_CURSOR_OVERLAP_MINUTES = int(os.getenv('SCADA_INGEST_CURSOR_OVERLAP_MINUTES', 10))
+
+# Máximo hacia atrás que se recupera automáticamente tras ejecuciones perdidas
+SCADA_INGEST_MAX_CATCHUP_DAYS = int(os.getenv('SCADA_INGEST_MAX_CATCHUP_DAYS', 7))
+
+# Descargas simultáneas de la ingesta concurrente (no debe superar SCADA_POOL_SIZE)
+SCADA_INGEST_CONCURRENCY = int(os.getenv('SCADA_INGEST_CONCURRENCY', 8))
+
+# Páginas que se descargan por adelantado mientras se guarda la actual (0 = secuencial)
+SCADA_INGEST_PREFETCH_PAGES = int(os.getenv('SCADA_INGEST_PREFETCH_PAGES', 2))
+
+# Los rangos largos se descargan en ventanas de estas horas, paginando dentro de cada una
+SCADA_INGEST_WINDOW_HOURS = int(os.getenv('SCADA_INGEST_WINDOW_HOURS', 24))
+
+# Particionado mensual de mediciones: meses futuros a crear y retención (0 = sin retención)
+SCADA_MEASUREMENT_PARTITION_MONTHS_AHEAD = int(os.getenv('SCADA_MEASUREMENT_PARTITION_MONTHS_AHEAD', 3))
+SCADA_MEASUREMENT_RETENTION_MONTHS = int(os.getenv('SCADA_MEASUREMENT_RETENTION_MONTHS', 0))
+SCADA_MEASUREMENT_RETENTION_DROP = os.getenv('SCADA_MEASUREMENT_RETENTION_DROP', 'False').lower() == 'true'
+
+# Rollups de 15 min / 1 h / 1 día: se mantienen al ingerir; la lectura se activa
+# con SCADA_ROLLUPS_READ una vez reconstruido el histórico (rebuild_measurement_rollups).
+# Requieren PostgreSQL 14 o superior (date_bin); con uno anterior quedan desactivados
+SCADA_ROLLUPS_ENABLED = os.getenv('SCADA_ROLLUPS_ENABLED', 'True').lower() == 'true'
+SCADA_ROLLUPS_READ = os.getenv('SCADA_ROLLUPS_READ', 'False').lower() == 'true'
+
+# Bloques diarios empaquetados (una fila por dispositivo y día con arreglos comprimidos).
+# Son una caché de lectura junto a las mediciones crudas: ocupan espacio adicional.
+SCADA_DAY_BLOCKS_ENABLED = os.getenv('SCADA_DAY_BLOCKS_ENABLED', 'False').lower() == 'true'
+# Días cerrados que la tarea nocturna revisa en busca de bloques faltantes o desactualizados
+SCADA_DAY_BLOCKS_LOOKBACK_DAYS = int(os.getenv('SCADA_DAY_BLOCKS_LOOKBACK_DAYS', 7))
+
+# Archivo frío: meses que se conservan en la base de datos (incluido el actual; 0 = no archivar).
+# Los anteriores se exportan a SCADA_ARCHIVE_ROOT y se eliminan de la tabla de mediciones.
+SCADA_ARCHIVE_KEEP_MONTHS = int(os.getenv('SCADA_ARCHIVE_KEEP_MONTHS', 0))
+SCADA_ARCHIVE_ROOT = os.getenv('SCADA_ARCHIVE_ROOT', os.path.join(BASE_DIR, 'archive', 'measurements'))
+# True: un .npz comprimido por mes (menos disco, sin mmap); False: .npy legibles con mmap
+SCADA_ARCHIVE_COMPRESS = os.getenv('SCADA_ARCHIVE_COMPRESS', 'False').lower() == 'true'
+
+# Un dispositivo se considera en línea si su última medición (DeviceLatestState) tiene menos de estos minutos
+SCADA_DEVICE_ONLINE_MINUTES = int(os.getenv('SCADA_DEVICE_ONLINE_MINUTES', 90))
+
+# Cobertura diaria (mapa de 720 intervalos de 2 min): los recálculos saltan días vacíos
+# con SCADA_COVERAGE_READ, tras reconstruirla con `measurement_coverage --rebuild`
+SCADA_COVERAGE_READ = os.getenv('SCADA_COVERAGE_READ', 'False').lower() == 'true'
+# Recuperación de huecos: días revisados, hueco mínimo y máximo de ventanas por dispositivo
+SCADA_GAP_BACKFILL_DAYS = int(os.getenv('SCADA_GAP_BACKFILL_DAYS', 2))
+SCADA_GAP_MIN_MINUTES = int(os.getenv('SCADA_GAP_MIN_MINUTES', 10))
+SCADA_GAP_MAX_WINDOWS = int(os.getenv('SCADA_GAP_MAX_WINDOWS', 12))
+
+# Indicadores: motores vectorizados (NumPy) sobre series columnares en lugar
+# del recorrido fila a fila de las mediciones
+INDICATORS_ARRAY_ENGINE = os.getenv('INDICATORS_ARRAY_ENGINE', 'True').lower() == 'true'
+
 # ========================= Tareas Periódicas =========================
 
 CELERY_BEAT_SCHEDULE = {
@@ -227,9 +293,32 @@ CELERY_BEAT_SCHEDULE = {
     },
     'fetch-historical-measurements-hourly': {
         # Busca mediciones históricas cada hora al inicio del minuto 0.
+        # Cada dispositivo se consulta desde su cursor de ingesta; los que aún
+        # no tienen cursor usan las últimas 2 horas.
         'task': 'scada_proxy.tasks.fetch_historical_measurements_for_all_devices',
         'schedule': crontab(minute=0),
         'args': (int(timedelta(hours=2).total_seconds()),),  # Últimas 2 horas
+        'kwargs': {'use_cursors': True},
+    },
+    'maintain-measurement-partitions-daily': {
+        # Crea las particiones mensuales futuras y aplica la retención configurada.
+        'task': 'scada_proxy.tasks.maintain_measurement_partitions',
+        'schedule': crontab(minute=15, hour=1),
+    },
+    'pack-measurement-day-blocks-daily': {
+        # Empaqueta los días cerrados en bloques por dispositivo (si SCADA_DAY_BLOCKS_ENABLED).
+        'task': 'scada_proxy.tasks.pack_measurement_day_blocks',
+        'schedule': crontab(minute=30, hour=1),
+    },
+    'archive-old-measurements-daily': {
+        # Exporta a disco los meses anteriores a SCADA_ARCHIVE_KEEP_MONTHS (si está definido).
+        'task': 'scada_proxy.tasks.archive_old_measurements',
+        'schedule': crontab(minute=45, hour=1),
+    },
+    'backfill-measurement-gaps': {
+        # Vuelve a pedir a SCADA los intervalos sin mediciones de los últimos días.
+        'task': 'scada_proxy.tasks.backfill_measurement_gaps',
+        'schedule': crontab(minute=30, hour='*/6'),
     },
     'calculate-monthly-consumption-kpi-daily': {
         # Calcula el KPI de consumo mensualmente diariamente a las 3:30 AM.
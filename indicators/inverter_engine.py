@@ -0,0 +1,172 @@
+"""
+Motor vectorizado de los indicadores de inversores (InverterIndicators e
+InverterChartData).
+
+Una sola carga columnar (scada_proxy.blocks.load_series con INVERTER_KEYS)
+alimenta los indicadores del periodo y los 24 intervalos horarios del gráfico.
+Las fórmulas son las de calculate_inverter_indicators, con dos diferencias:
+
+- las energías (AC, DC e irradiancia acumulada) se integran con el trapecio
+  sobre las marcas de tiempo reales (kernels.integrate) en lugar de suponer
+  una medición cada 2 minutos; los huecos de más de MAX_GAP_SECONDS no se
+  integran;
+- las horas del gráfico son horas locales (Colombia), y la generación
+  horaria es la energía de esa hora (promedio por día en los meses).
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .electric_engine import max_phase_unbalance
+from .kernels import MAX_GAP_SECONDS, bin_mean, bin_sum, interval_areas, local_hour, local_seconds
+
+# Variables del JSON que necesita el motor
+INVERTER_KEYS = [
+    'acPower', 'dcPower', 'reactivePower', 'apparentPower', 'powerFactor', 'acFrequency',
+    'acVoltagePhaseA', 'acVoltagePhaseB', 'acVoltagePhaseC',
+    'acCurrentPhaseA', 'acCurrentPhaseB', 'acCurrentPhaseC',
+    'irradiance', 'temperature',
+]
+
+# Potencia nominal estimada del sistema FV (no viene en los datos de SCADA)
+PNOM_PV_KW = 50.0
+
+
+def _mean(values):
+    valid = values[~np.isnan(values)]
+    return float(valid.mean()) if len(valid) else 0
+
+
+def _extreme(values, reducer):
+    valid = values[~np.isnan(values)]
+    return float(reducer(valid)) if len(valid) else 0
+
+
+def frequency_stability(frequency):
+    """100 - coeficiente de variación (%) de la frecuencia; 0 con menos de dos muestras."""
+    valid = frequency[~np.isnan(frequency)]
+    if len(valid) < 2:
+        return 0
+    average = valid.mean()
+    if average <= 0:
+        return 0
+    return float(max(0, 100 - (valid.std(ddof=1) / average * 100)))
+
+
+def anomaly_analysis(dc_ac_efficiency_pct, max_voltage_unbalance_pct, max_current_unbalance_pct,
+                     frequency_stability_pct):
+    """Puntuación (0-100) y detalle de las anomalías operativas por umbrales."""
+    anomaly_score = 0
+    anomaly_details = {}
+
+    if dc_ac_efficiency_pct < 80:  # Eficiencia muy baja
+        anomaly_score += 20
+        anomaly_details['low_efficiency'] = f"Eficiencia DC-AC muy baja: {dc_ac_efficiency_pct:.1f}%"
+
+    if max_voltage_unbalance_pct > 5:  # Desbalance de tensión alto
+        anomaly_score += 15
+        anomaly_details['voltage_unbalance'] = f"Desbalance de tensión alto: {max_voltage_unbalance_pct:.1f}%"
+
+    if max_current_unbalance_pct > 10:  # Desbalance de corriente alto
+        anomaly_score += 15
+        anomaly_details['current_unbalance'] = f"Desbalance de corriente alto: {max_current_unbalance_pct:.1f}%"
+
+    if frequency_stability_pct < 90:  # Inestabilidad de frecuencia
+        anomaly_score += 10
+        anomaly_details['frequency_instability'] = f"Baja estabilidad de frecuencia: {frequency_stability_pct:.1f}%"
+
+    return min(100, anomaly_score), anomaly_details
+
+
+def hourly_chart_data(series, ac_areas):
+    """Datos horarios (24 intervalos, hora local) de InverterChartData."""
+    hours = local_hour(series.timestamps)
+    days = max(1, len(np.unique(local_seconds(series.timestamps) // 86400)))
+
+    ac_power = np.nan_to_num(bin_mean(hours, series.get('acPower'), 24))
+    dc_power = np.nan_to_num(bin_mean(hours, series.get('dcPower'), 24))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efficiency = np.where(dc_power > 0, ac_power / dc_power * 100, 0.0)
+    # Energía de cada intervalo asignada a la hora en que empieza (W·h -> kWh)
+    generation = bin_sum(hours[:-1], ac_areas, 24) / 1000 / days if len(ac_areas) else np.zeros(24)
+
+    return {
+        'hourly_efficiency': efficiency.tolist(),
+        'hourly_generation': generation.tolist(),
+        'hourly_irradiance': np.nan_to_num(bin_mean(hours, series.get('irradiance'), 24)).tolist(),
+        'hourly_temperature': np.nan_to_num(bin_mean(hours, series.get('temperature'), 24)).tolist(),
+        'hourly_dc_power': dc_power.tolist(),
+        'hourly_ac_power': ac_power.tolist(),
+    }
+
+
+def compute_inverter_indicators(series):
+    """
+    Indicadores del periodo y datos horarios a partir de una serie no vacía.
+
+    Returns:
+        Tupla (defaults de InverterIndicators, defaults de InverterChartData)
+    """
+    timestamps = series.timestamps
+    ac_power = series.get('acPower')
+    dc_power = series.get('dcPower')
+    irradiance = series.get('irradiance')
+    ac_areas = interval_areas(timestamps, ac_power, MAX_GAP_SECONDS)
+
+    # 4.1. Eficiencia de Conversión DC-AC (W·h -> kWh)
+    energy_ac_daily_kwh = float(ac_areas.sum()) / 1000
+    energy_dc_daily_kwh = float(interval_areas(timestamps, dc_power, MAX_GAP_SECONDS).sum()) / 1000
+    if energy_dc_daily_kwh > 0:
+        dc_ac_efficiency_pct = (energy_ac_daily_kwh / energy_dc_daily_kwh) * 100
+    else:
+        dc_ac_efficiency_pct = 0
+
+    # 4.2. Energía Total Generada
+    total_generated_energy_kwh = energy_ac_daily_kwh
+
+    # 4.3. Performance Ratio (PR)
+    irradiance_accumulated = float(interval_areas(timestamps, irradiance, MAX_GAP_SECONDS).sum()) / 1000  # kWh/m²
+    reference_energy_kwh = irradiance_accumulated * PNOM_PV_KW
+    if reference_energy_kwh > 0:
+        performance_ratio_pct = (total_generated_energy_kwh / reference_energy_kwh) * 100
+    else:
+        performance_ratio_pct = 0
+
+    # 4.5. Factor de Potencia y Calidad de Inyección
+    frequency_stability_pct = frequency_stability(series.get('acFrequency'))
+
+    # 4.6. Desbalance de Fases en Inyección
+    max_voltage_unbalance_pct = max_phase_unbalance(series, ['acVoltagePhaseA', 'acVoltagePhaseB', 'acVoltagePhaseC'])
+    max_current_unbalance_pct = max_phase_unbalance(series, ['acCurrentPhaseA', 'acCurrentPhaseB', 'acCurrentPhaseC'])
+
+    # 4.7. Análisis de Anomalías Operativas
+    anomaly_score, anomaly_details = anomaly_analysis(
+        dc_ac_efficiency_pct, max_voltage_unbalance_pct, max_current_unbalance_pct, frequency_stability_pct
+    )
+
+    indicators = {
+        'dc_ac_efficiency_pct': dc_ac_efficiency_pct,
+        'energy_ac_daily_kwh': energy_ac_daily_kwh,
+        'energy_dc_daily_kwh': energy_dc_daily_kwh,
+        'total_generated_energy_kwh': total_generated_energy_kwh,
+        'performance_ratio_pct': performance_ratio_pct,
+        'reference_energy_kwh': reference_energy_kwh,
+        # 4.4. Curva de Generación vs. Irradiancia/Temperatura
+        'avg_irradiance_wm2': _mean(irradiance),
+        'avg_temperature_c': _mean(series.get('temperature')),
+        'max_power_w': _extreme(ac_power, np.max),
+        'min_power_w': _extreme(ac_power, np.min),
+        'avg_power_factor_pct': _mean(series.get('powerFactor')),
+        'avg_reactive_power_var': _mean(series.get('reactivePower')),
+        'avg_apparent_power_va': _mean(series.get('apparentPower')),
+        'avg_frequency_hz': _mean(series.get('acFrequency')),
+        'frequency_stability_pct': frequency_stability_pct,
+        'max_voltage_unbalance_pct': max_voltage_unbalance_pct,
+        'max_current_unbalance_pct': max_current_unbalance_pct,
+        'anomaly_score': anomaly_score,
+        'anomaly_details': anomaly_details,
+        'measurement_count': len(series),
+        'last_measurement_date': datetime.fromtimestamp(int(timestamps[-1]), tz=timezone.utc),
+    }
+    return indicators, hourly_chart_data(series, ac_areas)
@@ -0,0 +1,187 @@
+"""
+Núcleos vectorizados compartidos por los motores de indicadores.
+
+Las mediciones de SCADA llegan cada 2 minutos, pero no siempre: hay huecos y
+cambios de cadencia. Estos núcleos trabajan sobre las marcas de tiempo reales
+(segundos epoch, int64, ordenadas, como DaySeries.timestamps) en lugar de
+suponer un número fijo de muestras:
+
+- rolling_mean: promedios en ventanas de tiempo (searchsorted + sumas acumuladas);
+- interval_areas / integrate: integración trapezoidal (p. ej. kW -> kWh)
+  sin cruzar huecos; las áreas por intervalo se pueden agrupar con bin_sum;
+- bin_index / bin_mean / bin_last / bin_count / resample: remuestreo a
+  intervalos fijos (horas locales, intervalos de 15 minutos...) con bincount.
+
+Los valores NaN se tratan como ausentes. El rendimiento se mide con
+tests/benchmark_kernels.py.
+"""
+
+import numpy as np
+
+# Cadencia nominal de SCADA
+SAMPLE_SECONDS = 120
+
+# Colombia no tiene horario de verano: UTC-5 todo el año
+COLOMBIA_UTC_OFFSET_SECONDS = -5 * 3600
+
+# Intervalos sin mediciones más largos que esto no se integran en los motores
+MAX_GAP_SECONDS = 10 * 60
+
+
+def drop_nan(timestamps, values):
+    """Marcas de tiempo y valores sin las muestras NaN."""
+    valid = ~np.isnan(values)
+    return timestamps[valid], values[valid]
+
+
+def rolling_mean(timestamps, values, window_seconds, sample_seconds=SAMPLE_SECONDS):
+    """
+    Promedio de cada ventana de tiempo [t_i, t_i + window_seconds).
+
+    Cada muestra representa `sample_seconds` desde su marca de tiempo y entra
+    en la ventana si ese intervalo cabe completo; con la cadencia nominal una
+    ventana de 15 minutos tiene 7 muestras. Solo se devuelven las ventanas
+    completas: los datos llegan hasta la posición de su última muestra
+    nominal y a la ventana le falta como mucho una muestra (al final o en
+    medio). Así una ventana junto a un hueco, o con un hueco dentro, no se
+    queda con dos o tres muestras, y los huecos no juntan en una ventana
+    muestras alejadas.
+
+    Returns:
+        Arreglo con el promedio de cada ventana completa (vacío si no hay ninguna)
+    """
+    timestamps, values = drop_nan(timestamps, values)
+    if not len(values):
+        return np.empty(0)
+    span = window_seconds - sample_seconds
+    nominal_samples = window_seconds // sample_seconds
+    last_offset = (nominal_samples - 1) * sample_seconds
+    ends = np.searchsorted(timestamps, timestamps + span, side='right')
+    starts = np.arange(len(timestamps))
+    full = (
+        (timestamps + last_offset <= timestamps[-1])
+        & (timestamps[ends - 1] >= timestamps + last_offset - sample_seconds)
+        & (ends - starts >= nominal_samples - 1)
+    )
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    starts, ends = starts[full], ends[full]
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def peak_rolling_mean(timestamps, values, window_seconds, sample_seconds=SAMPLE_SECONDS):
+    """Máximo de rolling_mean; el máximo simple si no hay ninguna ventana completa."""
+    means = rolling_mean(timestamps, values, window_seconds, sample_seconds)
+    if len(means):
+        return float(means.max())
+    valid = values[~np.isnan(values)]
+    return float(valid.max()) if len(valid) else 0.0
+
+
+def interval_areas(timestamps, values, max_gap_seconds=None):
+    """
+    Área trapezoidal (en horas) de cada intervalo entre muestras consecutivas.
+    Vale 0 en los intervalos con un extremo NaN y, si se indica
+    max_gap_seconds, en los de más de max_gap_seconds (huecos en los datos).
+    """
+    if len(values) < 2:
+        return np.empty(0)
+    dt = np.diff(timestamps).astype(np.float64)
+    areas = (values[1:] + values[:-1]) * 0.5 * dt / 3600.0
+    invalid = np.isnan(areas)
+    if max_gap_seconds is not None:
+        invalid |= dt > max_gap_seconds
+    areas[invalid] = 0.0
+    return areas
+
+
+def integrate(timestamps, values, max_gap_seconds=None):
+    """Integral trapezoidal de `values` en horas (kW -> kWh, W/m² -> Wh/m²)."""
+    return float(interval_areas(timestamps, values, max_gap_seconds).sum())
+
+
+def cumulative_integral(timestamps, values, max_gap_seconds=None):
+    """Integral trapezoidal acumulada (en horas) hasta cada muestra; empieza en 0."""
+    if not len(values):
+        return np.empty(0)
+    return np.concatenate(([0.0], np.cumsum(interval_areas(timestamps, values, max_gap_seconds))))
+
+
+def local_seconds(timestamps, utc_offset_seconds=COLOMBIA_UTC_OFFSET_SECONDS):
+    """Segundos epoch desplazados a hora local (para agrupar por hora/día local)."""
+    return timestamps + utc_offset_seconds
+
+
+def bin_index(timestamps, bin_seconds, origin=0):
+    """Índice del intervalo fijo de cada muestra: (t - origin) // bin_seconds."""
+    return (timestamps - origin) // bin_seconds
+
+
+def local_hour(timestamps, utc_offset_seconds=COLOMBIA_UTC_OFFSET_SECONDS):
+    """Hora local (0-23) de cada muestra."""
+    return (local_seconds(timestamps, utc_offset_seconds) // 3600) % 24
+
+
+def bin_count(bins, size, values=None):
+    """Número de muestras (no NaN si se dan `values`) por intervalo."""
+    if values is not None:
+        bins = bins[~np.isnan(values)]
+    return np.bincount(bins, minlength=size)[:size]
+
+
+def bin_sum(bins, values, size):
+    """Suma de los valores no NaN por intervalo (0 en los vacíos)."""
+    valid = ~np.isnan(values)
+    return np.bincount(bins[valid], weights=values[valid], minlength=size)[:size]
+
+
+def bin_mean(bins, values, size):
+    """Promedio de los valores no NaN por intervalo (NaN en los vacíos)."""
+    counts = bin_count(bins, size, values)
+    sums = bin_sum(bins, values, size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def bin_extreme(bins, values, size, reducer=np.maximum):
+    """Máximo (o mínimo con reducer=np.minimum) por intervalo (NaN en los vacíos)."""
+    valid = ~np.isnan(values)
+    initial = -np.inf if reducer is np.maximum else np.inf
+    result = np.full(size, initial)
+    reducer.at(result, bins[valid], values[valid])
+    result[np.isinf(result)] = np.nan
+    return result
+
+
+def bin_last(bins, values, size):
+    """Último valor no NaN de cada intervalo (las muestras deben estar ordenadas)."""
+    valid = ~np.isnan(values)
+    bins, values = bins[valid], values[valid]
+    result = np.full(size, np.nan)
+    # Primera aparición de cada intervalo recorriendo al revés = su última muestra
+    unique, reversed_index = np.unique(bins[::-1], return_index=True)
+    result[unique] = values[len(values) - 1 - reversed_index]
+    return result
+
+
+_BIN_REDUCERS = {
+    'mean': bin_mean,
+    'sum': lambda bins, values, size: bin_sum(bins, values, size),
+    'last': bin_last,
+    'max': lambda bins, values, size: bin_extreme(bins, values, size, np.maximum),
+    'min': lambda bins, values, size: bin_extreme(bins, values, size, np.minimum),
+}
+
+
+def resample(timestamps, values, bin_seconds, start, end, how='mean'):
+    """
+    Remuestrea a intervalos fijos de bin_seconds entre start y end (epoch,
+    end exclusivo). `how`: mean, sum, last, max o min.
+
+    Returns:
+        Tupla (inicio de cada intervalo en epoch, valor de cada intervalo; NaN si vacío)
+    """
+    size = max(0, -(-(end - start) // bin_seconds))
+    inside = (timestamps >= start) & (timestamps < end)
+    bins = bin_index(timestamps[inside], bin_seconds, origin=start)
+    starts = start + np.arange(size, dtype=np.int64) * bin_seconds
+    return starts, _BIN_REDUCERS[how](bins, values[inside], size)
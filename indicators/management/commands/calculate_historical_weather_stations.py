@@ -9,6 +9,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import pytz
 from indicators.tasks import calculate_weather_station_indicators
+from scada_proxy.archive import archives_for_days
 
 class Command(BaseCommand):
     help = 'Calcula indicadores históricos de estaciones meteorológicas para un rango de fechas específico'
@@ -93,6 +94,17 @@ class Command(BaseCommand):
                     self.style.WARNING('⚠️ La fecha de inicio es en el futuro. ¿Estás seguro?')
                 )
 
+            # Los meses archivados en disco no están en la tabla de mediciones
+            archived = archives_for_days(start_date, end_date, device_id)
+            if archived.exists():
+                months = sorted({f'{archive.month:%Y-%m}' for archive in archived})
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'⚠️  Hay meses archivados en el período ({", ".join(months)}); '
+                        f'restáurelos antes con: python manage.py archive_measurements --restore YYYY-MM'
+                    )
+                )
+
             # Calcular en lotes para evitar sobrecarga
             current_date = start_date
             total_batches = 0
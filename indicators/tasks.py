@@ -1,7 +1,6 @@
 from celery import shared_task
 from datetime import datetime, timedelta, timezone
-from django.db.models import Sum, Avg, F, FloatField, Max, Count, Min, Q, QuerySet
-from django.db.models.functions import Cast, TruncDay
+from django.db.models import Sum, Avg, F, Max, Count, Min, Q, QuerySet
 import logging
 import calendar
 from django.utils import timezone as django_timezone
@@ -12,7 +11,14 @@ import os
 import tempfile
 import csv
 
-from scada_proxy.models import Measurement, Device, Institution, DeviceCategory, TaskProgress
+from scada_proxy.models import Measurement, Device, Institution, DeviceCategory, TaskProgress, MEASUREMENT_TYPED_FIELDS
+from scada_proxy.rollups import daily_summary, range_totals, rollups_readable
+from scada_proxy.coverage import covered_days
+from scada_proxy.blocks import load_series
+from django.conf import settings
+from .electric_engine import ELECTRIC_METER_KEYS, compute_electric_meter_indicators
+from .inverter_engine import INVERTER_KEYS, compute_inverter_indicators
+from .weather_engine import WEATHER_KEYS, compute_monthly_weather_indicators, compute_weather_indicators
 from .models import (
     ElectricMeterEnergyConsumption, 
     MonthlyConsumptionKPI, 
@@ -39,6 +45,62 @@ def get_colombia_date():
     """Obtiene la fecha actual en zona horaria de Colombia"""
     return get_colombia_now().date()
 
+def _array_engine_enabled():
+    """Calcular los indicadores con los motores vectorizados (INDICATORS_ARRAY_ENGINE)."""
+    return getattr(settings, 'INDICATORS_ARRAY_ENGINE', True)
+
+def _local_day_bounds(first_day, last_day):
+    """[medianoche de first_day, medianoche del día siguiente a last_day) en hora Colombia"""
+    start = COLOMBIA_TZ.localize(datetime.combine(first_day, datetime.min.time()))
+    end = COLOMBIA_TZ.localize(datetime.combine(last_day + timedelta(days=1), datetime.min.time()))
+    return start, end
+
+def _variable_daily_totals(devices, column, first_day, last_day):
+    """
+    Suma y número de muestras por día (hora Colombia) de una variable tipada
+    para un conjunto de dispositivos. Lee los rollups diarios si están
+    habilitados (SCADA_ROLLUPS_READ); si no, agrega las mediciones crudas.
+    Devuelve una lista de tuplas (día, suma, conteo) con conteo > 0.
+    """
+    if rollups_readable():
+        start, end = _local_day_bounds(first_day, last_day)
+        device_ids = list(devices.values_list('id', flat=True))
+        return [
+            (row['date'], row['sum'], row['count'])
+            for row in daily_summary(device_ids, MEASUREMENT_TYPED_FIELDS[column], start, end, '1d')
+            if row['count']
+        ]
+
+    rows = Measurement.objects.for_local_days(first_day, last_day).filter(
+        device__in=devices,
+        **{f'{column}__isnull': False}
+    ).values('local_date').annotate(
+        total=Sum(F(column)),
+        count=Count('id')
+    ).order_by('local_date')
+    return [(row['local_date'], row['total'], row['count']) for row in rows]
+
+def _variable_totals(devices, column, first_day, last_day):
+    """Suma y número de muestras de una variable tipada en un rango de días (hora Colombia)."""
+    if rollups_readable():
+        start, end = _local_day_bounds(first_day, last_day)
+        device_ids = list(devices.values_list('id', flat=True))
+        return range_totals(device_ids, MEASUREMENT_TYPED_FIELDS[column], start, end, '1d')
+
+    totals = Measurement.objects.for_local_days(first_day, last_day).filter(
+        device__in=devices,
+        **{f'{column}__isnull': False}
+    ).aggregate(
+        total=Sum(F(column)),
+        count=Count('id')
+    )
+    return totals['total'] or 0.0, totals['count'] or 0
+
+def _variable_average(devices, column, first_day, last_day):
+    """Promedio de una variable tipada en un rango de días (0.0 si no hay datos)."""
+    total, count = _variable_totals(devices, column, first_day, last_day)
+    return total / count if count else 0.0
+
 @shared_task(bind=True, retry_backoff=60, max_retries=3)
 def calculate_monthly_consumption_kpi(self):
     """
@@ -90,63 +152,36 @@ def calculate_monthly_consumption_kpi(self):
         # --- Cálculo de Consumo Total (Medidores Eléctricos) ---
         logger.info("Calculando consumo total (medidores eléctricos)...")
         # Cambiar el cálculo de consumo para que sea consistente
-        current_month_consumption_sum = Measurement.objects.filter(
-            device__in=electric_meters,
-            date__date__range=(start_current_month, end_current_month),
-            data__totalActivePower__isnull=False
-        ).aggregate(
-            total_sum=Sum(Cast(F('data__totalActivePower'), FloatField()))
-        )['total_sum'] or 0.0
-
-        previous_month_consumption_sum = Measurement.objects.filter(
-            device__in=electric_meters,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__totalActivePower__isnull=False
-        ).aggregate(
-            total_sum=Sum(Cast(F('data__totalActivePower'), FloatField()))
-        )['total_sum'] or 0.0
+        current_month_consumption_sum, _ = _variable_totals(
+            electric_meters, 'total_active_power', start_current_month, end_current_month
+        )
+        previous_month_consumption_sum, _ = _variable_totals(
+            electric_meters, 'total_active_power', start_previous_month, end_previous_month
+        )
         logger.info(f"Consumo total - Mes actual: {current_month_consumption_sum:.2f} kWh, Mes anterior: {previous_month_consumption_sum:.2f} kWh")
 
         # --- Cálculo de Generación Total (Inversores) ---
         logger.info("Calculando generación total (inversores)...")
 
         # Cálculo para el mes actual
-        current_month_generation = Measurement.objects.filter(
-            device__in=inverters,
-            date__date__range=(start_current_month, end_current_month),
-            data__acPower__isnull=False
-        ).annotate(
-            day=TruncDay('date')
-        ).values('day').annotate(
-            total_power=Sum(Cast(F('data__acPower'), FloatField())),
-            measurements_count=Count('id')
-        ).order_by('day')
-
         current_month_generation_sum = 0
-        for day_data in current_month_generation:
+        for _, total_power, measurements_count in _variable_daily_totals(
+            inverters, 'ac_power', start_current_month, end_current_month
+        ):
             hours_in_day = 24
-            daily_energy_wh = (day_data['total_power'] / day_data['measurements_count']) * hours_in_day
+            daily_energy_wh = (total_power / measurements_count) * hours_in_day
             current_month_generation_sum += daily_energy_wh
 
         # Convertir a kWh
         current_month_generation_sum = current_month_generation_sum / 1000.0
 
         # Cálculo para el mes anterior
-        previous_month_generation = Measurement.objects.filter(
-            device__in=inverters,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__acPower__isnull=False
-        ).annotate(
-            day=TruncDay('date')
-        ).values('day').annotate(
-            total_power=Sum(Cast(F('data__acPower'), FloatField())),
-            measurements_count=Count('id')
-        ).order_by('day')
-
         previous_month_generation_sum = 0
-        for day_data in previous_month_generation:
+        for _, total_power, measurements_count in _variable_daily_totals(
+            inverters, 'ac_power', start_previous_month, end_previous_month
+        ):
             hours_in_day = 24
-            daily_energy_wh = (day_data['total_power'] / day_data['measurements_count']) * hours_in_day
+            daily_energy_wh = (total_power / measurements_count) * hours_in_day
             previous_month_generation_sum += daily_energy_wh
 
         # Convertir a kWh
@@ -156,97 +191,52 @@ def calculate_monthly_consumption_kpi(self):
 
         # --- Cálculo de Potencia Instantánea Promedio (Inversores) ---
         logger.info("Calculando potencia instantánea promedio (inversores)...")
-        avg_instantaneous_power_current = Measurement.objects.filter(
-            device__in=inverters,
-            date__date__range=(start_current_month, end_current_month),
-            data__acPower__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__acPower'), FloatField()))
-        )['avg_value'] or 0.0
-
-        avg_instantaneous_power_previous = Measurement.objects.filter(
-            device__in=inverters,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__acPower__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__acPower'), FloatField()))
-        )['avg_value'] or 0.0
+        avg_instantaneous_power_current = _variable_average(
+            inverters, 'ac_power', start_current_month, end_current_month
+        )
+        avg_instantaneous_power_previous = _variable_average(
+            inverters, 'ac_power', start_previous_month, end_previous_month
+        )
         logger.info(f"Potencia instantánea promedio - Mes actual: {avg_instantaneous_power_current:.2f} W, Mes anterior: {avg_instantaneous_power_previous:.2f} W")
 
         # --- Cálculo: Temperatura Promedio Diaria (Estaciones Meteorológicas) ---
         logger.info("Calculando temperatura promedio diaria (estaciones meteorológicas)...")
-        avg_daily_temp_current = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_current_month, end_current_month),
-            data__temperature__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__temperature'), FloatField()))
-        )['avg_value'] or 0.0
-
-        avg_daily_temp_previous = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__temperature__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__temperature'), FloatField()))
-        )['avg_value'] or 0.0
+        avg_daily_temp_current = _variable_average(
+            weather_stations, 'temperature', start_current_month, end_current_month
+        )
+        avg_daily_temp_previous = _variable_average(
+            weather_stations, 'temperature', start_previous_month, end_previous_month
+        )
         logger.info(f"Temperatura promedio diaria - Mes actual: {avg_daily_temp_current:.2f} °C, Mes anterior: {avg_daily_temp_previous:.2f} °C")
 
         # --- Cálculo: Humedad Relativa Promedio (Estaciones Meteorológicas) ---
         logger.info("Calculando humedad relativa promedio (estaciones meteorológicas)...")
-        avg_relative_humidity_current = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_current_month, end_current_month),
-            data__humidity__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__humidity'), FloatField()))
-        )['avg_value'] or 0.0
-
-        avg_relative_humidity_previous = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__humidity__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__humidity'), FloatField()))
-        )['avg_value'] or 0.0
+        avg_relative_humidity_current = _variable_average(
+            weather_stations, 'humidity', start_current_month, end_current_month
+        )
+        avg_relative_humidity_previous = _variable_average(
+            weather_stations, 'humidity', start_previous_month, end_previous_month
+        )
         logger.info(f"Humedad relativa promedio - Mes actual: {avg_relative_humidity_current:.2f} %RH, Mes anterior: {avg_relative_humidity_previous:.2f} %RH")
 
         # --- Cálculo: Velocidad del Viento Promedio (Estaciones Meteorológicas) ---
         logger.info("Calculando velocidad del viento promedio (estaciones meteorológicas)...")
-        avg_wind_speed_current = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_current_month, end_current_month),
-            data__windSpeed__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__windSpeed'), FloatField()))
-        )['avg_value'] or 0.0
-
-        avg_wind_speed_previous = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__windSpeed__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__windSpeed'), FloatField()))
-        )['avg_value'] or 0.0
+        avg_wind_speed_current = _variable_average(
+            weather_stations, 'wind_speed', start_current_month, end_current_month
+        )
+        avg_wind_speed_previous = _variable_average(
+            weather_stations, 'wind_speed', start_previous_month, end_previous_month
+        )
         logger.info(f"Velocidad del viento promedio - Mes actual: {avg_wind_speed_current:.2f} km/h, Mes anterior: {avg_wind_speed_previous:.2f} km/h")
 
         # --- Cálculo: Irradiancia Solar Promedio (Estaciones Meteorológicas) ---
         logger.info("Calculando irradiancia solar promedio (estaciones meteorológicas)...")
-        avg_irradiance_current = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_current_month, end_current_month),
-            data__irradiance__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__irradiance'), FloatField()))
-        )['avg_value'] or 0.0
-
-        avg_irradiance_previous = Measurement.objects.filter(
-            device__in=weather_stations,
-            date__date__range=(start_previous_month, end_previous_month),
-            data__irradiance__isnull=False
-        ).aggregate(
-            avg_value=Avg(Cast(F('data__irradiance'), FloatField()))
-        )['avg_value'] or 0.0
+        avg_irradiance_current = _variable_average(
+            weather_stations, 'irradiance', start_current_month, end_current_month
+        )
+        avg_irradiance_previous = _variable_average(
+            weather_stations, 'irradiance', start_previous_month, end_previous_month
+        )
         logger.info(f"Irradiancia solar promedio - Mes actual: {avg_irradiance_current:.2f} W/m², Mes anterior: {avg_irradiance_previous:.2f} W/m²")
 
         # Guardar en la base de datos
@@ -333,45 +323,41 @@ def calculate_and_save_daily_data(self, start_date_str: str = None, end_date_str
             logger.info(f"Procesando fecha en Colombia: {single_date}")
             
             # Agregación para consumo y generación
-            daily_aggregation = Measurement.objects.filter(
-                date__date=single_date,
+            daily_aggregation = Measurement.objects.for_local_day(single_date).filter(
                 device__in=list(electric_meter_ids) + list(inverter_ids)
             ).aggregate(
                 daily_consumption=Sum(
-                    Cast(F('data__totalActivePower'), FloatField()),
-                    filter=Q(device__in=electric_meter_ids, data__totalActivePower__isnull=False)
+                    F('total_active_power'),
+                    filter=Q(device__in=electric_meter_ids, total_active_power__isnull=False)
                 ),
                 daily_generation=Sum(
-                    Cast(F('data__acPower'), FloatField()),
-                    filter=Q(device__in=inverter_ids, data__acPower__isnull=False)
+                    F('ac_power'),
+                    filter=Q(device__in=inverter_ids, ac_power__isnull=False)
                 )
             )
 
             # Agregación para la temperatura media diaria
-            daily_temp_aggregation = Measurement.objects.filter(
-                date__date=single_date,
+            daily_temp_aggregation = Measurement.objects.for_local_day(single_date).filter(
                 device__in=weather_station_ids,
-                data__temperature__isnull=False # CAMBIO: Se usa el campo 'temperature'
+                temperature__isnull=False # CAMBIO: Se usa el campo 'temperature'
             ).aggregate(
-                avg_daily_temp=Avg(Cast(F('data__temperature'), FloatField())) # CAMBIO: Se usa el campo 'temperature'
+                avg_daily_temp=Avg(F('temperature')) # CAMBIO: Se usa el campo 'temperature'
             )
             
             # Agregación para la velocidad del viento promedio diaria
-            daily_wind_aggregation = Measurement.objects.filter(
-                date__date=single_date,
+            daily_wind_aggregation = Measurement.objects.for_local_day(single_date).filter(
                 device__in=weather_station_ids,
-                data__windSpeed__isnull=False
+                wind_speed__isnull=False
             ).aggregate(
-                avg_wind_speed=Avg(Cast(F('data__windSpeed'), FloatField()))
+                avg_wind_speed=Avg(F('wind_speed'))
             )
             
             # Agregación para la irradiancia solar promedio diaria
-            daily_irradiance_aggregation = Measurement.objects.filter(
-                date__date=single_date,
+            daily_irradiance_aggregation = Measurement.objects.for_local_day(single_date).filter(
                 device__in=weather_station_ids,
-                data__irradiance__isnull=False
+                irradiance__isnull=False
             ).aggregate(
-                avg_irradiance=Avg(Cast(F('data__irradiance'), FloatField()))
+                avg_irradiance=Avg(F('irradiance'))
             )
             
             daily_consumption_sum = daily_aggregation.get('daily_consumption') or 0.0
@@ -385,10 +371,9 @@ def calculate_and_save_daily_data(self, start_date_str: str = None, end_date_str
 
             # Calcular generación correctamente (convertir potencia promedio a energía)
             # Primero obtener el número de mediciones para calcular el promedio
-            inverter_measurements_count = Measurement.objects.filter(
-                date__date=single_date,
+            inverter_measurements_count = Measurement.objects.for_local_day(single_date).filter(
                 device__in=inverter_ids,
-                data__acPower__isnull=False
+                ac_power__isnull=False
             ).count()
 
             if inverter_measurements_count > 0:
@@ -514,15 +499,21 @@ def _calculate_daily_data(meter, start_date, end_date):
     records_created = 0
     records_updated = 0
     
+    # Días sin mediciones según la cobertura (None: hay que consultar Measurement)
+    covered = covered_days(meter.id, start_date, end_date)
+
     current_date = start_date
     while current_date <= end_date:
+        if covered is not None and current_date not in covered:
+            current_date += timedelta(days=1)
+            continue
+
         logger.info(f"  Procesando fecha: {current_date}")
         
         # Obtener mediciones del día
-        daily_measurements = Measurement.objects.filter(
+        daily_measurements = Measurement.objects.for_local_day(current_date).filter(
             device=meter,
-            date__date=current_date,
-            data__totalActivePower__isnull=False
+            total_active_power__isnull=False
         ).order_by('date')
 
         if not daily_measurements.exists():
@@ -532,9 +523,9 @@ def _calculate_daily_data(meter, start_date, end_date):
 
         # Calcular métricas diarias
         daily_stats = daily_measurements.aggregate(
-            total_consumption=Sum(Cast(F('data__totalActivePower'), FloatField())),
-            peak_demand=Max(Cast(F('data__totalActivePower'), FloatField())),
-            avg_demand=Avg(Cast(F('data__totalActivePower'), FloatField())),
+            total_consumption=Sum(F('total_active_power')),
+            peak_demand=Max(F('total_active_power')),
+            avg_demand=Avg(F('total_active_power')),
             measurement_count=Count('id'),
             last_measurement=Max('date')
         )
@@ -614,10 +605,9 @@ def _calculate_monthly_data(meter, start_date, end_date):
         logger.info(f"  Procesando mes: {current_date.month}/{current_date.year}")
         
         # Obtener mediciones del mes
-        monthly_measurements = Measurement.objects.filter(
+        monthly_measurements = Measurement.objects.for_local_days(current_date, month_end).filter(
             device=meter,
-            date__date__range=(current_date, month_end),
-            data__totalActivePower__isnull=False
+            total_active_power__isnull=False
         ).order_by('date')
 
         if not monthly_measurements.exists():
@@ -627,9 +617,9 @@ def _calculate_monthly_data(meter, start_date, end_date):
 
         # Calcular métricas mensuales
         monthly_stats = monthly_measurements.aggregate(
-            total_consumption=Sum(Cast(F('data__totalActivePower'), FloatField())),
-            peak_demand=Max(Cast(F('data__totalActivePower'), FloatField())),
-            avg_demand=Avg(Cast(F('data__totalActivePower'), FloatField())),
+            total_consumption=Sum(F('total_active_power')),
+            peak_demand=Max(F('total_active_power')),
+            avg_demand=Avg(F('total_active_power')),
             measurement_count=Count('id'),
             last_measurement=Max('date')
         )
@@ -744,8 +734,15 @@ def _calculate_daily_energy_data(meter, start_date, end_date):
     records_created = 0
     records_updated = 0
     
+    # Días sin mediciones según la cobertura (None: hay que consultar Measurement)
+    covered = covered_days(meter.id, start_date, end_date)
+
     current_date = start_date
     while current_date <= end_date:
+        if covered is not None and current_date not in covered:
+            current_date += timedelta(days=1)
+            continue
+
         # Obtener mediciones del día
         day_start = datetime.combine(current_date, datetime.min.time())
         day_end = datetime.combine(current_date, datetime.max.time())
@@ -753,8 +750,8 @@ def _calculate_daily_energy_data(meter, start_date, end_date):
         measurements = Measurement.objects.filter(
             device=meter,
             date__range=(day_start, day_end),
-            data__importedActivePowerLow__isnull=False,
-            data__importedActivePowerHigh__isnull=False
+            imported_active_power_low__isnull=False,
+            imported_active_power_high__isnull=False
         ).order_by('date')
         
         if measurements.exists():
@@ -834,8 +831,8 @@ def _calculate_monthly_energy_data(meter, start_date, end_date):
         measurements = Measurement.objects.filter(
             device=meter,
             date__range=(month_start, month_end_datetime),
-            data__importedActivePowerLow__isnull=False,
-            data__importedActivePowerHigh__isnull=False
+            imported_active_power_low__isnull=False,
+            imported_active_power_high__isnull=False
         ).order_by('date')
         
         if measurements.exists():
@@ -898,6 +895,178 @@ def _calculate_monthly_energy_data(meter, start_date, end_date):
     
     return records_created, records_updated
 
+def _electric_meter_indicators_python(rows, time_range='daily'):
+    """
+    Implementación original (recorrido en Python) de los indicadores eléctricos.
+    Se conserva como alternativa al motor vectorizado (INDICATORS_ARRAY_ENGINE)
+    y como referencia para la prueba de paridad.
+
+    Args:
+        rows: lista no vacía de tuplas (fecha, data) ordenadas por fecha
+    """
+    # Inicializar variables para cálculos
+    imported_energy_low_start = None
+    imported_energy_high_start = None
+    exported_energy_low_start = None
+    exported_energy_high_start = None
+    
+    imported_energy_low_end = None
+    imported_energy_high_end = None
+    exported_energy_low_end = None
+    exported_energy_high_end = None
+    
+    total_active_power_values = []
+    power_factor_values = []
+    voltage_phases = []
+    current_phases = []
+    voltage_thd_values = []
+    current_thd_values = []
+    current_tdd_values = []
+    
+    # Procesar cada medición
+    for _, data in rows:
+        # Energía acumulada (primer y último valor)
+        if imported_energy_low_start is None:
+            imported_energy_low_start = data.get('importedActivePowerLow', 0)
+            imported_energy_high_start = data.get('importedActivePowerHigh', 0)
+            exported_energy_low_start = data.get('exportedActivePowerLow', 0)
+            exported_energy_high_start = data.get('exportedActivePowerHigh', 0)
+        
+        imported_energy_low_end = data.get('importedActivePowerLow', 0)
+        imported_energy_high_end = data.get('importedActivePowerHigh', 0)
+        exported_energy_low_end = data.get('exportedActivePowerLow', 0)
+        exported_energy_high_end = data.get('exportedActivePowerHigh', 0)
+        
+        # Potencia activa para demanda pico
+        total_active_power = data.get('totalActivePower', 0)
+        if total_active_power is not None:
+            total_active_power_values.append(total_active_power)
+        
+        # Factor de potencia
+        power_factor = data.get('totalPowerFactor', 0)
+        if power_factor is not None:
+            power_factor_values.append(power_factor)
+        
+        # Voltajes por fase
+        voltage_a = data.get('voltagePhaseA', 0)
+        voltage_b = data.get('voltagePhaseB', 0)
+        voltage_c = data.get('voltagePhaseC', 0)
+        if all(v is not None for v in [voltage_a, voltage_b, voltage_c]):
+            voltage_phases.append([voltage_a, voltage_b, voltage_c])
+        
+        # Corrientes por fase
+        current_a = data.get('currentPhaseA', 0)
+        current_b = data.get('currentPhaseB', 0)
+        current_c = data.get('currentPhaseC', 0)
+        if all(c is not None for c in [current_a, current_b, current_c]):
+            current_phases.append([current_a, current_b, current_c])
+        
+        # THD y TDD
+        voltage_thd_a = data.get('voltageTHDPhaseA', 0)
+        voltage_thd_b = data.get('voltageTHDPhaseB', 0)
+        voltage_thd_c = data.get('voltageTHDPhaseC', 0)
+        if all(thd is not None for thd in [voltage_thd_a, voltage_thd_b, voltage_thd_c]):
+            voltage_thd_values.extend([voltage_thd_a, voltage_thd_b, voltage_thd_c])
+        
+        current_thd_a = data.get('currentTHDPhaseA', 0)
+        current_thd_b = data.get('currentTHDPhaseB', 0)
+        current_thd_c = data.get('currentTHDPhaseC', 0)
+        if all(thd is not None for thd in [current_thd_a, current_thd_b, current_thd_c]):
+            current_thd_values.extend([current_thd_a, current_thd_b, current_thd_c])
+        
+        current_tdd_a = data.get('currentTDDPhaseA', 0)
+        current_tdd_b = data.get('currentTDDPhaseB', 0)
+        current_tdd_c = data.get('currentTDDPhaseC', 0)
+        if all(tdd is not None for tdd in [current_tdd_a, current_tdd_b, current_tdd_c]):
+            current_tdd_values.extend([current_tdd_a, current_tdd_b, current_tdd_c])
+    
+    # Calcular indicadores
+    
+    # 3.2. Energía Consumida Acumulada
+    imported_energy_kwh = (
+        (imported_energy_high_end - imported_energy_high_start) * 1000 +
+        (imported_energy_low_end - imported_energy_low_start)
+    )
+    exported_energy_kwh = (
+        (exported_energy_high_end - exported_energy_high_start) * 1000 +
+        (exported_energy_low_end - exported_energy_low_start)
+    )
+    net_energy_consumption_kwh = imported_energy_kwh - exported_energy_kwh
+    
+    # 3.3. Demanda Pico
+    if total_active_power_values:
+        # Calcular demanda pico usando promedio móvil de 15 minutos
+        # Como tenemos datos cada 2 minutos, 15 minutos = 7-8 mediciones
+        window_size = 7
+        moving_averages = []
+        for i in range(len(total_active_power_values) - window_size + 1):
+            window_avg = sum(total_active_power_values[i:i+window_size]) / window_size
+            moving_averages.append(window_avg)
+        
+        peak_demand_kw = max(moving_averages) if moving_averages else max(total_active_power_values)
+        avg_demand_kw = sum(total_active_power_values) / len(total_active_power_values)
+    else:
+        peak_demand_kw = 0
+        avg_demand_kw = 0
+    
+    # 3.4. Factor de Carga
+    if peak_demand_kw > 0:
+        hours_in_period = 24 if time_range == 'daily' else 24 * 30
+        load_factor_pct = (net_energy_consumption_kwh / (peak_demand_kw * hours_in_period)) * 100
+    else:
+        load_factor_pct = 0
+    
+    # 3.5. Factor de Potencia Promedio
+    if power_factor_values:
+        avg_power_factor = sum(power_factor_values) / len(power_factor_values)
+    else:
+        avg_power_factor = 0
+    
+    # 3.6. Desbalance de Fases
+    max_voltage_unbalance_pct = 0
+    max_current_unbalance_pct = 0
+    
+    if voltage_phases:
+        voltage_unbalances = []
+        for v_phases in voltage_phases:
+            v_avg = sum(v_phases) / 3
+            max_deviation = max(abs(v - v_avg) for v in v_phases)
+            unbalance_pct = (max_deviation / v_avg) * 100 if v_avg > 0 else 0
+            voltage_unbalances.append(unbalance_pct)
+        max_voltage_unbalance_pct = max(voltage_unbalances) if voltage_unbalances else 0
+    
+    if current_phases:
+        current_unbalances = []
+        for c_phases in current_phases:
+            c_avg = sum(c_phases) / 3
+            max_deviation = max(abs(c - c_avg) for c in c_phases)
+            unbalance_pct = (max_deviation / c_avg) * 100 if c_avg > 0 else 0
+            current_unbalances.append(unbalance_pct)
+        max_current_unbalance_pct = max(current_unbalances) if current_unbalances else 0
+    
+    # 3.7. THD y TDD
+    max_voltage_thd_pct = max(voltage_thd_values) if voltage_thd_values else 0
+    max_current_thd_pct = max(current_thd_values) if current_thd_values else 0
+    max_current_tdd_pct = max(current_tdd_values) if current_tdd_values else 0
+    
+    return {
+        'imported_energy_kwh': imported_energy_kwh,
+        'exported_energy_kwh': exported_energy_kwh,
+        'net_energy_consumption_kwh': net_energy_consumption_kwh,
+        'peak_demand_kw': peak_demand_kw,
+        'avg_demand_kw': avg_demand_kw,
+        'load_factor_pct': load_factor_pct,
+        'avg_power_factor': avg_power_factor,
+        'max_voltage_unbalance_pct': max_voltage_unbalance_pct,
+        'max_current_unbalance_pct': max_current_unbalance_pct,
+        'max_voltage_thd_pct': max_voltage_thd_pct,
+        'max_current_thd_pct': max_current_thd_pct,
+        'max_current_tdd_pct': max_current_tdd_pct,
+        'measurement_count': len(rows),
+        'last_measurement_date': rows[-1][0],
+    }
+
+
 @shared_task
 def calculate_electric_meter_indicators(device_id, date_str, time_range='daily'):
     """
@@ -930,162 +1099,23 @@ def calculate_electric_meter_indicators(device_id, date_str, time_range='daily')
             else:
                 end_date = date.replace(month=date.month + 1, day=1)
         
-        # Obtener todas las mediciones del período
-        measurements = Measurement.objects.filter(
-            device=device,
-            date__gte=start_date,
-            date__lt=end_date
-        ).order_by('date')
-        
-        if not measurements.exists():
-            return f"No hay mediciones para {device.name} en {date}"
-        
-        # Inicializar variables para cálculos
-        imported_energy_low_start = None
-        imported_energy_high_start = None
-        exported_energy_low_start = None
-        exported_energy_high_start = None
-        
-        imported_energy_low_end = None
-        imported_energy_high_end = None
-        exported_energy_low_end = None
-        exported_energy_high_end = None
-        
-        total_active_power_values = []
-        power_factor_values = []
-        voltage_phases = []
-        current_phases = []
-        voltage_thd_values = []
-        current_thd_values = []
-        current_tdd_values = []
-        
-        # Procesar cada medición
-        for measurement in measurements:
-            data = measurement.data
-            
-            # Energía acumulada (primer y último valor)
-            if imported_energy_low_start is None:
-                imported_energy_low_start = data.get('importedActivePowerLow', 0)
-                imported_energy_high_start = data.get('importedActivePowerHigh', 0)
-                exported_energy_low_start = data.get('exportedActivePowerLow', 0)
-                exported_energy_high_start = data.get('exportedActivePowerHigh', 0)
-            
-            imported_energy_low_end = data.get('importedActivePowerLow', 0)
-            imported_energy_high_end = data.get('importedActivePowerHigh', 0)
-            exported_energy_low_end = data.get('exportedActivePowerLow', 0)
-            exported_energy_high_end = data.get('exportedActivePowerHigh', 0)
-            
-            # Potencia activa para demanda pico
-            total_active_power = data.get('totalActivePower', 0)
-            if total_active_power is not None:
-                total_active_power_values.append(total_active_power)
-            
-            # Factor de potencia
-            power_factor = data.get('totalPowerFactor', 0)
-            if power_factor is not None:
-                power_factor_values.append(power_factor)
-            
-            # Voltajes por fase
-            voltage_a = data.get('voltagePhaseA', 0)
-            voltage_b = data.get('voltagePhaseB', 0)
-            voltage_c = data.get('voltagePhaseC', 0)
-            if all(v is not None for v in [voltage_a, voltage_b, voltage_c]):
-                voltage_phases.append([voltage_a, voltage_b, voltage_c])
-            
-            # Corrientes por fase
-            current_a = data.get('currentPhaseA', 0)
-            current_b = data.get('currentPhaseB', 0)
-            current_c = data.get('currentPhaseC', 0)
-            if all(c is not None for c in [current_a, current_b, current_c]):
-                current_phases.append([current_a, current_b, current_c])
-            
-            # THD y TDD
-            voltage_thd_a = data.get('voltageTHDPhaseA', 0)
-            voltage_thd_b = data.get('voltageTHDPhaseB', 0)
-            voltage_thd_c = data.get('voltageTHDPhaseC', 0)
-            if all(thd is not None for thd in [voltage_thd_a, voltage_thd_b, voltage_thd_c]):
-                voltage_thd_values.extend([voltage_thd_a, voltage_thd_b, voltage_thd_c])
-            
-            current_thd_a = data.get('currentTHDPhaseA', 0)
-            current_thd_b = data.get('currentTHDPhaseB', 0)
-            current_thd_c = data.get('currentTHDPhaseC', 0)
-            if all(thd is not None for thd in [current_thd_a, current_thd_b, current_thd_c]):
-                current_thd_values.extend([current_thd_a, current_thd_b, current_thd_c])
-            
-            current_tdd_a = data.get('currentTDDPhaseA', 0)
-            current_tdd_b = data.get('currentTDDPhaseB', 0)
-            current_tdd_c = data.get('currentTDDPhaseC', 0)
-            if all(tdd is not None for tdd in [current_tdd_a, current_tdd_b, current_tdd_c]):
-                current_tdd_values.extend([current_tdd_a, current_tdd_b, current_tdd_c])
-        
-        # Calcular indicadores
-        
-        # 3.2. Energía Consumida Acumulada
-        imported_energy_kwh = (
-            (imported_energy_high_end - imported_energy_high_start) * 1000 +
-            (imported_energy_low_end - imported_energy_low_start)
-        )
-        exported_energy_kwh = (
-            (exported_energy_high_end - exported_energy_high_start) * 1000 +
-            (exported_energy_low_end - exported_energy_low_start)
-        )
-        net_energy_consumption_kwh = imported_energy_kwh - exported_energy_kwh
-        
-        # 3.3. Demanda Pico
-        if total_active_power_values:
-            # Calcular demanda pico usando promedio móvil de 15 minutos
-            # Como tenemos datos cada 2 minutos, 15 minutos = 7-8 mediciones
-            window_size = 7
-            moving_averages = []
-            for i in range(len(total_active_power_values) - window_size + 1):
-                window_avg = sum(total_active_power_values[i:i+window_size]) / window_size
-                moving_averages.append(window_avg)
-            
-            peak_demand_kw = max(moving_averages) if moving_averages else max(total_active_power_values)
-            avg_demand_kw = sum(total_active_power_values) / len(total_active_power_values)
-        else:
-            peak_demand_kw = 0
-            avg_demand_kw = 0
-        
-        # 3.4. Factor de Carga
-        if peak_demand_kw > 0:
-            hours_in_period = 24 if time_range == 'daily' else 24 * 30
-            load_factor_pct = (net_energy_consumption_kwh / (peak_demand_kw * hours_in_period)) * 100
+        # Obtener las mediciones del período
+        if _array_engine_enabled():
+            series = load_series(device, start_date, end_date - timedelta(days=1), keys=ELECTRIC_METER_KEYS)
+            if not len(series):
+                return f"No hay mediciones para {device.name} en {date}"
+            values = compute_electric_meter_indicators(series, time_range)
         else:
-            load_factor_pct = 0
-        
-        # 3.5. Factor de Potencia Promedio
-        if power_factor_values:
-            avg_power_factor = sum(power_factor_values) / len(power_factor_values)
-        else:
-            avg_power_factor = 0
-        
-        # 3.6. Desbalance de Fases
-        max_voltage_unbalance_pct = 0
-        max_current_unbalance_pct = 0
-        
-        if voltage_phases:
-            voltage_unbalances = []
-            for v_phases in voltage_phases:
-                v_avg = sum(v_phases) / 3
-                max_deviation = max(abs(v - v_avg) for v in v_phases)
-                unbalance_pct = (max_deviation / v_avg) * 100 if v_avg > 0 else 0
-                voltage_unbalances.append(unbalance_pct)
-            max_voltage_unbalance_pct = max(voltage_unbalances) if voltage_unbalances else 0
-        
-        if current_phases:
-            current_unbalances = []
-            for c_phases in current_phases:
-                c_avg = sum(c_phases) / 3
-                max_deviation = max(abs(c - c_avg) for c in c_phases)
-                unbalance_pct = (max_deviation / c_avg) * 100 if c_avg > 0 else 0
-                current_unbalances.append(unbalance_pct)
-            max_current_unbalance_pct = max(current_unbalances) if current_unbalances else 0
-        
-        # 3.7. THD y TDD
-        max_voltage_thd_pct = max(voltage_thd_values) if voltage_thd_values else 0
-        max_current_thd_pct = max(current_thd_values) if current_thd_values else 0
-        max_current_tdd_pct = max(current_tdd_values) if current_tdd_values else 0
+            rows = list(
+                Measurement.objects.filter(
+                    device=device,
+                    date__gte=start_date,
+                    date__lt=end_date
+                ).order_by('date').values_list('date', 'data')
+            )
+            if not rows:
+                return f"No hay mediciones para {device.name} en {date}"
+            values = _electric_meter_indicators_python(rows, time_range)
         
         # Guardar o actualizar los indicadores
         indicators, created = ElectricMeterIndicators.objects.update_or_create(
@@ -1093,22 +1123,7 @@ def calculate_electric_meter_indicators(device_id, date_str, time_range='daily')
             institution=institution,
             date=date,
             time_range=time_range,
-            defaults={
-                'imported_energy_kwh': imported_energy_kwh,
-                'exported_energy_kwh': exported_energy_kwh,
-                'net_energy_consumption_kwh': net_energy_consumption_kwh,
-                'peak_demand_kw': peak_demand_kw,
-                'avg_demand_kw': avg_demand_kw,
-                'load_factor_pct': load_factor_pct,
-                'avg_power_factor': avg_power_factor,
-                'max_voltage_unbalance_pct': max_voltage_unbalance_pct,
-                'max_current_unbalance_pct': max_current_unbalance_pct,
-                'max_voltage_thd_pct': max_voltage_thd_pct,
-                'max_current_thd_pct': max_current_thd_pct,
-                'max_current_tdd_pct': max_current_tdd_pct,
-                'measurement_count': measurements.count(),
-                'last_measurement_date': measurements.last().date if measurements.exists() else None,
-            }
+            defaults=values
         )
         
         action = "creado" if created else "actualizado"
@@ -1184,6 +1199,210 @@ def calculate_all_electric_meter_indicators(time_range='daily', start_date=None,
     except Exception as e:
         return f"Error en el proceso masivo: {str(e)}"
 
+def _inverter_indicators_python(measurements):
+    """
+    Implementación original (recorrido en Python) de los indicadores de
+    inversores. Se conserva como alternativa al motor vectorizado
+    (INDICATORS_ARRAY_ENGINE); los datos horarios los calcula
+    _calculate_hourly_inverter_data.
+
+    Args:
+        measurements: queryset no vacío de mediciones ordenado por fecha
+    """
+    # Inicializar variables para cálculos
+    ac_power_values = []
+    dc_power_values = []
+    reactive_power_values = []
+    apparent_power_values = []
+    power_factor_values = []
+    frequency_values = []
+    voltage_phases = []
+    current_phases = []
+    irradiance_values = []
+    temperature_values = []
+    
+    # Procesar cada medición
+    for measurement in measurements:
+        data = measurement.data
+        
+        # Potencia AC y DC
+        ac_power = data.get('acPower', 0)
+        dc_power = data.get('dcPower', 0)
+        if ac_power is not None:
+            ac_power_values.append(ac_power)
+        if dc_power is not None:
+            dc_power_values.append(dc_power)
+        
+        # Potencia reactiva y aparente
+        reactive_power = data.get('reactivePower', 0)
+        apparent_power = data.get('apparentPower', 0)
+        if reactive_power is not None:
+            reactive_power_values.append(reactive_power)
+        if apparent_power is not None:
+            apparent_power_values.append(apparent_power)
+        
+        # Factor de potencia
+        power_factor = data.get('powerFactor', 0)
+        if power_factor is not None:
+            power_factor_values.append(power_factor)
+        
+        # Frecuencia
+        frequency = data.get('acFrequency', 0)
+        if frequency is not None:
+            frequency_values.append(frequency)
+        
+        # Voltajes por fase
+        voltage_a = data.get('acVoltagePhaseA', 0)
+        voltage_b = data.get('acVoltagePhaseB', 0)
+        voltage_c = data.get('acVoltagePhaseC', 0)
+        if all(v is not None for v in [voltage_a, voltage_b, voltage_c]):
+            voltage_phases.append([voltage_a, voltage_b, voltage_c])
+        
+        # Corrientes por fase
+        current_a = data.get('acCurrentPhaseA', 0)
+        current_b = data.get('acCurrentPhaseB', 0)
+        current_c = data.get('acCurrentPhaseC', 0)
+        if all(c is not None for c in [current_a, current_b, current_c]):
+            current_phases.append([current_a, current_b, current_c])
+        
+        # Datos meteorológicos (si están disponibles)
+        irradiance = data.get('irradiance', 0)
+        temperature = data.get('temperature', 0)
+        if irradiance is not None:
+            irradiance_values.append(irradiance)
+        if temperature is not None:
+            temperature_values.append(temperature)
+    
+    # Calcular indicadores
+    
+    # 4.1. Eficiencia de Conversión DC-AC
+    if ac_power_values and dc_power_values:
+        # Calcular energía total (integral de potencia * tiempo)
+        # Como tenemos datos cada 2 minutos, Δt = 2/60 horas
+        delta_t = 2/60  # horas
+        
+        energy_ac_daily_kwh = sum(ac_power_values) * delta_t / 1000  # Convertir W*h a kWh
+        energy_dc_daily_kwh = sum(dc_power_values) * delta_t / 1000  # Convertir W*h a kWh
+        
+        if energy_dc_daily_kwh > 0:
+            dc_ac_efficiency_pct = (energy_ac_daily_kwh / energy_dc_daily_kwh) * 100
+        else:
+            dc_ac_efficiency_pct = 0
+    else:
+        energy_ac_daily_kwh = 0
+        energy_dc_daily_kwh = 0
+        dc_ac_efficiency_pct = 0
+    
+    # 4.2. Energía Total Generada
+    total_generated_energy_kwh = energy_ac_daily_kwh
+    
+    # 4.3. Performance Ratio (PR)
+    # Nota: Se requiere la potencia nominal del sistema (PnomPV) que no está en los datos
+    # Por ahora se calcula con un valor estimado o se deja en 0
+    pnom_pv_kw = 50.0  # Valor estimado, debería venir de configuración del sistema
+    if irradiance_values:
+        # Calcular irradiancia acumulada diaria
+        irradiance_accumulated = sum(irradiance_values) * delta_t / 1000  # kWh/m²
+        reference_energy_kwh = irradiance_accumulated * pnom_pv_kw
+        
+        if reference_energy_kwh > 0:
+            performance_ratio_pct = (total_generated_energy_kwh / reference_energy_kwh) * 100
+        else:
+            performance_ratio_pct = 0
+    else:
+        reference_energy_kwh = 0
+        performance_ratio_pct = 0
+    
+    # 4.4. Curva de Generación vs. Irradiancia/Temperatura
+    avg_irradiance_wm2 = sum(irradiance_values) / len(irradiance_values) if irradiance_values else 0
+    avg_temperature_c = sum(temperature_values) / len(temperature_values) if temperature_values else 0
+    max_power_w = max(ac_power_values) if ac_power_values else 0
+    min_power_w = min(ac_power_values) if ac_power_values else 0
+    
+    # 4.5. Factor de Potencia y Calidad de Inyección
+    avg_power_factor_pct = sum(power_factor_values) / len(power_factor_values) if power_factor_values else 0
+    avg_reactive_power_var = sum(reactive_power_values) / len(reactive_power_values) if reactive_power_values else 0
+    avg_apparent_power_va = sum(apparent_power_values) / len(apparent_power_values) if apparent_power_values else 0
+    avg_frequency_hz = sum(frequency_values) / len(frequency_values) if frequency_values else 0
+    
+    # Calcular estabilidad de frecuencia
+    if len(frequency_values) > 1:
+        frequency_std = statistics.stdev(frequency_values)
+        frequency_stability_pct = max(0, 100 - (frequency_std / avg_frequency_hz * 100)) if avg_frequency_hz > 0 else 0
+    else:
+        frequency_stability_pct = 0
+    
+    # 4.6. Desbalance de Fases en Inyección
+    max_voltage_unbalance_pct = 0
+    max_current_unbalance_pct = 0
+    
+    if voltage_phases:
+        voltage_unbalances = []
+        for v_phases in voltage_phases:
+            v_avg = sum(v_phases) / 3
+            max_deviation = max(abs(v - v_avg) for v in v_phases)
+            unbalance_pct = (max_deviation / v_avg) * 100 if v_avg > 0 else 0
+            voltage_unbalances.append(unbalance_pct)
+        max_voltage_unbalance_pct = max(voltage_unbalances) if voltage_unbalances else 0
+    
+    if current_phases:
+        current_unbalances = []
+        for c_phases in current_phases:
+            c_avg = sum(c_phases) / 3
+            max_deviation = max(abs(c - c_avg) for c in c_phases)
+            unbalance_pct = (max_deviation / c_avg) * 100 if c_avg > 0 else 0
+            current_unbalances.append(unbalance_pct)
+        max_current_unbalance_pct = max(current_unbalances) if current_unbalances else 0
+    
+    # 4.7. Análisis de Anomalías Operativas
+    anomaly_score = 0
+    anomaly_details = {}
+    
+    # Detectar anomalías basadas en umbrales
+    if dc_ac_efficiency_pct < 80:  # Eficiencia muy baja
+        anomaly_score += 20
+        anomaly_details['low_efficiency'] = f"Eficiencia DC-AC muy baja: {dc_ac_efficiency_pct:.1f}%"
+    
+    if max_voltage_unbalance_pct > 5:  # Desbalance de tensión alto
+        anomaly_score += 15
+        anomaly_details['voltage_unbalance'] = f"Desbalance de tensión alto: {max_voltage_unbalance_pct:.1f}%"
+    
+    if max_current_unbalance_pct > 10:  # Desbalance de corriente alto
+        anomaly_score += 15
+        anomaly_details['current_unbalance'] = f"Desbalance de corriente alto: {max_current_unbalance_pct:.1f}%"
+    
+    if frequency_stability_pct < 90:  # Inestabilidad de frecuencia
+        anomaly_score += 10
+        anomaly_details['frequency_instability'] = f"Baja estabilidad de frecuencia: {frequency_stability_pct:.1f}%"
+    
+    # Normalizar puntuación de anomalías a 0-100
+    anomaly_score = min(100, anomaly_score)
+    
+    return {
+        'dc_ac_efficiency_pct': dc_ac_efficiency_pct,
+        'energy_ac_daily_kwh': energy_ac_daily_kwh,
+        'energy_dc_daily_kwh': energy_dc_daily_kwh,
+        'total_generated_energy_kwh': total_generated_energy_kwh,
+        'performance_ratio_pct': performance_ratio_pct,
+        'reference_energy_kwh': reference_energy_kwh,
+        'avg_irradiance_wm2': avg_irradiance_wm2,
+        'avg_temperature_c': avg_temperature_c,
+        'max_power_w': max_power_w,
+        'min_power_w': min_power_w,
+        'avg_power_factor_pct': avg_power_factor_pct,
+        'avg_reactive_power_var': avg_reactive_power_var,
+        'avg_apparent_power_va': avg_apparent_power_va,
+        'avg_frequency_hz': avg_frequency_hz,
+        'frequency_stability_pct': frequency_stability_pct,
+        'max_voltage_unbalance_pct': max_voltage_unbalance_pct,
+        'max_current_unbalance_pct': max_current_unbalance_pct,
+        'anomaly_score': anomaly_score,
+        'anomaly_details': anomaly_details,
+        'measurement_count': measurements.count(),
+        'last_measurement_date': measurements.last().date if measurements.exists() else None,
+    }
+
+
 @shared_task
 def calculate_inverter_indicators(device_id, date_str, time_range='daily'):
     """
@@ -1216,184 +1435,23 @@ def calculate_inverter_indicators(device_id, date_str, time_range='daily'):
             else:
                 end_date = date.replace(month=date.month + 1, day=1)
         
-        # Obtener todas las mediciones del período
-        measurements = Measurement.objects.filter(
-            device=device,
-            date__gte=start_date,
-            date__lt=end_date
-        ).order_by('date')
-        
-        if not measurements.exists():
-            return f"No hay mediciones para {device.name} en {date}"
-        
-        # Inicializar variables para cálculos
-        ac_power_values = []
-        dc_power_values = []
-        reactive_power_values = []
-        apparent_power_values = []
-        power_factor_values = []
-        frequency_values = []
-        voltage_phases = []
-        current_phases = []
-        irradiance_values = []
-        temperature_values = []
-        
-        # Procesar cada medición
-        for measurement in measurements:
-            data = measurement.data
-            
-            # Potencia AC y DC
-            ac_power = data.get('acPower', 0)
-            dc_power = data.get('dcPower', 0)
-            if ac_power is not None:
-                ac_power_values.append(ac_power)
-            if dc_power is not None:
-                dc_power_values.append(dc_power)
-            
-            # Potencia reactiva y aparente
-            reactive_power = data.get('reactivePower', 0)
-            apparent_power = data.get('apparentPower', 0)
-            if reactive_power is not None:
-                reactive_power_values.append(reactive_power)
-            if apparent_power is not None:
-                apparent_power_values.append(apparent_power)
-            
-            # Factor de potencia
-            power_factor = data.get('powerFactor', 0)
-            if power_factor is not None:
-                power_factor_values.append(power_factor)
-            
-            # Frecuencia
-            frequency = data.get('acFrequency', 0)
-            if frequency is not None:
-                frequency_values.append(frequency)
-            
-            # Voltajes por fase
-            voltage_a = data.get('acVoltagePhaseA', 0)
-            voltage_b = data.get('acVoltagePhaseB', 0)
-            voltage_c = data.get('acVoltagePhaseC', 0)
-            if all(v is not None for v in [voltage_a, voltage_b, voltage_c]):
-                voltage_phases.append([voltage_a, voltage_b, voltage_c])
-            
-            # Corrientes por fase
-            current_a = data.get('acCurrentPhaseA', 0)
-            current_b = data.get('acCurrentPhaseB', 0)
-            current_c = data.get('acCurrentPhaseC', 0)
-            if all(c is not None for c in [current_a, current_b, current_c]):
-                current_phases.append([current_a, current_b, current_c])
-            
-            # Datos meteorológicos (si están disponibles)
-            irradiance = data.get('irradiance', 0)
-            temperature = data.get('temperature', 0)
-            if irradiance is not None:
-                irradiance_values.append(irradiance)
-            if temperature is not None:
-                temperature_values.append(temperature)
-        
-        # Calcular indicadores
-        
-        # 4.1. Eficiencia de Conversión DC-AC
-        if ac_power_values and dc_power_values:
-            # Calcular energía total (integral de potencia * tiempo)
-            # Como tenemos datos cada 2 minutos, Δt = 2/60 horas
-            delta_t = 2/60  # horas
-            
-            energy_ac_daily_kwh = sum(ac_power_values) * delta_t / 1000  # Convertir W*h a kWh
-            energy_dc_daily_kwh = sum(dc_power_values) * delta_t / 1000  # Convertir W*h a kWh
-            
-            if energy_dc_daily_kwh > 0:
-                dc_ac_efficiency_pct = (energy_ac_daily_kwh / energy_dc_daily_kwh) * 100
-            else:
-                dc_ac_efficiency_pct = 0
-        else:
-            energy_ac_daily_kwh = 0
-            energy_dc_daily_kwh = 0
-            dc_ac_efficiency_pct = 0
-        
-        # 4.2. Energía Total Generada
-        total_generated_energy_kwh = energy_ac_daily_kwh
-        
-        # 4.3. Performance Ratio (PR)
-        # Nota: Se requiere la potencia nominal del sistema (PnomPV) que no está en los datos
-        # Por ahora se calcula con un valor estimado o se deja en 0
-        pnom_pv_kw = 50.0  # Valor estimado, debería venir de configuración del sistema
-        if irradiance_values:
-            # Calcular irradiancia acumulada diaria
-            irradiance_accumulated = sum(irradiance_values) * delta_t / 1000  # kWh/m²
-            reference_energy_kwh = irradiance_accumulated * pnom_pv_kw
-            
-            if reference_energy_kwh > 0:
-                performance_ratio_pct = (total_generated_energy_kwh / reference_energy_kwh) * 100
-            else:
-                performance_ratio_pct = 0
-        else:
-            reference_energy_kwh = 0
-            performance_ratio_pct = 0
-        
-        # 4.4. Curva de Generación vs. Irradiancia/Temperatura
-        avg_irradiance_wm2 = sum(irradiance_values) / len(irradiance_values) if irradiance_values else 0
-        avg_temperature_c = sum(temperature_values) / len(temperature_values) if temperature_values else 0
-        max_power_w = max(ac_power_values) if ac_power_values else 0
-        min_power_w = min(ac_power_values) if ac_power_values else 0
-        
-        # 4.5. Factor de Potencia y Calidad de Inyección
-        avg_power_factor_pct = sum(power_factor_values) / len(power_factor_values) if power_factor_values else 0
-        avg_reactive_power_var = sum(reactive_power_values) / len(reactive_power_values) if reactive_power_values else 0
-        avg_apparent_power_va = sum(apparent_power_values) / len(apparent_power_values) if apparent_power_values else 0
-        avg_frequency_hz = sum(frequency_values) / len(frequency_values) if frequency_values else 0
-        
-        # Calcular estabilidad de frecuencia
-        if len(frequency_values) > 1:
-            frequency_std = statistics.stdev(frequency_values)
-            frequency_stability_pct = max(0, 100 - (frequency_std / avg_frequency_hz * 100)) if avg_frequency_hz > 0 else 0
+        # Obtener las mediciones del período
+        if _array_engine_enabled():
+            # Una sola carga columnar para los indicadores y los datos horarios
+            series = load_series(device, start_date, end_date - timedelta(days=1), keys=INVERTER_KEYS)
+            if not len(series):
+                return f"No hay mediciones para {device.name} en {date}"
+            values, hourly_data = compute_inverter_indicators(series)
         else:
-            frequency_stability_pct = 0
-        
-        # 4.6. Desbalance de Fases en Inyección
-        max_voltage_unbalance_pct = 0
-        max_current_unbalance_pct = 0
-        
-        if voltage_phases:
-            voltage_unbalances = []
-            for v_phases in voltage_phases:
-                v_avg = sum(v_phases) / 3
-                max_deviation = max(abs(v - v_avg) for v in v_phases)
-                unbalance_pct = (max_deviation / v_avg) * 100 if v_avg > 0 else 0
-                voltage_unbalances.append(unbalance_pct)
-            max_voltage_unbalance_pct = max(voltage_unbalances) if voltage_unbalances else 0
-        
-        if current_phases:
-            current_unbalances = []
-            for c_phases in current_phases:
-                c_avg = sum(c_phases) / 3
-                max_deviation = max(abs(c - c_avg) for c in c_phases)
-                unbalance_pct = (max_deviation / c_avg) * 100 if c_avg > 0 else 0
-                current_unbalances.append(unbalance_pct)
-            max_current_unbalance_pct = max(current_unbalances) if current_unbalances else 0
-        
-        # 4.7. Análisis de Anomalías Operativas
-        anomaly_score = 0
-        anomaly_details = {}
-        
-        # Detectar anomalías basadas en umbrales
-        if dc_ac_efficiency_pct < 80:  # Eficiencia muy baja
-            anomaly_score += 20
-            anomaly_details['low_efficiency'] = f"Eficiencia DC-AC muy baja: {dc_ac_efficiency_pct:.1f}%"
-        
-        if max_voltage_unbalance_pct > 5:  # Desbalance de tensión alto
-            anomaly_score += 15
-            anomaly_details['voltage_unbalance'] = f"Desbalance de tensión alto: {max_voltage_unbalance_pct:.1f}%"
-        
-        if max_current_unbalance_pct > 10:  # Desbalance de corriente alto
-            anomaly_score += 15
-            anomaly_details['current_unbalance'] = f"Desbalance de corriente alto: {max_current_unbalance_pct:.1f}%"
-        
-        if frequency_stability_pct < 90:  # Inestabilidad de frecuencia
-            anomaly_score += 10
-            anomaly_details['frequency_instability'] = f"Baja estabilidad de frecuencia: {frequency_stability_pct:.1f}%"
-        
-        # Normalizar puntuación de anomalías a 0-100
-        anomaly_score = min(100, anomaly_score)
+            measurements = Measurement.objects.filter(
+                device=device,
+                date__gte=start_date,
+                date__lt=end_date
+            ).order_by('date')
+            if not measurements.exists():
+                return f"No hay mediciones para {device.name} en {date}"
+            values = _inverter_indicators_python(measurements)
+            hourly_data = _calculate_hourly_inverter_data(measurements)
         
         # Guardar o actualizar los indicadores
         indicators, created = InverterIndicators.objects.update_or_create(
@@ -1401,34 +1459,10 @@ def calculate_inverter_indicators(device_id, date_str, time_range='daily'):
             institution=institution,
             date=date,
             time_range=time_range,
-            defaults={
-                'dc_ac_efficiency_pct': dc_ac_efficiency_pct,
-                'energy_ac_daily_kwh': energy_ac_daily_kwh,
-                'energy_dc_daily_kwh': energy_dc_daily_kwh,
-                'total_generated_energy_kwh': total_generated_energy_kwh,
-                'performance_ratio_pct': performance_ratio_pct,
-                'reference_energy_kwh': reference_energy_kwh,
-                'avg_irradiance_wm2': avg_irradiance_wm2,
-                'avg_temperature_c': avg_temperature_c,
-                'max_power_w': max_power_w,
-                'min_power_w': min_power_w,
-                'avg_power_factor_pct': avg_power_factor_pct,
-                'avg_reactive_power_var': avg_reactive_power_var,
-                'avg_apparent_power_va': avg_apparent_power_va,
-                'avg_frequency_hz': avg_frequency_hz,
-                'frequency_stability_pct': frequency_stability_pct,
-                'max_voltage_unbalance_pct': max_voltage_unbalance_pct,
-                'max_current_unbalance_pct': max_current_unbalance_pct,
-                'anomaly_score': anomaly_score,
-                'anomaly_details': anomaly_details,
-                'measurement_count': measurements.count(),
-                'last_measurement_date': measurements.last().date if measurements.exists() else None,
-            }
+            defaults=values
         )
         
         # Crear datos para gráficos
-        hourly_data = _calculate_hourly_inverter_data(measurements)
-        
         chart_data, chart_created = InverterChartData.objects.update_or_create(
             device=device,
             institution=institution,
@@ -1571,8 +1605,15 @@ def _calculate_daily_inverter_data(inverter, start_date, end_date):
     records_created = 0
     records_updated = 0
     
+    # Días sin mediciones según la cobertura (None: hay que consultar Measurement)
+    covered = covered_days(inverter.id, start_date, end_date)
+
     current_date = start_date
     while current_date <= end_date:
+        if covered is not None and current_date not in covered:
+            current_date += timedelta(days=1)
+            continue
+
         logger.info(f"  Procesando fecha: {current_date}")
         
         # Calcular indicadores para el día
@@ -1690,8 +1731,15 @@ def _calculate_daily_electrical_data(meter, start_date, end_date):
     records_created = 0
     records_updated = 0
     
+    # Días sin mediciones según la cobertura (None: hay que consultar Measurement)
+    covered = covered_days(meter.id, start_date, end_date)
+
     current_date = start_date
     while current_date <= end_date:
+        if covered is not None and current_date not in covered:
+            current_date += timedelta(days=1)
+            continue
+
         logger.info(f"  Procesando fecha: {current_date}")
         
         # Calcular indicadores para el día
@@ -2193,23 +2241,36 @@ def _calculate_daily_weather_station_data(station, start_date, end_date):
     records_created = 0
     records_updated = 0
     
+    # Días sin mediciones según la cobertura (None: hay que consultar Measurement)
+    covered = covered_days(station.id, start_date, end_date)
+
     current_date = start_date
     while current_date <= end_date:
+        if covered is not None and current_date not in covered:
+            current_date += timedelta(days=1)
+            continue
+
         logger.info(f"  Procesando fecha: {current_date}")
         
         try:
-            # Obtener mediciones para el día específico
-            measurements = Measurement.objects.filter(
-                device=station,
-                date__date=current_date
-            ).order_by('date')
+            if _array_engine_enabled():
+                # Una sola carga columnar para los indicadores y los datos horarios
+                series = load_series(station, current_date, current_date, keys=WEATHER_KEYS)
+                results = compute_weather_indicators(series) if len(series) else None
+            else:
+                # Obtener mediciones para el día específico
+                measurements_list = list(Measurement.objects.for_local_day(current_date).filter(
+                    device=station,
+                ).order_by('date'))
+                results = None
+                if measurements_list:
+                    results = (
+                        calculate_single_day_weather_indicators(measurements_list),
+                        calculate_single_day_weather_chart_data(measurements_list),
+                    )
             
-            if measurements.exists():
-                # Convertir QuerySet a lista para evitar problemas de indexación
-                measurements_list = list(measurements)
-                
-                # Calcular indicadores para el día
-                indicators = calculate_single_day_weather_indicators(measurements_list)
+            if results:
+                indicators, chart_data = results
                 
                 # Guardar o actualizar indicadores
                 weather_indicator, created = WeatherStationIndicators.objects.update_or_create(
@@ -2225,8 +2286,7 @@ def _calculate_daily_weather_station_data(station, start_date, end_date):
                 else:
                     records_updated += 1
                 
-                # Calcular y guardar datos de gráficos
-                chart_data = calculate_single_day_weather_chart_data(measurements_list)
+                # Guardar datos de gráficos
                 weather_chart, chart_created = WeatherStationChartData.objects.update_or_create(
                     device=station,
                     institution=station.institution,
@@ -2262,18 +2322,17 @@ def _calculate_monthly_weather_station_data(station, start_date, end_date):
         logger.info(f"  Procesando mes: {current_date.strftime('%Y-%m')}")
         
         try:
-            # Obtener mediciones para el mes
-            measurements = Measurement.objects.filter(
-                device=station,
-                date__date__range=(current_date, month_end)
-            ).order_by('date')
+            if _array_engine_enabled():
+                series = load_series(station, current_date, month_end, keys=WEATHER_KEYS)
+                indicators = compute_monthly_weather_indicators(series) if len(series) else None
+            else:
+                # Obtener mediciones para el mes
+                measurements_list = list(Measurement.objects.for_local_days(current_date, month_end).filter(
+                    device=station,
+                ).order_by('date'))
+                indicators = calculate_single_month_weather_indicators(measurements_list) if measurements_list else None
             
-            if measurements.exists():
-                # Convertir QuerySet a lista para evitar problemas de indexación
-                measurements_list = list(measurements)
-                
-                # Calcular indicadores para el mes
-                indicators = calculate_single_month_weather_indicators(measurements_list)
+            if indicators:
                 
                 # Guardar o actualizar indicadores
                 weather_indicator, created = WeatherStationIndicators.objects.update_or_create(
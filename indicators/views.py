@@ -10,6 +10,7 @@ import logging
 from datetime import datetime, timedelta, timezone, date
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
+from django.conf import settings
 import uuid 
 import requests
 import calendar
@@ -19,7 +20,7 @@ import pytz
 from .models import ElectricMeterEnergyConsumption, MonthlyConsumptionKPI, DailyChartData, ElectricMeterConsumption, ElectricMeterChartData, ElectricMeterIndicators, InverterIndicators, InverterChartData, WeatherStationIndicators, WeatherStationChartData
 # Importa el cliente SCADA y los modelos DeviceCategory, Measurement, Device de scada_proxy
 from scada_proxy.scada_client import ScadaConnectorClient 
-from scada_proxy.models import DeviceCategory, Measurement, Device, Institution
+from scada_proxy.models import DeviceCategory, Measurement, Device, Institution, DeviceLatestState
 # Importa las tareas de Celery
 from .tasks import calculate_monthly_consumption_kpi, calculate_and_save_daily_data
 
@@ -49,16 +50,6 @@ def get_colombia_date():
 class ConsumptionSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_scada_token(self):
-        try:
-            return scada_client.get_token()
-        except EnvironmentError as e:
-            logger.error(f"SCADA configuration error: {e}")
-            return Response({"detail": "SCADA server configuration error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error getting SCADA token: {e}")
-            return Response({"detail": "No se pudo autenticar con la API SCADA. Revise las credenciales."}, status=status.HTTP_502_BAD_GATEWAY)
-
     @extend_schema(
         summary="Obtener resumen de consumo, generación y balance energético",
         description="Obtiene el resumen de consumo, generación y balance energético mensual",
@@ -87,10 +78,6 @@ class ConsumptionSummaryView(APIView):
         
         Obtiene el resumen de consumo, generación y balance energético mensual.
         """
-        token = self.get_scada_token()
-        if isinstance(token, Response):
-            return token
-
         try:
             # Obtener el registro de KPI pre-calculado
             kpi_record = MonthlyConsumptionKPI.objects.first()
@@ -140,7 +127,7 @@ class ConsumptionSummaryView(APIView):
             avg_irradiance_previous = kpi_record.avg_irradiance_previous_month
             logger.info(f"Avg Irradiance: Current: {avg_irradiance_current} W/m², Previous: {avg_irradiance_previous} W/m²")
 
-            # --- Inversores Activos (Real-time from SCADA API) ---
+            # --- Inversores Activos (último estado local, actualizado en la ingesta) ---
             active_inverters_count = 0
             total_inverters_count = 0
             inverter_status_text = "normal"
@@ -148,18 +135,18 @@ class ConsumptionSummaryView(APIView):
 
             try:
                 inverter_category_obj = DeviceCategory.objects.get(name='inverter')
-                inverter_scada_id = inverter_category_obj.scada_id
 
-                scada_inverters_response = scada_client.get_devices(token, category_scada_id=inverter_scada_id) 
-                scada_inverters = scada_inverters_response.get('data', [])
-
-                total_inverters_count = len(scada_inverters)
-                online_inverters_count = 0
+                # Un inversor está en línea si su última medición es reciente
+                online_since = get_colombia_now() - timedelta(
+                    minutes=getattr(settings, 'SCADA_DEVICE_ONLINE_MINUTES', 90)
+                )
+                inverters = Device.objects.filter(category=inverter_category_obj, is_active=True)
+                total_inverters_count = inverters.count()
+                online_inverters_count = DeviceLatestState.objects.filter(
+                    device__in=inverters,
+                    last_measurement_date__gte=online_since
+                ).count()
 
-                for inverter in scada_inverters:
-                    if inverter.get('status') == 'online':
-                        online_inverters_count += 1
-                
                 active_inverters_count = online_inverters_count
                 inactive_inverters_count = total_inverters_count - active_inverters_count
 
@@ -177,15 +164,11 @@ class ConsumptionSummaryView(APIView):
                 logger.info(f"Inverters: Active: {active_inverters_count}, Total: {total_inverters_count}")
 
             except DeviceCategory.DoesNotExist:
-                logger.error("Inverter category not found in local DB. Cannot fetch real-time inverters from SCADA.")
+                logger.error("Inverter category not found in local DB. Cannot compute inverter status.")
                 inverter_status_text = "error"
                 inverter_description_text = "Categoría 'inverter' no encontrada localmente."
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error getting real-time inverter data from SCADA: {e}")
-                inverter_status_text = "error"
-                inverter_description_text = "Error de conexión SCADA"
             except Exception as e:
-                logger.error(f"Error processing real-time inverter data: {e}", exc_info=True)
+                logger.error(f"Error processing inverter status: {e}", exc_info=True)
                 inverter_status_text = "error"
                 inverter_description_text = "Error interno"
 
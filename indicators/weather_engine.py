@@ -0,0 +1,189 @@
+"""
+Motor vectorizado de los indicadores de estaciones meteorológicas
+(WeatherStationIndicators y WeatherStationChartData).
+
+Una sola carga columnar (scada_proxy.blocks.load_series con WEATHER_KEYS)
+alimenta los indicadores del día y los 24 intervalos horarios del gráfico.
+Las fórmulas son las de calculate_single_day_weather_indicators y
+calculate_single_day_weather_chart_data:
+
+- rosa de los vientos: sectores de 45° con np.histogram y rangos de velocidad
+  con np.digitize, en lugar de clasificar cada muestra con if/elif;
+- promedios horarios y precipitación de cada hora (último valor del
+  acumulador) con bincount (kernels.bin_mean / kernels.bin_last);
+- la irradiancia acumulada se integra con el trapecio sobre las marcas de
+  tiempo reales (kernels.integrate), sin integrar los huecos de más de
+  MAX_GAP_SECONDS, en lugar de suponer una lectura cada 2 minutos; el
+  gráfico usa el mismo valor que los indicadores;
+- las horas del gráfico son horas locales (Colombia).
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .kernels import MAX_GAP_SECONDS, bin_last, bin_mean, integrate, local_hour
+
+# Variables del JSON que necesita el motor
+WEATHER_KEYS = ['irradiance', 'temperature', 'humidity', 'windSpeed', 'windDirection', 'precipitation']
+
+# Eficiencia típica de un panel para la potencia FV teórica (1 m²)
+PV_EFFICIENCY = 0.17
+
+# Sectores de 45° centrados en cada dirección; el primero y el último son N
+WIND_DIRECTIONS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+WIND_DIRECTION_EDGES = np.array([0, 22.5, 67.5, 112.5, 157.5, 202.5, 247.5, 292.5, 337.5, 360])
+
+# Rangos de velocidad del viento (km/h): calma, ligera, moderada, fuerte, muy fuerte
+WIND_SPEED_RANGES = ['0-5', '5-10', '10-20', '20-30', '30+']
+WIND_SPEED_EDGES = np.array([5, 10, 20, 30])
+
+# Columnas promediadas por hora en WeatherStationChartData
+HOURLY_MEAN_FIELDS = [
+    ('hourly_irradiance', 'irradiance'),
+    ('hourly_temperature', 'temperature'),
+    ('hourly_humidity', 'humidity'),
+    ('hourly_wind_speed', 'windSpeed'),
+    ('hourly_wind_direction', 'windDirection'),
+]
+
+# Campos diarios promediados en los indicadores mensuales
+MONTHLY_MEAN_FIELDS = [
+    'daily_irradiance_kwh_m2', 'daily_hsp_hours', 'avg_wind_speed_kmh',
+    'daily_precipitation_cm', 'avg_temperature_c', 'avg_humidity_pct',
+]
+
+
+def _valid(values):
+    return values[~np.isnan(values)]
+
+
+def wind_direction_distribution(directions):
+    """Número de muestras por dirección cardinal (grados fuera de 0-360 no cuentan)."""
+    counts, _ = np.histogram(_valid(directions), bins=WIND_DIRECTION_EDGES)
+    counts[0] += counts[-1]
+    return {direction: int(count) for direction, count in zip(WIND_DIRECTIONS, counts[:-1])}
+
+
+def wind_speed_distribution(speeds):
+    """Número de muestras por rango de velocidad del viento."""
+    bins = np.digitize(_valid(speeds), WIND_SPEED_EDGES)
+    counts = np.bincount(bins, minlength=len(WIND_SPEED_RANGES))
+    return {speed_range: int(count) for speed_range, count in zip(WIND_SPEED_RANGES, counts)}
+
+
+def daily_irradiance_kwh_m2(series):
+    """Irradiancia acumulada (W/m² integrados en horas -> kWh/m²)."""
+    return integrate(series.timestamps, series.get('irradiance'), MAX_GAP_SECONDS) / 1000
+
+
+def daily_weather_indicators(series):
+    """Indicadores de WeatherStationIndicators de una serie no vacía."""
+    irradiance = _valid(series.get('irradiance'))
+    temperature = _valid(series.get('temperature'))
+    humidity = _valid(series.get('humidity'))
+    wind_speed = _valid(series.get('windSpeed'))
+    precipitation = _valid(series.get('precipitation'))
+
+    indicators = {}
+
+    # 5.1. Irradiancia Acumulada Diaria (kWh/m²)
+    if len(irradiance):
+        indicators['daily_irradiance_kwh_m2'] = daily_irradiance_kwh_m2(series)
+        # 5.2. Horas Solares Pico (1 HSP = 1 kWh/m²)
+        indicators['daily_hsp_hours'] = indicators['daily_irradiance_kwh_m2']
+        # 5.5. Generación Fotovoltaica Potencia (teórica)
+        indicators['theoretical_pv_power_w'] = float(irradiance.mean()) * PV_EFFICIENCY
+
+    # 5.3. Viento: Velocidad Media y rosa de los vientos
+    if len(wind_speed):
+        indicators['avg_wind_speed_kmh'] = float(wind_speed.mean())
+        directions = series.get('windDirection')
+        if (~np.isnan(directions)).any():
+            indicators['wind_direction_distribution'] = wind_direction_distribution(directions)
+            indicators['wind_speed_distribution'] = wind_speed_distribution(wind_speed)
+
+    # 5.4. Precipitación Acumulada (acumulador diario: último valor)
+    if len(precipitation):
+        indicators['daily_precipitation_cm'] = float(precipitation[-1])
+
+    if len(temperature):
+        indicators['avg_temperature_c'] = float(temperature.mean())
+        indicators['max_temperature_c'] = float(temperature.max())
+        indicators['min_temperature_c'] = float(temperature.min())
+
+    if len(humidity):
+        indicators['avg_humidity_pct'] = float(humidity.mean())
+
+    indicators['measurement_count'] = len(series)
+    indicators['last_measurement_date'] = datetime.fromtimestamp(int(series.timestamps[-1]), tz=timezone.utc)
+    return indicators
+
+
+def hourly_chart_data(series):
+    """Datos horarios (24 intervalos, hora local) de WeatherStationChartData."""
+    hours = local_hour(series.timestamps)
+    chart_data = {
+        field: np.nan_to_num(bin_mean(hours, series.get(key), 24))
+        for field, key in HOURLY_MEAN_FIELDS
+    }
+    # Precipitación de cada hora: último valor del acumulador
+    chart_data['hourly_precipitation'] = np.nan_to_num(bin_last(hours, series.get('precipitation'), 24))
+
+    summary = {
+        'daily_irradiance_kwh_m2': daily_irradiance_kwh_m2(series),
+        'avg_daily_temperature_c': float(chart_data['hourly_temperature'].sum()) / 24,
+        'avg_daily_humidity_pct': float(chart_data['hourly_humidity'].sum()) / 24,
+        'avg_daily_wind_speed_kmh': float(chart_data['hourly_wind_speed'].sum()) / 24,
+        'daily_precipitation_cm': float(chart_data['hourly_precipitation'][-1]),
+    }
+    chart_data = {field: values.tolist() for field, values in chart_data.items()}
+    chart_data.update(summary)
+    return chart_data
+
+
+def compute_weather_indicators(series):
+    """
+    Indicadores del día y datos horarios a partir de una serie no vacía.
+
+    Returns:
+        Tupla (defaults de WeatherStationIndicators, defaults de WeatherStationChartData)
+    """
+    return daily_weather_indicators(series), hourly_chart_data(series)
+
+
+def compute_monthly_weather_indicators(series):
+    """
+    Indicadores mensuales de una serie no vacía: promedio (máximo/mínimo para
+    las temperaturas extremas) de los indicadores de cada día local.
+    """
+    local_dates = series.local_dates()
+    # Inicio de cada día en la serie ordenada
+    _, day_starts = np.unique(local_dates, return_index=True)
+    day_ends = np.append(day_starts[1:], len(series))
+    daily_indicators = [
+        daily_weather_indicators(_slice(series, start, end))
+        for start, end in zip(day_starts, day_ends)
+    ]
+
+    monthly_indicators = {}
+    for field in MONTHLY_MEAN_FIELDS:
+        values = [indicators[field] for indicators in daily_indicators if field in indicators]
+        if values:
+            monthly_indicators[field] = sum(values) / len(values)
+
+    for field, reducer in (('max_temperature_c', max), ('min_temperature_c', min)):
+        values = [indicators[field] for indicators in daily_indicators if field in indicators]
+        if values:
+            monthly_indicators[field] = reducer(values)
+
+    monthly_indicators['measurement_count'] = len(series)
+    monthly_indicators['last_measurement_date'] = datetime.fromtimestamp(int(series.timestamps[-1]), tz=timezone.utc)
+    return monthly_indicators
+
+
+def _slice(series, start, end):
+    return type(series)(
+        series.timestamps[start:end],
+        {key: column[start:end] for key, column in series.columns.items()},
+    )
@@ -0,0 +1,392 @@
+"""
+Archivo frío de mediciones crudas en disco.
+
+Los meses cerrados (hora Colombia) anteriores al horizonte de recálculo se
+exportan por dispositivo a archivos columnares NumPy y se eliminan de la
+tabla de mediciones. Cada mes es un directorio
+SCADA_ARCHIVE_ROOT/<device_id>/<YYYY-MM>/ con:
+
+- manifest.json: variables, número de muestras, fechas y formato.
+- timestamps (int64, segundos epoch), ids (int64) y values (float64 de
+  forma variables x muestras, NaN si falta el dato): como .npy sueltos
+  (formato 'npy') o dentro de un único arrays.npz comprimido ('npz').
+- extra.json.gz: valores no numéricos del JSON (texto, nulos, anidados),
+  por índice de muestra, para poder reconstruir `data` completo.
+
+Con el formato 'npy' los lectores abren los arreglos con mmap y solo se
+leen del disco las páginas del rango pedido; con 'npz' ocupan menos pero
+se descomprimen enteros al abrirlos. Los rollups y bloques diarios no se
+tocan: siguen en la base de datos.
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pytz
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .blocks import DaySeries, _concat
+from .models import Device, Measurement, MeasurementArchive
+from .partitioning import _add_months, _month_start
+
+logger = logging.getLogger(__name__)
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+MANIFEST = 'manifest.json'
+EXTRA = 'extra.json.gz'
+ARRAYS = ('timestamps', 'ids', 'values')
+
+
+def get_archive_root():
+    return str(getattr(settings, 'SCADA_ARCHIVE_ROOT', os.path.join(settings.BASE_DIR, 'archive', 'measurements')))
+
+
+def _month_bounds(month):
+    """[inicio del mes, inicio del mes siguiente) en hora Colombia."""
+    start = COLOMBIA_TZ.localize(datetime(month.year, month.month, 1))
+    following = _add_months(month, 1)
+    return start, COLOMBIA_TZ.localize(datetime(following.year, following.month, 1))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# -------------------------
+# Escritura
+# -------------------------
+def _collect_month(rows):
+    """Pasa a columnas tuplas (id, fecha, data) ordenadas por fecha."""
+    ids, timestamps, extra = [], [], {}
+    collected, integer_keys, float_keys = {}, set(), set()
+
+    for index, (pk, date, data) in enumerate(rows):
+        ids.append(pk)
+        timestamps.append(int(date.timestamp()))
+        for key, value in data.items():
+            if _is_number(value):
+                collected.setdefault(key, {})[index] = float(value)
+                (integer_keys if isinstance(value, int) else float_keys).add(key)
+            else:
+                extra.setdefault(str(index), {})[key] = value
+
+    count = len(ids)
+    variables = sorted(collected)
+    values = np.full((len(variables), count), np.nan)
+    for row, key in enumerate(variables):
+        points = collected[key]
+        values[row, list(points.keys())] = list(points.values())
+
+    return {
+        'ids': np.asarray(ids, dtype=np.int64),
+        'timestamps': np.asarray(timestamps, dtype=np.int64),
+        'values': values,
+        'variables': variables,
+        # Variables que en el JSON original siempre fueron enteras
+        'integer_variables': sorted(integer_keys - float_keys),
+        'extra': extra,
+    }
+
+
+def _write_month(directory, month_data, manifest, compress):
+    """Escribe el mes en un directorio temporal y lo mueve a su sitio de una vez."""
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        if compress:
+            np.savez_compressed(os.path.join(tmp, 'arrays.npz'), **{name: month_data[name] for name in ARRAYS})
+        else:
+            for name in ARRAYS:
+                np.save(os.path.join(tmp, f'{name}.npy'), month_data[name])
+        with gzip.open(os.path.join(tmp, EXTRA), 'wt', encoding='utf-8') as fh:
+            json.dump(month_data['extra'], fh)
+        with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as fh:
+            json.dump(manifest, fh, indent=2)
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+
+
+def archive_device_month(device_id, month, compress=None, delete=True):
+    """
+    Exporta un mes de mediciones de un dispositivo y, con delete=True, lo
+    elimina de la base de datos. Los archivos se escriben y se releen antes de
+    borrar; el borrado y el registro MeasurementArchive van en una transacción.
+
+    Returns:
+        El MeasurementArchive creado, o None si el mes no tenía mediciones
+    """
+    if compress is None:
+        compress = getattr(settings, 'SCADA_ARCHIVE_COMPRESS', False)
+    month = _month_start(month)
+    start, end = _month_bounds(month)
+
+    db_rows = list(
+        Measurement.objects.in_range(start, end)
+        .filter(device_id=device_id)
+        .order_by('date')
+        .values_list('id', 'date', 'data')
+    )
+    if not db_rows:
+        return None
+
+    # Si el mes ya estaba archivado (llegaron mediciones tardías), se combinan
+    # las archivadas con las de la base de datos, que prevalecen
+    existing = MeasurementArchive.objects.filter(device_id=device_id, month=month).first()
+    rows = db_rows
+    if existing is not None:
+        merged = {date: (pk, date, data) for pk, date, data in ArchivedMonth.for_archive(existing).rows()}
+        merged.update({date: (pk, date, data) for pk, date, data in db_rows})
+        rows = [merged[date] for date in sorted(merged)]
+
+    month_data = _collect_month(rows)
+    count = len(month_data['ids'])
+    db_ids = [pk for pk, _, _ in db_rows]
+
+    relative = os.path.join(str(device_id), f'{month:%Y-%m}')
+    directory = os.path.join(get_archive_root(), relative)
+    first_date = datetime.fromtimestamp(int(month_data['timestamps'][0]), tz=pytz.utc)
+    last_date = datetime.fromtimestamp(int(month_data['timestamps'][-1]), tz=pytz.utc)
+    manifest = {
+        'device_id': device_id,
+        'month': month.isoformat(),
+        'format': 'npz' if compress else 'npy',
+        'sample_count': count,
+        'variables': month_data['variables'],
+        'integer_variables': month_data['integer_variables'],
+        'first_date': first_date.isoformat(),
+        'last_date': last_date.isoformat(),
+    }
+    size = _write_month(directory, month_data, manifest, compress)
+
+    # Verificación: lo escrito se puede leer y tiene todas las muestras
+    stored = ArchivedMonth(directory)
+    if len(stored) != count or not np.array_equal(stored.ids, month_data['ids']):
+        raise RuntimeError(f"La verificación del archivo {directory} falló; no se eliminan mediciones.")
+
+    with transaction.atomic():
+        archive, _ = MeasurementArchive.objects.update_or_create(
+            device_id=device_id,
+            month=month,
+            defaults={
+                'path': relative,
+                'format': manifest['format'],
+                'sample_count': count,
+                'first_date': first_date,
+                'last_date': last_date,
+                'size_bytes': size,
+            }
+        )
+        if delete:
+            deleted, _ = Measurement.objects.in_range(start, end).filter(
+                device_id=device_id, id__in=db_ids
+            ).delete()
+            if deleted != len(db_ids):
+                raise RuntimeError(
+                    f"Se esperaban {len(db_ids)} mediciones y se eliminaron {deleted}; se revierte el archivado."
+                )
+
+    logger.info(f"Archivado {month:%Y-%m} del dispositivo {device_id}: {count} mediciones, {size} bytes.")
+    return archive
+
+
+def archive_closed_months(keep_months=None, device_ids=None, today=None, compress=None, delete=True):
+    """
+    Archiva, por dispositivo, todos los meses con mediciones anteriores a los
+    últimos keep_months (incluido el actual), que se conservan en la base de datos.
+
+    Returns:
+        Dict con 'archived' (meses), 'rows' y 'failed' (lista de (device_id, mes, error))
+    """
+    if keep_months is None:
+        keep_months = getattr(settings, 'SCADA_ARCHIVE_KEEP_MONTHS', 0)
+    if keep_months < 1:
+        raise ValueError("keep_months debe ser al menos 1")
+
+    today = today or timezone.now().astimezone(COLOMBIA_TZ).date()
+    cutoff = _add_months(_month_start(today), -(keep_months - 1))
+    cutoff_start, _ = _month_bounds(cutoff)
+
+    if device_ids is None:
+        device_ids = list(Device.objects.values_list('id', flat=True))
+
+    summary = {'archived': 0, 'rows': 0, 'failed': []}
+    for device_id in device_ids:
+        oldest = Measurement.objects.filter(device_id=device_id, date__lt=cutoff_start).aggregate(first=Min('date'))['first']
+        if oldest is None:
+            continue
+        month = _month_start(oldest.astimezone(COLOMBIA_TZ))
+        while month < cutoff:
+            try:
+                archive = archive_device_month(device_id, month, compress=compress, delete=delete)
+                if archive is not None:
+                    summary['archived'] += 1
+                    summary['rows'] += archive.sample_count
+            except Exception as e:
+                logger.error(f"Error archivando {month:%Y-%m} del dispositivo {device_id}: {e}", exc_info=True)
+                summary['failed'].append((device_id, month, str(e)))
+            month = _add_months(month, 1)
+
+    logger.info(
+        f"Archivo frío: {summary['archived']} meses, {summary['rows']} mediciones, "
+        f"{len(summary['failed'])} fallidos (anteriores a {cutoff:%Y-%m})."
+    )
+    return summary
+
+
+# -------------------------
+# Lectura
+# -------------------------
+class ArchivedMonth:
+    """
+    Mes archivado abierto para lectura. Con formato 'npy' los arreglos son
+    memmaps de solo lectura: cortar un rango solo lee esas páginas del disco.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as fh:
+            self.manifest = json.load(fh)
+        self.variables = self.manifest['variables']
+        self.integer_variables = set(self.manifest.get('integer_variables', []))
+
+        if self.manifest['format'] == 'npz':
+            with np.load(os.path.join(directory, 'arrays.npz')) as arrays:
+                self.timestamps, self.ids, self.values = (arrays[name] for name in ARRAYS)
+        else:
+            self.timestamps, self.ids, self.values = (
+                np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ARRAYS
+            )
+        self._extra = None
+
+    @classmethod
+    def for_archive(cls, archive):
+        return cls(os.path.join(get_archive_root(), archive.path))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def extra(self):
+        if self._extra is None:
+            with gzip.open(os.path.join(self.directory, EXTRA), 'rt', encoding='utf-8') as fh:
+                self._extra = json.load(fh)
+        return self._extra
+
+    def _slice(self, start=None, end=None):
+        """Índices [i, j) de las muestras con start <= fecha <= end."""
+        i = 0 if start is None else int(np.searchsorted(self.timestamps, int(start.timestamp()), side='left'))
+        j = len(self) if end is None else int(np.searchsorted(self.timestamps, int(end.timestamp()), side='right'))
+        return i, j
+
+    def series(self, start=None, end=None, keys=None):
+        """DaySeries con las variables numéricas (o solo `keys`) del rango."""
+        i, j = self._slice(start, end)
+        columns = {
+            key: np.array(self.values[row, i:j])
+            for row, key in enumerate(self.variables)
+            if keys is None or key in keys
+        }
+        return DaySeries(np.array(self.timestamps[i:j]), columns)
+
+    def rows(self, start=None, end=None):
+        """Itera (id, fecha, data) del rango reconstruyendo el JSON original."""
+        i, j = self._slice(start, end)
+        timestamps = np.array(self.timestamps[i:j])
+        ids = np.array(self.ids[i:j])
+        values = np.array(self.values[:, i:j])
+        extra = self.extra
+        for offset in range(j - i):
+            data = {}
+            for row, key in enumerate(self.variables):
+                value = values[row, offset]
+                if not np.isnan(value):
+                    data[key] = int(value) if key in self.integer_variables else float(value)
+            data.update(extra.get(str(i + offset), {}))
+            yield int(ids[offset]), datetime.fromtimestamp(int(timestamps[offset]), tz=pytz.utc), data
+
+
+def archives_in_range(device_ids=None, start=None, end=None):
+    """Meses archivados que se solapan con [start, end] (None = sin límite)."""
+    qs = MeasurementArchive.objects.all()
+    if device_ids is not None:
+        qs = qs.filter(device_id__in=device_ids)
+    if start is not None:
+        qs = qs.filter(last_date__gte=start)
+    if end is not None:
+        qs = qs.filter(first_date__lte=end)
+    return qs.order_by('device_id', 'month')
+
+
+def archives_for_days(first_day, last_day, device_scada_id=None):
+    """Meses archivados entre dos días (hora Colombia), opcionalmente de un dispositivo por scada_id."""
+    start = COLOMBIA_TZ.localize(datetime(first_day.year, first_day.month, first_day.day))
+    end = COLOMBIA_TZ.localize(datetime(last_day.year, last_day.month, last_day.day, 23, 59, 59))
+    qs = archives_in_range(None, start, end)
+    if device_scada_id:
+        qs = qs.filter(device__scada_id=device_scada_id)
+    return qs
+
+
+def load_archived_series(device_id, start, end, keys=None):
+    """DaySeries de un dispositivo en [start, end] leída solo del archivo."""
+    parts = [
+        ArchivedMonth.for_archive(archive).series(start, end, keys)
+        for archive in archives_in_range([device_id], start, end)
+    ]
+    return _concat(parts, keys)
+
+
+def archived_rows(device_ids=None, start=None, end=None):
+    """Itera (archive, id, fecha, data) de las mediciones archivadas en [start, end]."""
+    for archive in archives_in_range(device_ids, start, end).select_related('device'):
+        month = ArchivedMonth.for_archive(archive)
+        for pk, date, data in month.rows(start, end):
+            yield archive, pk, date, data
+
+
+def restore_device_month(device_id, month, remove_files=False):
+    """
+    Devuelve a la base de datos un mes archivado (p. ej. para reprocesarlo con
+    las tareas que leen la tabla de mediciones). Las filas se insertan con el
+    mismo INSERT ... ON CONFLICT de la ingesta, por lo que reciben ids nuevos.
+
+    Returns:
+        Número de mediciones restauradas
+    """
+    from .ingest import upsert_measurements
+
+    month = _month_start(month)
+    archive = MeasurementArchive.objects.filter(device_id=device_id, month=month).first()
+    if archive is None:
+        return 0
+
+    stored = ArchivedMonth.for_archive(archive)
+    rows = [(date, data) for _, date, data in stored.rows()]
+    with transaction.atomic():
+        restored, _ = upsert_measurements(device_id, rows)
+        archive.delete()
+
+    if remove_files:
+        shutil.rmtree(stored.directory, ignore_errors=True)
+    logger.info(f"Restaurado {month:%Y-%m} del dispositivo {device_id}: {restored} mediciones.")
+    return restored
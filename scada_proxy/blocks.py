@@ -0,0 +1,415 @@
+"""
+Bloques diarios de mediciones empaquetados en arreglos.
+
+Cada medición cruda es una fila con su JSON (unas 720 por dispositivo y día
+con muestreo de 2 minutos). Al cerrar el día, sus mediciones se empaquetan en
+una sola fila de MeasurementDayBlock:
+
+- timestamps: segundos epoch (int64) codificados como diferencias, que con
+  muestreo regular se comprimen casi por completo.
+- values: matriz float64 (variables x muestras) con todas las variables
+  numéricas del JSON del día; NaN donde una medición no trae la variable.
+
+Ambos se comprimen con zlib. Un mes de un dispositivo se lee de ~30 filas en
+lugar de ~21.600. Si después llegan mediciones de un día ya empaquetado, la
+ingesta marca el bloque como desactualizado (is_stale) y la tarea nocturna lo
+rehace; mientras tanto el lector usa las mediciones crudas de ese día.
+
+Los bloques son una caché de lectura, no un formato de almacenamiento: las
+mediciones crudas se conservan (siguen siendo la fuente de verdad y las usan
+las vistas, la cobertura y los rollups), así que cada día empaquetado ocupa
+espacio adicional. Para reducir el tamaño de la tabla de mediciones está el
+archivo frío (MeasurementArchive), que sí retira las filas crudas.
+
+load_series() devuelve una DaySeries con arreglos NumPy para los motores de
+indicadores, combinando bloques y, donde falten, el archivo frío o las
+mediciones crudas. De las mediciones crudas solo se leen las variables
+pedidas: PostgreSQL extrae cada clave del JSON (o su columna tipada) y las
+filas se leen con un cursor del servidor, sin construir instancias del modelo
+ni deserializar el JSON completo en Python.
+"""
+
+import logging
+import zlib
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+import numpy as np
+import pytz
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, F, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Device, Measurement, MeasurementDayBlock, MEASUREMENT_TYPED_KEYS, to_local_date
+
+logger = logging.getLogger(__name__)
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+COMPRESSION_LEVEL = 6
+
+# Filas por lectura del cursor del servidor al cargar mediciones crudas
+RAW_CHUNK_SIZE = 5000
+
+
+def blocks_enabled():
+    """Empaquetar los días cerrados y leer de los bloques (SCADA_DAY_BLOCKS_ENABLED)."""
+    return getattr(settings, 'SCADA_DAY_BLOCKS_ENABLED', False)
+
+
+# -------------------------
+# Codificación
+# -------------------------
+def encode_timestamps(seconds):
+    """int64 epoch -> bytes: primer valor y diferencias sucesivas, comprimidos."""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    deltas = np.diff(seconds, prepend=np.int64(0))
+    return zlib.compress(deltas.astype('<i8').tobytes(), COMPRESSION_LEVEL)
+
+
+def decode_timestamps(blob):
+    deltas = np.frombuffer(zlib.decompress(bytes(blob)), dtype='<i8')
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+def encode_values(matrix):
+    """Matriz float64 (variables x muestras) -> bytes comprimidos."""
+    return zlib.compress(np.ascontiguousarray(matrix, dtype='<f8').tobytes(), COMPRESSION_LEVEL)
+
+
+def decode_values(blob, variable_count, sample_count):
+    values = np.frombuffer(zlib.decompress(bytes(blob)), dtype='<f8')
+    return values.reshape(variable_count, sample_count)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# -------------------------
+# Serie en memoria
+# -------------------------
+class DaySeries:
+    """
+    Serie de un dispositivo: `timestamps` (int64, segundos epoch, ordenados) y
+    `columns` (clave del JSON -> arreglo float64 alineado, NaN si falta).
+    """
+
+    def __init__(self, timestamps, columns):
+        self.timestamps = timestamps
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def get(self, key):
+        """Arreglo de una variable; todo NaN si la serie no la contiene."""
+        column = self.columns.get(key)
+        if column is None:
+            return np.full(len(self.timestamps), np.nan)
+        return column
+
+    def datetimes(self):
+        """Marcas de tiempo como datetime64[s] (UTC)."""
+        return self.timestamps.astype('datetime64[s]')
+
+    def local_dates(self):
+        """Día en hora Colombia de cada muestra, como datetime64[D]."""
+        offset = int(COLOMBIA_TZ.utcoffset(datetime(2000, 1, 1)).total_seconds())
+        return (self.timestamps + offset).astype('datetime64[s]').astype('datetime64[D]')
+
+    def between(self, start=None, end=None):
+        """Muestras con start <= fecha < end (datetimes aware; None = sin límite)."""
+        i = 0 if start is None else int(np.searchsorted(self.timestamps, start.timestamp(), side='left'))
+        j = len(self) if end is None else int(np.searchsorted(self.timestamps, end.timestamp(), side='left'))
+        if i == 0 and j == len(self):
+            return self
+        return DaySeries(self.timestamps[i:j], {key: column[i:j] for key, column in self.columns.items()})
+
+    @classmethod
+    def empty(cls, keys=None):
+        return cls(np.empty(0, dtype=np.int64), {key: np.empty(0) for key in keys or ()})
+
+
+def _series_from_rows(rows, keys=None):
+    """Construye una DaySeries a partir de tuplas (date, data) ordenadas por fecha."""
+    timestamps = []
+    collected = {}
+    for index, (date, data) in enumerate(rows):
+        timestamps.append(int(date.timestamp()))
+        for key, value in data.items():
+            if keys is not None and key not in keys:
+                continue
+            if not _is_number(value):
+                continue
+            column = collected.get(key)
+            if column is None:
+                column = collected[key] = {}
+            column[index] = float(value)
+
+    count = len(timestamps)
+    columns = {}
+    for key, points in collected.items():
+        column = np.full(count, np.nan)
+        column[list(points.keys())] = list(points.values())
+        columns[key] = column
+    return DaySeries(np.asarray(timestamps, dtype=np.int64), columns)
+
+
+def _key_expression(key):
+    """Valor float de una clave del JSON calculado en PostgreSQL (NULL si no es numérico)."""
+    column = MEASUREMENT_TYPED_KEYS.get(key)
+    if column is not None:
+        return F(column)
+    table = connection.ops.quote_name(Measurement._meta.db_table)
+    return RawSQL(
+        f"CASE WHEN jsonb_typeof({table}.data -> %s) = 'number' "
+        f"THEN ({table}.data ->> %s)::double precision END",
+        (key, key),
+        output_field=FloatField(),
+    )
+
+
+def _projected_series(queryset, keys):
+    """
+    DaySeries de las mediciones de `queryset` con solo las variables `keys`.
+    Cada fila llega como (epoch, valor, ...) ya numérica y se convierte a
+    arreglos por bloques de RAW_CHUNK_SIZE filas.
+    """
+    keys = sorted(keys)
+    table = connection.ops.quote_name(Measurement._meta.db_table)
+    annotations = {f'value_{index}': _key_expression(key) for index, key in enumerate(keys)}
+    rows = (
+        queryset
+        .annotate(
+            epoch=RawSQL(f"floor(extract(epoch FROM {table}.date))::bigint", (), output_field=BigIntegerField()),
+            **annotations,
+        )
+        .order_by('date')
+        .values_list('epoch', *annotations)
+        .iterator(chunk_size=RAW_CHUNK_SIZE)
+    )
+
+    chunks = []
+    while True:
+        chunk = list(islice(rows, RAW_CHUNK_SIZE))
+        if not chunk:
+            break
+        # None (clave ausente o no numérica) pasa a NaN
+        chunks.append(np.array(chunk, dtype=np.float64).reshape(len(chunk), len(keys) + 1))
+    if not chunks:
+        return DaySeries.empty(keys)
+
+    matrix = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+    timestamps = matrix[:, 0].astype(np.int64)
+    return DaySeries(timestamps, {key: np.ascontiguousarray(matrix[:, index + 1]) for index, key in enumerate(keys)})
+
+
+def _raw_series(queryset, keys=None):
+    """DaySeries de un queryset de mediciones crudas."""
+    if keys is not None and connection.vendor == 'postgresql':
+        return _projected_series(queryset, keys)
+    rows = queryset.order_by('date').values_list('date', 'data').iterator(chunk_size=RAW_CHUNK_SIZE)
+    return _series_from_rows(rows, keys)
+
+
+def _series_from_block(block, keys=None):
+    timestamps = decode_timestamps(block.timestamps)
+    matrix = decode_values(block.values, len(block.variables), block.sample_count)
+    columns = {
+        key: matrix[row]
+        for row, key in enumerate(block.variables)
+        if keys is None or key in keys
+    }
+    return DaySeries(timestamps, columns)
+
+
+def _concat(parts, keys=None):
+    """Une varias DaySeries y las ordena por marca de tiempo."""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return DaySeries.empty(keys)
+    if len(parts) == 1:
+        return parts[0]
+
+    all_keys = set()
+    for part in parts:
+        all_keys.update(part.columns)
+    timestamps = np.concatenate([part.timestamps for part in parts])
+    order = np.argsort(timestamps, kind='stable')
+    columns = {
+        key: np.concatenate([part.get(key) for part in parts])[order]
+        for key in all_keys
+    }
+    return DaySeries(timestamps[order], columns)
+
+
+# -------------------------
+# Escritura
+# -------------------------
+def _raw_day_rows(device_id, day):
+    return (
+        Measurement.objects.for_local_day(day)
+        .filter(device_id=device_id)
+        .order_by('date')
+        .values_list('date', 'data')
+        .iterator(chunk_size=2000)
+    )
+
+
+def pack_device_day(device_id, day):
+    """
+    Empaqueta las mediciones de un dispositivo en un día (hora Colombia).
+    Las mediciones crudas no se tocan: el bloque es una copia para leer el
+    día de una vez. Es idempotente. Devuelve el bloque, o None si el día no
+    tiene mediciones.
+    """
+    series = _series_from_rows(_raw_day_rows(device_id, day))
+    if not len(series):
+        return None
+
+    variables = sorted(series.columns)
+    matrix = np.vstack([series.columns[key] for key in variables]) if variables else np.empty((0, len(series)))
+
+    block, _ = MeasurementDayBlock.objects.update_or_create(
+        device_id=device_id,
+        local_date=day,
+        defaults={
+            'sample_count': len(series),
+            'variables': variables,
+            'timestamps': encode_timestamps(series.timestamps),
+            'values': encode_values(matrix),
+            'is_stale': False,
+        }
+    )
+    return block
+
+
+def pack_closed_days(device_ids=None, lookback_days=None, today=None):
+    """
+    Empaqueta los días cerrados (anteriores a hoy, hora Colombia) de los
+    últimos lookback_days que aún no tienen bloque o cuyo bloque está
+    desactualizado.
+
+    Returns:
+        Dict con 'packed', 'empty' y 'failed' (lista de (device_id, día, error))
+    """
+    if lookback_days is None:
+        lookback_days = getattr(settings, 'SCADA_DAY_BLOCKS_LOOKBACK_DAYS', 7)
+    today = today or timezone.now().astimezone(COLOMBIA_TZ).date()
+    last_day = today - timedelta(days=1)
+    first_day = today - timedelta(days=lookback_days)
+
+    if device_ids is None:
+        device_ids = list(Device.objects.filter(is_active=True).values_list('id', flat=True))
+
+    fresh = set(
+        MeasurementDayBlock.objects.filter(
+            device_id__in=device_ids,
+            local_date__range=(first_day, last_day),
+            is_stale=False,
+        ).values_list('device_id', 'local_date')
+    )
+
+    summary = {'packed': 0, 'empty': 0, 'failed': []}
+    for device_id in device_ids:
+        day = first_day
+        while day <= last_day:
+            if (device_id, day) not in fresh:
+                try:
+                    with transaction.atomic():
+                        block = pack_device_day(device_id, day)
+                    if block is None:
+                        summary['empty'] += 1
+                    else:
+                        summary['packed'] += 1
+                except Exception as e:
+                    logger.error(f"Error empaquetando el día {day} del dispositivo {device_id}: {e}", exc_info=True)
+                    summary['failed'].append((device_id, day, str(e)))
+            day += timedelta(days=1)
+
+    logger.info(
+        f"Bloques diarios: {summary['packed']} empaquetados, {summary['empty']} días sin datos, "
+        f"{len(summary['failed'])} fallidos ({first_day} a {last_day})."
+    )
+    return summary
+
+
+def mark_stale(device_id, start, end):
+    """Marca como desactualizados los bloques de los días que contienen [start, end]."""
+    return MeasurementDayBlock.objects.filter(
+        device_id=device_id,
+        local_date__range=(to_local_date(start), to_local_date(end)),
+        is_stale=False,
+    ).update(is_stale=True)
+
+
+# -------------------------
+# Lectura
+# -------------------------
+def load_series(device, start, end, keys=None):
+    """
+    Serie de un dispositivo (instancia o ID) entre `start` y `end`:
+
+    - con fechas (date), los días entre ambas inclusive (hora Colombia);
+    - con datetimes aware, las muestras con start <= fecha < end.
+
+    Usa los bloques vigentes y, para los días sin bloque (o desactualizado),
+    el archivo frío si el mes está archivado o, si no, las mediciones crudas.
+    Con `keys` solo se devuelven esas variables (todo NaN si no hay datos).
+    """
+    device_id = device.pk if isinstance(device, Device) else device
+    first_day, last_day = to_local_date(start), to_local_date(end)
+    bounds = None
+    if isinstance(start, datetime) and isinstance(end, datetime):
+        bounds = (start, end)
+        if end == COLOMBIA_TZ.localize(datetime.combine(last_day, time.min)) and last_day > first_day:
+            last_day -= timedelta(days=1)
+    keys = set(keys) if keys is not None else None
+
+    parts = []
+    covered = set()
+    if blocks_enabled():
+        blocks = MeasurementDayBlock.objects.filter(
+            device_id=device_id,
+            local_date__range=(first_day, last_day),
+            is_stale=False,
+        ).order_by('local_date')
+        for block in blocks:
+            parts.append(_series_from_block(block, keys))
+            covered.add(block.local_date)
+
+    # Los meses archivados en disco (ver archive.py) ya no están en la tabla
+    from .archive import archives_in_range, ArchivedMonth
+    day_start = COLOMBIA_TZ.localize(datetime.combine(first_day, time.min))
+    day_end = COLOMBIA_TZ.localize(datetime.combine(last_day + timedelta(days=1), time.min)) - timedelta(seconds=1)
+    archived_months = set()
+    for archive in archives_in_range([device_id], day_start, day_end):
+        archived_months.add(archive.month)
+        series = ArchivedMonth.for_archive(archive).series(day_start, day_end, keys)
+        if covered and len(series):
+            keep = ~np.isin(series.local_dates(), np.array(sorted(covered), dtype='datetime64[D]'))
+            series = DaySeries(series.timestamps[keep], {key: column[keep] for key, column in series.columns.items()})
+        parts.append(series)
+
+    missing = []
+    day = first_day
+    while day <= last_day:
+        if day not in covered and day.replace(day=1) not in archived_months:
+            missing.append(day)
+        day += timedelta(days=1)
+
+    if missing:
+        queryset = Measurement.objects.for_local_days(missing[0], missing[-1]).filter(device_id=device_id)
+        if len(missing) < (missing[-1] - missing[0]).days + 1:
+            queryset = queryset.filter(local_date__in=missing)
+        if bounds is not None:
+            queryset = queryset.in_range(*bounds)
+        parts.append(_raw_series(queryset, keys))
+
+    series = _concat(parts, keys)
+    if bounds is not None:
+        series = series.between(*bounds)
+    return series
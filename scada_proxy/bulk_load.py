@@ -0,0 +1,447 @@
+"""
+Carga masiva de exportaciones históricas (CSV o Excel) en la tabla de mediciones.
+
+Al incorporar una institución llegan meses de lecturas exportadas desde SCADA
+o desde el propio equipo. Pedirlas por la API supone días de paginación; este
+módulo las carga directamente:
+
+1. Lee el archivo fila a fila (csv o openpyxl en modo read_only), sin cargarlo
+   entero en memoria.
+2. Asigna cada columna a una clave de Measurement.data según la categoría del
+   dispositivo (ColumnMapper).
+3. Por bloques de chunk_size filas: COPY a una tabla temporal y un único
+   INSERT ... SELECT ... ON CONFLICT (device_id, date) contra la tabla de
+   mediciones. El JSON existente se combina con el cargado (data || nuevo),
+   de modo que una exportación con menos variables no borra las que ya
+   trajo la API.
+4. En la misma transacción se actualizan el último estado, la cobertura diaria
+   y los bloques desactualizados; después, los rollups. El cursor de ingesta
+   no se toca: la carga de un rango no debe hacer que la ingesta salte huecos.
+
+Las filas de meses ya archivados en disco (MeasurementArchive) se omiten: hay
+que restaurar el mes antes de cargar en él.
+"""
+
+import csv
+import io
+import json
+import logging
+import math
+import re
+import time
+import unicodedata
+from datetime import datetime
+
+import pytz
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .blocks import mark_stale
+from .coverage import refresh_day_coverage
+from .ingest import update_latest_state
+from .models import (
+    Device, DeviceLatestState, Measurement, MeasurementArchive,
+    MEASUREMENT_TYPED_FIELDS, MEASUREMENT_INDEXED_JSON_KEYS,
+    extract_typed_values, to_local_date,
+)
+from .rollups import refresh_rollups, rollups_enabled
+
+logger = logging.getLogger(__name__)
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Encabezados habituales de la fecha/hora (normalizados)
+TIME_HEADERS = ['date', 'fecha', 'timestamp', 'datetime', 'fechahora', 'time']
+
+# Encabezados en español de las exportaciones -> clave del JSON, por categoría.
+# Los encabezados que coinciden con la clave (p. ej. "Total Active Power (kW)")
+# se asignan sin necesidad de alias.
+CATEGORY_COLUMN_ALIASES = {
+    'electricMeter': {
+        'potenciaactivatotal': 'totalActivePower',
+        'potenciareactiva': 'reactivePower',
+        'potenciaaparente': 'apparentPower',
+        'factordepotencia': 'totalPowerFactor',
+        'energiaimportadabaja': 'importedActivePowerLow',
+        'energiaimportadaalta': 'importedActivePowerHigh',
+        'energiaexportadabaja': 'exportedActivePowerLow',
+        'energiaexportadaalta': 'exportedActivePowerHigh',
+        'voltajefasea': 'voltagePhaseA',
+        'voltajefaseb': 'voltagePhaseB',
+        'voltajefasec': 'voltagePhaseC',
+        'corrientefasea': 'currentPhaseA',
+        'corrientefaseb': 'currentPhaseB',
+        'corrientefasec': 'currentPhaseC',
+    },
+    'inverter': {
+        'potenciaac': 'acPower',
+        'potenciadc': 'dcPower',
+        'frecuenciaac': 'acFrequency',
+        'factordepotencia': 'powerFactor',
+    },
+    'weatherStation': {
+        'irradiancia': 'irradiance',
+        'temperatura': 'temperature',
+        'humedad': 'humidity',
+        'humedadrelativa': 'humidity',
+        'velocidaddelviento': 'windSpeed',
+        'velocidadviento': 'windSpeed',
+        'direcciondelviento': 'windDirection',
+        'direccionviento': 'windDirection',
+        'precipitacion': 'precipitation',
+    },
+}
+
+
+def normalize_header(header):
+    """Minúsculas, sin tildes, sin unidades entre paréntesis/corchetes ni separadores."""
+    text = unicodedata.normalize('NFKD', str(header or ''))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[\(\[].*?[\)\]]', '', text)
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+class ColumnMapper:
+    """
+    Asigna los encabezados del archivo a claves de Measurement.data para cada
+    categoría de dispositivo. Las claves conocidas de una categoría son las
+    columnas tipadas, las claves indexadas, las de CATEGORY_COLUMN_ALIASES y
+    las que ya envían sus dispositivos (DeviceLatestState); `overrides`
+    ({encabezado: clave}) tiene prioridad.
+    """
+
+    def __init__(self, headers, overrides=None):
+        self.headers = list(headers)
+        self.overrides = {normalize_header(header): key for header, key in (overrides or {}).items()}
+        self._by_category = {}
+
+    def _known_keys(self, category_id):
+        keys = set(MEASUREMENT_TYPED_FIELDS.values()) | set(MEASUREMENT_INDEXED_JSON_KEYS)
+        keys.update(key for aliases in CATEGORY_COLUMN_ALIASES.values() for key in aliases.values())
+        for data in DeviceLatestState.objects.filter(device__category_id=category_id).values_list('data', flat=True):
+            keys.update(data or {})
+        return keys
+
+    def for_device(self, device):
+        """{índice de columna: clave del JSON} para la categoría del dispositivo."""
+        mapping = self._by_category.get(device.category_id)
+        if mapping is None:
+            known = {normalize_header(key): key for key in self._known_keys(device.category_id)}
+            aliases = CATEGORY_COLUMN_ALIASES.get(device.category.name if device.category_id else None, {})
+            mapping = {}
+            for index, header in enumerate(self.headers):
+                normalized = normalize_header(header)
+                key = self.overrides.get(normalized) or aliases.get(normalized) or known.get(normalized)
+                if key:
+                    mapping[index] = key
+            self._by_category[device.category_id] = mapping
+        return mapping
+
+    def unmapped(self, device, ignore=()):
+        mapping = self.for_device(device)
+        return [
+            header for index, header in enumerate(self.headers)
+            if index not in mapping and index not in ignore
+        ]
+
+
+# -------------------------
+# Lectura de archivos
+# -------------------------
+def iter_file_rows(path, sheet=None, delimiter=None, encoding='utf-8-sig'):
+    """
+    Devuelve (encabezados, iterador de filas) de un CSV o Excel (.xlsx).
+    Los CSV detectan el separador (',', ';' o tabulador) si no se indica.
+    """
+    if str(path).lower().endswith(('.xlsx', '.xlsm')):
+        return _iter_excel_rows(path, sheet)
+
+    handle = open(path, newline='', encoding=encoding)
+    if delimiter is None:
+        sample = handle.read(64 * 1024)
+        handle.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+        except csv.Error:
+            delimiter = ','
+    reader = csv.reader(handle, delimiter=delimiter)
+    headers = next(reader, [])
+
+    def rows():
+        with handle:
+            yield from reader
+    return headers, rows()
+
+
+def _iter_excel_rows(path, sheet=None):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError("openpyxl no está instalado: exporte el archivo a CSV o instale openpyxl.")
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    worksheet = workbook[sheet] if sheet else workbook.active
+    iterator = worksheet.iter_rows(values_only=True)
+    headers = [str(value) if value is not None else '' for value in next(iterator, ())]
+
+    def rows():
+        try:
+            yield from iterator
+        finally:
+            workbook.close()
+    return headers, rows()
+
+
+def find_time_column(headers):
+    normalized = [normalize_header(header) for header in headers]
+    for candidate in TIME_HEADERS:
+        if candidate in normalized:
+            return normalized.index(candidate)
+    return None
+
+
+def parse_timestamp(value, time_format=None, tz=COLOMBIA_TZ):
+    """Fecha/hora aware de una celda; las fechas sin zona se interpretan en `tz`."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif time_format:
+        parsed = datetime.strptime(str(value).strip(), time_format)
+    else:
+        parsed = parse_datetime(str(value).strip().replace('/', '-'))
+        if parsed is None:
+            raise ValueError(f"Fecha no reconocida: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = tz.localize(parsed)
+    return parsed
+
+
+def parse_number(value, decimal='.'):
+    """Valor numérico de una celda, o None si está vacía o no es numérica."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    text = str(value).strip()
+    if not text:
+        return None
+    if decimal != '.':
+        text = text.replace('.', '').replace(decimal, '.')
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+# -------------------------
+# Escritura
+# -------------------------
+STAGE_TABLE = 'measurement_load_stage'
+STAGE_COLUMNS = ['device_id', 'date', 'local_date', 'data'] + list(MEASUREMENT_TYPED_FIELDS)
+
+
+def _copy_to_stage(cursor, rows):
+    """Crea la tabla temporal de la transacción y la llena con COPY."""
+    typed_definitions = ', '.join(f'{column} double precision' for column in MEASUREMENT_TYPED_FIELDS)
+    cursor.execute(
+        f"CREATE TEMP TABLE {STAGE_TABLE} (device_id bigint, date timestamptz, local_date date, "
+        f"data jsonb, {typed_definitions}) ON COMMIT DROP"
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for (device_id, dt), data in rows.items():
+        typed = extract_typed_values(data)
+        writer.writerow(
+            [device_id, dt.isoformat(), to_local_date(dt).isoformat(), json.dumps(data, separators=(',', ':'))]
+            + ['' if typed[column] is None else repr(typed[column]) for column in MEASUREMENT_TYPED_FIELDS]
+        )
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {STAGE_TABLE} ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _merge_stage(cursor):
+    """
+    INSERT ... SELECT de la tabla temporal a la de mediciones. Devuelve
+    (creadas, actualizadas); las filas cuyo JSON combinado no cambia no se
+    reescriben.
+    """
+    table = connection.ops.quote_name(Measurement._meta.db_table)
+    columns = ', '.join(STAGE_COLUMNS)
+    updates = ', '.join(
+        [f'data = {table}.data || EXCLUDED.data', 'local_date = EXCLUDED.local_date']
+        + [f'{column} = COALESCE(EXCLUDED.{column}, {table}.{column})' for column in MEASUREMENT_TYPED_FIELDS]
+    )
+    cursor.execute(
+        f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {STAGE_TABLE} "
+        f"ON CONFLICT (device_id, date) DO UPDATE SET {updates} "
+        f"WHERE {table}.data IS DISTINCT FROM {table}.data || EXCLUDED.data "
+        f"RETURNING (xmax = 0) AS inserted"
+    )
+    results = [inserted for (inserted,) in cursor.fetchall()]
+    created = sum(1 for inserted in results if inserted)
+    return created, len(results) - created
+
+
+def load_chunk(rows):
+    """
+    Carga un bloque {(device_id, fecha): data} y actualiza los datos derivados
+    de los dispositivos y días tocados.
+
+    Returns:
+        Tupla (creadas, actualizadas)
+    """
+    if not rows:
+        return 0, 0
+
+    touched = {}
+    for (device_id, dt), data in rows.items():
+        info = touched.setdefault(device_id, {'first': dt, 'last': dt, 'latest': data, 'days': set()})
+        if dt < info['first']:
+            info['first'] = dt
+        if dt >= info['last']:
+            info['last'], info['latest'] = dt, data
+        info['days'].add(to_local_date(dt))
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            _copy_to_stage(cursor, rows)
+            created, updated = _merge_stage(cursor)
+        for device_id, info in touched.items():
+            update_latest_state(device_id, info['last'], info['latest'])
+            for day in sorted(info['days']):
+                refresh_day_coverage(device_id, day)
+            if created or updated:
+                mark_stale(device_id, info['first'], info['last'])
+
+    if rollups_enabled():
+        for device_id, info in touched.items():
+            refresh_rollups(device_id, info['first'], info['last'])
+
+    return created, updated
+
+
+class MeasurementFileLoader:
+    """
+    Carga uno o varios archivos por bloques. Cada fila se asigna a un
+    dispositivo fijo (`device`) o al de la columna `device_column` (scada_id o
+    ID local).
+    """
+
+    def __init__(self, device=None, device_column=None, time_column=None, time_format=None,
+                 tz=COLOMBIA_TZ, decimal='.', overrides=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 dry_run=False, progress=None):
+        if connection.vendor != 'postgresql' and not dry_run:
+            raise RuntimeError("La carga masiva con COPY solo está disponible en PostgreSQL.")
+        if device is None and device_column is None:
+            raise ValueError("Indique un dispositivo o la columna con el dispositivo de cada fila.")
+        self.device = device
+        self.device_column = device_column
+        self.time_column = time_column
+        self.time_format = time_format
+        self.tz = tz
+        self.decimal = decimal
+        self.overrides = overrides or {}
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.progress = progress or (lambda summary: None)
+        self._devices = {}
+        self._started = time.monotonic()
+        self._archived = set(
+            (device_id, month.year, month.month)
+            for device_id, month in MeasurementArchive.objects.values_list('device_id', 'month')
+        )
+        self.summary = {
+            'read': 0, 'loaded': 0, 'created': 0, 'updated': 0,
+            'skipped': 0, 'archived': 0, 'unmapped': {}, 'errors': [],
+        }
+
+    def _resolve_device(self, identifier):
+        identifier = str(identifier or '').strip()
+        if identifier not in self._devices:
+            device = Device.objects.select_related('category').filter(scada_id=identifier).first()
+            if device is None and identifier.isdigit():
+                device = Device.objects.select_related('category').filter(id=int(identifier)).first()
+            self._devices[identifier] = device
+        return self._devices[identifier]
+
+    def load_file(self, path, sheet=None, delimiter=None):
+        headers, rows = iter_file_rows(path, sheet=sheet, delimiter=delimiter)
+        time_index = self._column_index(headers, self.time_column) if self.time_column else find_time_column(headers)
+        if time_index is None:
+            raise ValueError(f"{path}: no se encontró la columna de fecha; indíquela con time_column.")
+        device_index = self._column_index(headers, self.device_column) if self.device_column else None
+        ignore = {time_index} | ({device_index} if device_index is not None else set())
+        mapper = ColumnMapper(headers, self.overrides)
+
+        chunk = {}
+        for line, row in enumerate(rows, start=2):
+            self.summary['read'] += 1
+            device = self.device if device_index is None else self._resolve_device(_cell(row, device_index))
+            if device is None:
+                self._skip(path, line, f"dispositivo desconocido: {_cell(row, device_index)!r}")
+                continue
+            try:
+                dt = parse_timestamp(_cell(row, time_index), self.time_format, self.tz)
+            except ValueError as e:
+                self._skip(path, line, str(e))
+                continue
+            if dt is None:
+                self._skip(path, line, "fecha vacía")
+                continue
+
+            local_day = to_local_date(dt)
+            if (device.id, local_day.year, local_day.month) in self._archived:
+                self.summary['archived'] += 1
+                continue
+
+            mapping = mapper.for_device(device)
+            if device.id not in self.summary['unmapped']:
+                self.summary['unmapped'][device.id] = mapper.unmapped(device, ignore)
+            data = {}
+            for index, key in mapping.items():
+                value = parse_number(_cell(row, index), self.decimal)
+                if value is not None:
+                    data[key] = value
+            if not data:
+                self._skip(path, line, "sin valores numéricos en las columnas asignadas")
+                continue
+
+            # Si el archivo repite una fecha, prevalece la última fila
+            chunk[(device.id, dt)] = {**chunk.get((device.id, dt), {}), **data}
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = {}
+        self._flush(chunk)
+        return self.summary
+
+    def _flush(self, chunk):
+        if not chunk:
+            return
+        if not self.dry_run:
+            created, updated = load_chunk(chunk)
+            self.summary['created'] += created
+            self.summary['updated'] += updated
+        self.summary['loaded'] += len(chunk)
+        elapsed = time.monotonic() - self._started
+        self.progress({**self.summary, 'elapsed': elapsed})
+
+    def _skip(self, path, line, reason):
+        self.summary['skipped'] += 1
+        if len(self.summary['errors']) < 100:
+            self.summary['errors'].append(f"{path}:{line}: {reason}")
+
+    @staticmethod
+    def _column_index(headers, name):
+        normalized = [normalize_header(header) for header in headers]
+        target = normalize_header(name)
+        if target not in normalized:
+            raise ValueError(f"La columna {name!r} no está en el archivo.")
+        return normalized.index(target)
+
+
+def _cell(row, index):
+    return row[index] if index < len(row) else None
@@ -0,0 +1,269 @@
+"""
+Cobertura de mediciones por dispositivo y día (hora Colombia).
+
+SCADA muestrea cada 2 minutos: un día son 720 intervalos. Por cada
+dispositivo y día se guarda un mapa de 720 bits con los intervalos que tienen
+al menos una medición, el número de mediciones y la primera y última fecha
+(DeviceDayCoverage). La ingesta lo recalcula para los días de cada página.
+
+Sirve para:
+- saltar días vacíos en los recálculos sin consultar Measurement
+  (covered_days; se activa con SCADA_COVERAGE_READ una vez reconstruido el
+  histórico con el comando measurement_coverage --rebuild);
+- localizar los huecos y pedirlos de nuevo a SCADA (missing_windows y la
+  tarea backfill_measurement_gaps);
+- informar de la completitud de los datos (completeness).
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Measurement, DeviceDayCoverage, to_local_date
+
+logger = logging.getLogger(__name__)
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+SLOT_SECONDS = 120
+SLOTS_PER_DAY = 24 * 60 * 60 // SLOT_SECONDS  # 720
+BITMAP_BYTES = SLOTS_PER_DAY // 8  # 90
+
+
+def coverage_readable():
+    """Usar la cobertura para saltar días vacíos (SCADA_COVERAGE_READ)."""
+    return getattr(settings, 'SCADA_COVERAGE_READ', False)
+
+
+def _day_start(day):
+    return COLOMBIA_TZ.localize(datetime.combine(day, time.min))
+
+
+def _days(first_day, last_day):
+    day = first_day
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
+
+# -------------------------
+# Mapa de bits
+# -------------------------
+def slot_of(value, day_start):
+    """Intervalo de 2 minutos (0-719) de una fecha dentro de su día."""
+    slot = int((value - day_start).total_seconds()) // SLOT_SECONDS
+    return min(max(slot, 0), SLOTS_PER_DAY - 1)
+
+
+def build_bitmap(dates, day):
+    """Mapa de bits (int) de los intervalos de `day` que contienen alguna de `dates`."""
+    day_start = _day_start(day)
+    bitmap = 0
+    for value in dates:
+        bitmap |= 1 << slot_of(value, day_start)
+    return bitmap
+
+
+def bitmap_to_bytes(bitmap):
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def bitmap_from_bytes(value):
+    return int.from_bytes(bytes(value), 'little') if value else 0
+
+
+def _coverage_values(day, dates):
+    bitmap = build_bitmap(dates, day)
+    return {
+        'slots': bitmap_to_bytes(bitmap),
+        'slot_count': bin(bitmap).count('1'),
+        'sample_count': len(dates),
+        'first_date': min(dates),
+        'last_date': max(dates),
+    }
+
+
+# -------------------------
+# Escritura
+# -------------------------
+def refresh_day_coverage(device_id, day):
+    """
+    Recalcula la cobertura de un dispositivo en un día a partir de Measurement.
+
+    La fila de cobertura se bloquea antes de leer las fechas: dos ventanas de
+    ingesta del mismo dispositivo pueden tocar el mismo día y, sin el bloqueo,
+    cada una escribiría el mapa calculado con su propia foto de Measurement,
+    perdiendo los intervalos de la otra. Con el bloqueo la segunda espera a
+    que la primera confirme y lee también sus mediciones.
+    """
+    with transaction.atomic():
+        coverage, _ = DeviceDayCoverage.objects.select_for_update().get_or_create(
+            device_id=device_id,
+            local_date=day,
+            defaults={'slots': bitmap_to_bytes(0)},
+        )
+        dates = list(
+            Measurement.objects.for_local_day(day)
+            .filter(device_id=device_id)
+            .values_list('date', flat=True)
+        )
+        if not dates:
+            coverage.delete()
+            return None
+
+        for field, value in _coverage_values(day, dates).items():
+            setattr(coverage, field, value)
+        coverage.save()
+    return coverage
+
+
+def refresh_coverage(device_id, start, end):
+    """Recalcula la cobertura de los días (hora Colombia) que contienen [start, end]."""
+    for day in _days(to_local_date(start), to_local_date(end)):
+        refresh_day_coverage(device_id, day)
+
+
+def rebuild_coverage(device_id, first_day=None, last_day=None):
+    """
+    Reconstruye la cobertura de un dispositivo con una sola lectura ordenada de
+    sus fechas de medición (sin rango: todo su histórico en la tabla).
+
+    Returns:
+        Número de días con mediciones
+    """
+    qs = Measurement.objects.filter(device_id=device_id)
+    if first_day is not None and last_day is not None:
+        qs = Measurement.objects.for_local_days(first_day, last_day).filter(device_id=device_id)
+
+    per_day = {}
+    for value in qs.order_by('date').values_list('date', flat=True).iterator(chunk_size=5000):
+        per_day.setdefault(to_local_date(value), []).append(value)
+
+    with transaction.atomic():
+        existing = DeviceDayCoverage.objects.filter(device_id=device_id)
+        if first_day is not None and last_day is not None:
+            existing = existing.filter(local_date__range=(first_day, last_day))
+        existing.delete()
+        DeviceDayCoverage.objects.bulk_create(
+            [
+                DeviceDayCoverage(device_id=device_id, local_date=day, **_coverage_values(day, dates))
+                for day, dates in per_day.items()
+            ],
+            batch_size=1000,
+        )
+    return len(per_day)
+
+
+# -------------------------
+# Lectura
+# -------------------------
+def coverage_map(device_ids, first_day, last_day):
+    """{(device_id, día): DeviceDayCoverage} de los días con mediciones."""
+    return {
+        (coverage.device_id, coverage.local_date): coverage
+        for coverage in DeviceDayCoverage.objects.filter(
+            device_id__in=device_ids,
+            local_date__range=(first_day, last_day),
+        )
+    }
+
+
+def covered_days(device_id, first_day, last_day):
+    """
+    Días con mediciones de un dispositivo entre dos días inclusive, o None si
+    la cobertura no está habilitada para lectura (hay que consultar Measurement).
+    """
+    if not coverage_readable():
+        return None
+    return set(
+        DeviceDayCoverage.objects.filter(
+            device_id=device_id,
+            local_date__range=(to_local_date(first_day), to_local_date(last_day)),
+            sample_count__gt=0,
+        ).values_list('local_date', flat=True)
+    )
+
+
+def _expected_slots(day, now):
+    """Intervalos que ya deberían tener datos: todos en días pasados, los transcurridos hoy."""
+    day_start = _day_start(day)
+    if now >= day_start + timedelta(days=1):
+        return SLOTS_PER_DAY
+    if now <= day_start:
+        return 0
+    return slot_of(now, day_start)
+
+
+def missing_windows(device_id, first_day, last_day, until=None, min_gap_slots=1):
+    """
+    Huecos (intervalos de 2 minutos sin mediciones) de un dispositivo entre dos
+    días, sin pasar de `until` (por defecto, ahora). Los huecos contiguos se
+    unen aunque crucen la medianoche.
+
+    Returns:
+        Lista de tuplas (desde, hasta) aware, con hasta exclusivo
+    """
+    first_day, last_day = to_local_date(first_day), to_local_date(last_day)
+    until = until or timezone.now()
+    bitmaps = {
+        day: bitmap_from_bytes(slots)
+        for day, slots in DeviceDayCoverage.objects.filter(
+            device_id=device_id,
+            local_date__range=(first_day, last_day),
+        ).values_list('local_date', 'slots')
+    }
+
+    windows = []
+    gap_start = None
+    for day in _days(first_day, last_day):
+        day_start = _day_start(day)
+        bitmap = bitmaps.get(day, 0)
+        for slot in range(_expected_slots(day, until)):
+            slot_start = day_start + timedelta(seconds=slot * SLOT_SECONDS)
+            if not (bitmap >> slot) & 1:
+                if gap_start is None:
+                    gap_start = slot_start
+            elif gap_start is not None:
+                windows.append((gap_start, slot_start))
+                gap_start = None
+    if gap_start is not None:
+        windows.append((gap_start, min(until, _day_start(last_day + timedelta(days=1)))))
+
+    min_gap = timedelta(seconds=min_gap_slots * SLOT_SECONDS)
+    return [(start, end) for start, end in windows if end - start >= min_gap]
+
+
+def completeness(device_ids, first_day, last_day, now=None):
+    """
+    Completitud por dispositivo y día.
+
+    Returns:
+        Dict {device_id: lista de dicts con date, samples, slots, expected_slots,
+        completeness (0-1), first_date y last_date}
+    """
+    first_day, last_day = to_local_date(first_day), to_local_date(last_day)
+    now = now or timezone.now()
+    coverage = coverage_map(device_ids, first_day, last_day)
+
+    result = {}
+    for device_id in device_ids:
+        days = []
+        for day in _days(first_day, last_day):
+            expected = _expected_slots(day, now)
+            item = coverage.get((device_id, day))
+            slots = item.slot_count if item else 0
+            days.append({
+                'date': day,
+                'samples': item.sample_count if item else 0,
+                'slots': slots,
+                'expected_slots': expected,
+                'completeness': min(1.0, slots / expected) if expected else None,
+                'first_date': item.first_date if item else None,
+                'last_date': item.last_date if item else None,
+            })
+        result[device_id] = days
+    return result
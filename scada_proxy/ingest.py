@@ -0,0 +1,496 @@
+"""
+Escritura por lotes de mediciones SCADA.
+
+Cada página devuelta por la API SCADA se escribe con una sola sentencia
+INSERT ... ON CONFLICT (device_id, date) DO UPDATE en lugar de un
+update_or_create por fila, y en la misma transacción se avanza el cursor
+de ingesta del dispositivo.
+
+ingest_device_range encapsula la descarga paginada de un dispositivo
+(solapando la descarga de la página siguiente con la escritura de la actual)
+e ingest_devices_concurrently la ejecuta para muchos dispositivos en un pool
+de hilos, compartiendo la sesión HTTP y el limitador de tasa del cliente.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import pytz
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone as dj_timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import make_aware, is_naive
+
+from .models import (
+    Measurement, MeasurementArchive, DeviceIngestCursor, DeviceLatestState, MEASUREMENT_TYPED_FIELDS,
+    extract_typed_values, to_local_date,
+)
+from .blocks import mark_stale
+from .coverage import refresh_coverage
+from .rollups import refresh_rollups, rollups_enabled
+from .scada_client import prefetch_pages
+
+logger = logging.getLogger(__name__)
+
+# Zona horaria de Colombia
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+# Máximo de filas por sentencia INSERT (15 parámetros por fila)
+BULK_UPSERT_BATCH_SIZE = 1000
+
+# Filas por sentencia UPDATE al rellenar las columnas tipadas
+TYPED_BACKFILL_BATCH_SIZE = 50000
+
+# Tamaño de página al pedir mediciones a SCADA
+SCADA_PAGE_SIZE = 1000
+
+
+def parse_measurement_entry(measurement_entry):
+    """
+    Convierte una medición cruda de la API SCADA en una tupla (fecha, datos).
+    Devuelve None si la medición está incompleta o la fecha es inválida.
+    """
+    date_str = measurement_entry.get('date')
+    data_dict = measurement_entry.get('data', {})
+
+    if not date_str or not data_dict:
+        logger.warning(f"Medición incompleta: {measurement_entry}")
+        return None
+
+    dt = parse_datetime(date_str)
+    if dt is None:
+        logger.warning(f"Fecha inválida: {date_str}")
+        return None
+
+    if is_naive(dt):  # Hacer aware si está en naive
+        dt = make_aware(dt, timezone=COLOMBIA_TZ)
+    else:
+        # Convertir a zona horaria de Colombia si ya tiene timezone
+        dt = dt.astimezone(COLOMBIA_TZ)
+
+    return dt, data_dict
+
+
+def parse_measurement_page(measurements_data):
+    """
+    Parsea una página completa de mediciones.
+    Devuelve una lista de (fecha, datos) sin fechas repetidas: si la API
+    devuelve dos veces la misma fecha se conserva la última, igual que
+    haría una secuencia de update_or_create.
+    """
+    rows = {}
+    for measurement_entry in measurements_data:
+        parsed = parse_measurement_entry(measurement_entry)
+        if parsed is not None:
+            rows[parsed[0]] = parsed[1]
+    return list(rows.items())
+
+
+def upsert_measurements(device_id, rows):
+    """
+    Inserta o actualiza un lote de mediciones de un dispositivo.
+
+    Args:
+        device_id: ID local (Django) del dispositivo
+        rows: lista de tuplas (fecha aware, dict de datos) sin fechas repetidas
+
+    Returns:
+        Tupla (creadas, actualizadas). Las actualizadas incluyen las filas que ya
+        existían aunque su contenido no haya cambiado, como con update_or_create.
+    """
+    if not rows:
+        return 0, 0
+
+    if connection.vendor != 'postgresql':
+        return _upsert_measurements_row_by_row(device_id, rows)
+
+    total_created = 0
+    for start in range(0, len(rows), BULK_UPSERT_BATCH_SIZE):
+        batch = rows[start:start + BULK_UPSERT_BATCH_SIZE]
+        total_created += _upsert_batch(device_id, batch)
+
+    return total_created, len(rows) - total_created
+
+
+def _upsert_batch(device_id, batch):
+    """
+    Ejecuta un único INSERT ... ON CONFLICT para el lote y devuelve cuántas filas
+    fueron creadas. Las filas cuyo JSON no cambió no se reescriben, evitando
+    tuplas muertas cuando la ventana de descarga se solapa con datos existentes.
+    Las columnas tipadas (MEASUREMENT_TYPED_FIELDS) se escriben junto con data.
+    """
+    table = connection.ops.quote_name(Measurement._meta.db_table)
+    typed_columns = list(MEASUREMENT_TYPED_FIELDS)
+    columns = ', '.join(['device_id', 'date', 'local_date', 'data'] + typed_columns)
+    row_placeholder = '(' + ', '.join(['%s', '%s', '%s', '%s::jsonb'] + ['%s'] * len(typed_columns)) + ')'
+    placeholders = ', '.join([row_placeholder] * len(batch))
+    params = []
+    for dt, data in batch:
+        typed = extract_typed_values(data)
+        params.extend([device_id, dt, to_local_date(dt), json.dumps(data)])
+        params.extend(typed[column] for column in typed_columns)
+
+    updates = ', '.join(
+        ['data = EXCLUDED.data', 'local_date = EXCLUDED.local_date']
+        + [f'{column} = EXCLUDED.{column}' for column in typed_columns]
+    )
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+        f"ON CONFLICT (device_id, date) DO UPDATE SET {updates} "
+        f"WHERE {table}.data IS DISTINCT FROM EXCLUDED.data "
+        f"RETURNING (xmax = 0) AS inserted"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(1 for (inserted,) in cursor.fetchall() if inserted)
+
+
+def _upsert_measurements_row_by_row(device_id, rows):
+    """Ruta de respaldo para motores distintos de PostgreSQL."""
+    created_count = 0
+    for dt, data in rows:
+        _, created = Measurement.objects.update_or_create(
+            device_id=device_id,
+            date=dt,
+            defaults={"data": data, "local_date": to_local_date(dt), **extract_typed_values(data)}
+        )
+        if created:
+            created_count += 1
+    return created_count, len(rows) - created_count
+
+
+def drop_archived_rows(device_id, rows):
+    """
+    Quita de una página las mediciones de meses ya archivados en disco
+    (MeasurementArchive), como hace MeasurementFileLoader: reinsertar parte de
+    un día archivado haría que los rollups y la cobertura se recalcularan
+    solo con esas filas. Hay que restaurar el mes para volver a cargarlo.
+    """
+    months = {to_local_date(dt).replace(day=1) for dt, _ in rows}
+    archived = set(
+        MeasurementArchive.objects.filter(device_id=device_id, month__in=months).values_list('month', flat=True)
+    )
+    if not archived:
+        return rows
+    kept = [(dt, data) for dt, data in rows if to_local_date(dt).replace(day=1) not in archived]
+    logger.warning(
+        f"Dispositivo {device_id}: se omiten {len(rows) - len(kept)} mediciones de meses archivados "
+        f"({', '.join(f'{month:%Y-%m}' for month in sorted(archived))})"
+    )
+    return kept
+
+
+def store_measurement_page(device_id, rows, bulk=True):
+    """
+    Guarda una página de mediciones y avanza el cursor de ingesta, el último
+    estado y la cobertura diaria del dispositivo en la misma transacción. Si
+    la escritura falla, el cursor no se mueve y la siguiente ejecución vuelve
+    a pedir esas mediciones. Las mediciones de meses archivados se omiten.
+    Después se recalculan los rollups de los días afectados; los bloques
+    diarios ya empaquetados de esos días quedan marcados como desactualizados.
+
+    Returns:
+        Tupla (creadas, actualizadas)
+    """
+    if not rows:
+        return 0, 0
+
+    rows = drop_archived_rows(device_id, rows)
+    if not rows:
+        return 0, 0
+
+    first_date = min(dt for dt, _ in rows)
+    last_date = max(dt for dt, _ in rows)
+
+    with transaction.atomic():
+        if bulk:
+            created, updated = upsert_measurements(device_id, rows)
+        else:
+            created, updated = _upsert_measurements_row_by_row(device_id, rows)
+        advance_ingest_cursor(device_id, last_date)
+        update_latest_state(device_id, last_date, max(rows, key=lambda row: row[0])[1])
+        refresh_coverage(device_id, first_date, last_date)
+        # Los días ya empaquetados que cambian se vuelven a empaquetar por la noche
+        if created or updated:
+            mark_stale(device_id, first_date, last_date)
+
+    # Los rollups de los días tocados se recalculan después de confirmar la página
+    if rollups_enabled():
+        refresh_rollups(device_id, first_date, last_date)
+
+    return created, updated
+
+
+def backfill_typed_columns(batch_size=TYPED_BACKFILL_BATCH_SIZE, device_ids=None, only_missing=False):
+    """
+    Rellena las columnas tipadas a partir de data, y local_date a partir de
+    date, para las mediciones existentes, por lotes de ids (cada lote en su
+    propia transacción).
+
+    Args:
+        batch_size: rango de ids por sentencia UPDATE
+        device_ids: limitar a estos dispositivos (None = todos)
+        only_missing: solo filas sin local_date o con todas las columnas tipadas vacías
+
+    Returns:
+        Número de filas actualizadas
+    """
+    if connection.vendor != 'postgresql':
+        raise RuntimeError("El relleno de columnas tipadas solo está disponible en PostgreSQL.")
+
+    table = connection.ops.quote_name(Measurement._meta.db_table)
+    assignments = ', '.join(
+        ["local_date = (date AT TIME ZONE 'America/Bogota')::date"]
+        + [
+            f"{column} = CASE WHEN jsonb_typeof(data->'{key}') = 'number' "
+            f"THEN (data->>'{key}')::double precision END"
+            for column, key in MEASUREMENT_TYPED_FIELDS.items()
+        ]
+    )
+    conditions = ['id >= %s', 'id < %s']
+    extra_params = []
+    if device_ids:
+        conditions.append('device_id = ANY(%s)')
+        extra_params.append(list(device_ids))
+    if only_missing:
+        typed_missing = ' AND '.join(f'{column} IS NULL' for column in MEASUREMENT_TYPED_FIELDS)
+        conditions.append(f'(local_date IS NULL OR ({typed_missing}))')
+    where = ' AND '.join(conditions)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT min(id), max(id) FROM {table}")
+        min_id, max_id = cursor.fetchone()
+    if min_id is None:
+        return 0
+
+    updated = 0
+    for start in range(min_id, max_id + 1, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {assignments} WHERE {where}",
+                [start, start + batch_size] + extra_params
+            )
+            updated += cursor.rowcount
+    return updated
+
+
+def advance_ingest_cursor(device_id, last_date):
+    """
+    Avanza el cursor de ingesta de un dispositivo. Nunca retrocede: si el
+    cursor ya es posterior a last_date (p. ej. por una carga histórica
+    manual de un rango antiguo) se conserva.
+    """
+    cursor_obj, created = DeviceIngestCursor.objects.select_for_update().get_or_create(
+        device_id=device_id,
+        defaults={'last_measurement_date': last_date}
+    )
+    if not created and cursor_obj.last_measurement_date < last_date:
+        cursor_obj.last_measurement_date = last_date
+        cursor_obj.save(update_fields=['last_measurement_date', 'updated_at'])
+
+
+def update_latest_state(device_id, last_date, data):
+    """
+    Guarda la medición más reciente de un dispositivo en DeviceLatestState.
+    Como el cursor, nunca retrocede ante cargas de rangos antiguos.
+    """
+    state, created = DeviceLatestState.objects.select_for_update().get_or_create(
+        device_id=device_id,
+        defaults={'last_measurement_date': last_date, 'data': data}
+    )
+    if not created and state.last_measurement_date <= last_date:
+        state.last_measurement_date = last_date
+        state.data = data
+        state.save(update_fields=['last_measurement_date', 'data', 'updated_at'])
+
+
+def get_ingest_start(device_id, cursors, default_start, overlap, max_catchup):
+    """
+    Calcula la fecha desde la que se deben pedir mediciones a SCADA.
+
+    Args:
+        device_id: ID local del dispositivo
+        cursors: dict {device_id: última fecha almacenada}
+        default_start: inicio a usar si el dispositivo no tiene cursor
+        overlap: timedelta restado al cursor para recoger datos tardíos
+        max_catchup: timedelta máximo hacia atrás al recuperar ejecuciones perdidas
+    """
+    last_date = cursors.get(device_id)
+    if last_date is None:
+        return default_start
+
+    start = last_date - overlap
+    oldest_allowed = dj_timezone.now() - max_catchup
+    return max(start, oldest_allowed).astimezone(COLOMBIA_TZ)
+
+
+def split_time_windows(from_dt, to_dt, window):
+    """
+    Divide [from_dt, to_dt] en ventanas consecutivas de duración window.
+    La última ventana puede ser más corta. Con window vacío o nulo se
+    devuelve el rango completo como una sola ventana.
+    """
+    if not window or window <= timedelta(0) or to_dt <= from_dt:
+        return [(from_dt, to_dt)]
+
+    windows = []
+    start = from_dt
+    while start < to_dt:
+        end = min(start + window, to_dt)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def get_ingest_window():
+    """Duración de las ventanas en que se divide un rango de descarga."""
+    hours = getattr(settings, 'SCADA_INGEST_WINDOW_HOURS', 24)
+    return timedelta(hours=hours) if hours else None
+
+
+def _fetch_measurement_pages(client, token, device_scada_id, from_dt, to_dt, page_size, window=None):
+    """
+    Genera las páginas de [from_dt, to_dt] recorriendo ventanas de tiempo
+    consecutivas y paginando dentro de cada una, en lugar de un único offset
+    creciente sobre todo el rango. El prefetch se aplica sobre la cadena
+    completa, no por ventana.
+    """
+    for window_start, window_end in split_time_windows(from_dt, to_dt, window):
+        yield from client.iter_measurement_pages(
+            token,
+            device_scada_id,
+            from_date=window_start.isoformat(timespec='seconds'),
+            to_date=window_end.isoformat(timespec='seconds'),
+            # Orden ascendente: el cursor solo avanza sobre datos ya completos
+            order_by="date asc",
+            page_size=page_size,
+            prefetch=0,
+        )
+
+
+def ingest_device_range(client, token, device_id, device_scada_id, from_dt, to_dt,
+                        bulk=True, page_size=SCADA_PAGE_SIZE, prefetch=None, window=None):
+    """
+    Descarga y guarda todas las mediciones de un dispositivo en [from_dt, to_dt].
+
+    Los rangos largos se recorren en ventanas de SCADA_INGEST_WINDOW_HOURS
+    (o window), una tras otra y paginando dentro de cada ventana. La descarga
+    y la escritura se solapan: un hilo productor pide las páginas siguientes
+    (hasta SCADA_INGEST_PREFETCH_PAGES por adelantado) mientras aquí se parsea
+    y guarda la actual. Cada página se guarda junto con el cursor de ingesta,
+    en orden ascendente de fecha: si una página falla, el cursor queda al
+    final de la última página guardada y la siguiente ejecución sigue desde ahí.
+
+    Returns:
+        Tupla (creadas, actualizadas)
+    """
+    if prefetch is None:
+        prefetch = getattr(settings, 'SCADA_INGEST_PREFETCH_PAGES', 2)
+    if window is None:
+        window = get_ingest_window()
+
+    total_created, total_updated = 0, 0
+    pages = _fetch_measurement_pages(client, token, device_scada_id, from_dt, to_dt, page_size, window)
+
+    for measurements_data in prefetch_pages(pages, prefetch):
+        # La página y el cursor de ingesta se guardan en una sola transacción
+        created, updated = store_measurement_page(
+            device_id,
+            parse_measurement_page(measurements_data),
+            bulk=bulk
+        )
+        total_created += created
+        total_updated += updated
+
+    return total_created, total_updated
+
+
+def _ingest_device_job(client, token, job, bulk, window):
+    """Ejecuta la ingesta de un rango de un dispositivo dentro de un hilo del pool."""
+    device_id, device_scada_id, from_dt, to_dt = job
+    try:
+        return ingest_device_range(
+            client, token, device_id, device_scada_id, from_dt, to_dt, bulk=bulk, window=window
+        )
+    finally:
+        # Cada hilo abre su propia conexión a la base de datos; se cierra al terminar
+        connection.close()
+
+
+def ingest_devices_concurrently(client, jobs, max_workers=8, bulk=True, window=None, split_windows=False):
+    """
+    Descarga las mediciones de varios dispositivos en paralelo desde un solo proceso.
+
+    Por defecto cada dispositivo ocupa un hilo que recorre sus ventanas de
+    tiempo en orden (ingest_device_range), de modo que el cursor de ingesta
+    solo avanza sobre el tramo ya completo y una ventana fallida se vuelve a
+    pedir en la siguiente ejecución basada en cursores.
+
+    Con split_windows=True cada rango se divide en ventanas independientes que
+    se descargan en paralelo, repartiendo también un rango largo entre los
+    hilos. Como el cursor nunca retrocede, una ventana fallida puede quedar
+    detrás de él: usar solo para rangos que no dependen del cursor (backfills
+    explícitos o huecos de cobertura ya anteriores al cursor).
+
+    Args:
+        client: ScadaConnectorClient compartido (sesión HTTP y limitador de tasa por host)
+        jobs: lista de tuplas (device_id, device_scada_id, from_dt, to_dt)
+        max_workers: límite global de descargas simultáneas
+        bulk: usar la escritura por lotes
+        window: duración de cada ventana (por defecto SCADA_INGEST_WINDOW_HOURS)
+        split_windows: descargar las ventanas de un mismo dispositivo en paralelo
+
+    Returns:
+        Dict con 'devices', 'created', 'updated' y 'failed'
+        (lista de (device_scada_id, desde, hasta, error))
+    """
+    summary = {'devices': 0, 'created': 0, 'updated': 0, 'failed': []}
+    if not jobs:
+        return summary
+
+    if window is None:
+        window = get_ingest_window()
+
+    if split_windows:
+        jobs = [
+            (device_id, device_scada_id, window_start, window_end)
+            for device_id, device_scada_id, from_dt, to_dt in jobs
+            for window_start, window_end in split_time_windows(from_dt, to_dt, window)
+        ]
+
+    token = client.get_token()
+    per_device = {}
+    failed_devices = set()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='scada-ingest') as executor:
+        futures = {
+            executor.submit(_ingest_device_job, client, token, job, bulk, window): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            _, device_scada_id, window_start, window_end = futures[future]
+            try:
+                created, updated = future.result()
+            except Exception as e:
+                logger.error(
+                    f"Error al obtener/guardar mediciones de {device_scada_id} "
+                    f"({window_start} -> {window_end}): {e}",
+                    exc_info=True
+                )
+                summary['failed'].append((device_scada_id, window_start, window_end, str(e)))
+                failed_devices.add(device_scada_id)
+                continue
+            device_created, device_updated = per_device.get(device_scada_id, (0, 0))
+            per_device[device_scada_id] = (device_created + created, device_updated + updated)
+            summary['created'] += created
+            summary['updated'] += updated
+
+    for device_scada_id, (created, updated) in per_device.items():
+        logger.info(f"Dispositivo {device_scada_id}: {created} nuevas, {updated} actualizadas")
+    summary['devices'] = len(set(per_device) - failed_devices)
+
+    return summary
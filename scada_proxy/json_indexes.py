@@ -0,0 +1,203 @@
+"""
+Índices sobre claves del JSON de mediciones (PostgreSQL).
+
+Los filtros de existencia data__<clave>__isnull=False se traducen a
+`data ? 'clave'`. Sin un índice que los cubra, PostgreSQL lee todas las filas
+del dispositivo en el rango para descartar las que no tienen la clave. Un
+índice parcial (device_id, date) WHERE data ? 'clave' solo contiene las filas
+con esa clave y sirve a la vez al filtro por dispositivo y rango.
+
+- Las claves de MEASUREMENT_INDEXED_JSON_KEYS tienen su índice en
+  Measurement.Meta.indexes (migraciones).
+- El comando measurement_json_indexes propone, a partir de las claves que
+  realmente envía cada categoría de dispositivo, índices adicionales con el
+  prefijo MANAGED_PREFIX, y opcionalmente un índice GIN sobre todo `data`.
+
+Los índices parciales se crean igual sobre la tabla particionada: PostgreSQL
+los propaga a cada partición.
+"""
+
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import (
+    Measurement, Device, DeviceCategory,
+    MEASUREMENT_TYPED_KEYS, MEASUREMENT_INDEXED_JSON_KEYS, json_key_index_name,
+)
+from .partitioning import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+TABLE = Measurement._meta.db_table
+MANAGED_PREFIX = 'meas_jkey_'
+GIN_INDEX_NAME = 'meas_data_gin'
+# jsonb_ops sirve a ?, ?| y ?& (existencia de claves) y a @>; jsonb_path_ops es
+# más pequeño pero solo sirve a @>, @? y @@
+GIN_OPCLASSES = {'ops': 'jsonb_ops', 'path_ops': 'jsonb_path_ops'}
+
+_SAFE_KEY = re.compile(r'^[A-Za-z0-9_]+$')
+_HAS_KEY_PREDICATE = re.compile(r"WHERE \(data \? '([^']+)'::text\)")
+
+
+def managed_index_name(key):
+    """Nombre del índice parcial creado por el comando para una clave (máximo 63 caracteres)."""
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()[:6]
+    return f"{MANAGED_PREFIX}{key.lower()[:40]}_{digest}"
+
+
+def existing_key_indexes():
+    """
+    Índices parciales existentes sobre la tabla de mediciones con predicado
+    `data ? 'clave'`. Devuelve {clave: nombre del índice}.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [TABLE])
+        rows = cursor.fetchall()
+
+    indexes = {}
+    for name, definition in rows:
+        match = _HAS_KEY_PREDICATE.search(definition)
+        if match:
+            indexes[match.group(1)] = name
+    return indexes
+
+
+def gin_index_exists():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s", [TABLE, GIN_INDEX_NAME])
+        return cursor.fetchone() is not None
+
+
+def keys_by_category(days=7):
+    """
+    Claves presentes en el JSON de las mediciones de los últimos `days` días,
+    por categoría de dispositivo.
+
+    Returns:
+        Dict {nombre de categoría: {'rows': filas, 'keys': {clave: filas con la clave}}}
+    """
+    since = timezone.now() - timedelta(days=days)
+    quote = connection.ops.quote_name
+    device_table = quote(Device._meta.db_table)
+    category_names = dict(DeviceCategory.objects.values_list('id', 'name'))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT d.category_id, count(*) FROM {quote(TABLE)} m "
+            f"JOIN {device_table} d ON d.id = m.device_id "
+            f"WHERE m.date >= %s GROUP BY d.category_id",
+            [since]
+        )
+        totals = dict(cursor.fetchall())
+        cursor.execute(
+            f"SELECT d.category_id, k.key, count(*) FROM {quote(TABLE)} m "
+            f"JOIN {device_table} d ON d.id = m.device_id "
+            f"CROSS JOIN LATERAL jsonb_object_keys(m.data) AS k(key) "
+            f"WHERE m.date >= %s GROUP BY d.category_id, k.key",
+            [since]
+        )
+        key_rows = cursor.fetchall()
+
+    result = {}
+    for category_id, rows in totals.items():
+        name = category_names.get(category_id, 'Sin categoría')
+        result[name] = {'rows': rows, 'keys': {}}
+    for category_id, key, count in key_rows:
+        name = category_names.get(category_id, 'Sin categoría')
+        result[name]['keys'][key] = count
+    return result
+
+
+def propose_key_indexes(days=7, min_share=0.5):
+    """
+    Propone índices parciales para las claves que alguna categoría envía en al
+    menos `min_share` de sus mediciones y que no tienen ya columna tipada ni
+    índice. La selectividad es la fracción de la tabla que tiene la clave:
+    cuanto menor, más útil el índice.
+
+    Returns:
+        Lista de dicts con key, name, categories, rows, selectivity y sql
+    """
+    usage = keys_by_category(days)
+    total_rows = sum(category['rows'] for category in usage.values()) or 1
+    indexed = existing_key_indexes()
+
+    candidates = {}
+    for category_name, category in usage.items():
+        for key, count in category['keys'].items():
+            if key in MEASUREMENT_TYPED_KEYS or key in indexed:
+                continue
+            if not _SAFE_KEY.match(key):
+                logger.warning(f"Clave JSON '{key}' omitida: nombre no apto para un índice.")
+                continue
+            candidate = candidates.setdefault(key, {'categories': [], 'rows': 0})
+            candidate['rows'] += count
+            if category['rows'] and count / category['rows'] >= min_share:
+                candidate['categories'].append(category_name)
+
+    proposals = []
+    for key, candidate in sorted(candidates.items()):
+        if not candidate['categories']:
+            continue
+        name = managed_index_name(key)
+        proposals.append({
+            'key': key,
+            'name': name,
+            'categories': sorted(candidate['categories']),
+            'rows': candidate['rows'],
+            'selectivity': candidate['rows'] / total_rows,
+            'sql': key_index_sql(key, name),
+        })
+    return proposals
+
+
+def _concurrently():
+    # CREATE INDEX CONCURRENTLY no está permitido sobre una tabla particionada
+    return '' if is_partitioned() else 'CONCURRENTLY '
+
+
+def key_index_sql(key, name=None):
+    if not _SAFE_KEY.match(key):
+        raise ValueError(f"Clave JSON no válida para un índice: {key}")
+    quote = connection.ops.quote_name
+    return (
+        f"CREATE INDEX {_concurrently()}IF NOT EXISTS {quote(name or managed_index_name(key))} "
+        f"ON {quote(TABLE)} (device_id, date) WHERE data ? '{key}'"
+    )
+
+
+def gin_index_sql(opclass='ops'):
+    quote = connection.ops.quote_name
+    return (
+        f"CREATE INDEX {_concurrently()}IF NOT EXISTS {quote(GIN_INDEX_NAME)} "
+        f"ON {quote(TABLE)} USING gin (data {GIN_OPCLASSES[opclass]})"
+    )
+
+
+def create_index(sql):
+    """Ejecuta un CREATE INDEX fuera de transacción (requisito de CONCURRENTLY)."""
+    if connection.in_atomic_block:
+        raise RuntimeError("Los índices deben crearse fuera de una transacción.")
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+    logger.info(f"Índice creado: {sql}")
+
+
+def drop_managed_index(name):
+    """Elimina un índice creado por el comando (solo nombres con MANAGED_PREFIX o el GIN)."""
+    if not (name.startswith(MANAGED_PREFIX) or name == GIN_INDEX_NAME):
+        raise ValueError(f"{name} no es un índice gestionado por el comando.")
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX {_concurrently()}IF EXISTS {quote(name)}")
+    logger.info(f"Índice {name} eliminado.")
+
+
+def model_index_keys():
+    """Claves con índice declarado en Measurement.Meta.indexes, con su nombre."""
+    return {key: json_key_index_name(key) for key in MEASUREMENT_INDEXED_JSON_KEYS}
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scada_proxy.archive import archive_closed_months, restore_device_month, get_archive_root
+from scada_proxy.models import Device, MeasurementArchive
+
+
+class Command(BaseCommand):
+    help = 'Archiva en disco los meses antiguos de mediciones crudas (y los elimina de la base de datos) o los restaura'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            default=getattr(settings, 'SCADA_ARCHIVE_KEEP_MONTHS', 0),
+            help='Meses que se conservan en la base de datos, incluido el actual',
+        )
+        parser.add_argument(
+            '--device',
+            action='append',
+            help='scada_id o ID local de un dispositivo (se puede repetir; por defecto, todos)',
+        )
+        parser.add_argument(
+            '--compress',
+            action='store_true',
+            default=None,
+            help='Escribe un .npz comprimido por mes (sin lectura por mmap)',
+        )
+        parser.add_argument(
+            '--keep-rows',
+            action='store_true',
+            help='Exporta sin eliminar las mediciones de la base de datos',
+        )
+        parser.add_argument(
+            '--restore',
+            metavar='YYYY-MM',
+            help='Devuelve a la base de datos el mes indicado de los dispositivos seleccionados',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Muestra los meses archivados',
+        )
+
+    def _devices(self, identifiers):
+        devices = []
+        for identifier in identifiers:
+            device = Device.objects.filter(scada_id=identifier).first()
+            if device is None and identifier.isdigit():
+                device = Device.objects.filter(id=int(identifier)).first()
+            if device is None:
+                raise CommandError(f'Dispositivo no encontrado: {identifier}')
+            devices.append(device)
+        return devices
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🧊 ARCHIVO FRÍO DE MEDICIONES'))
+        self.stdout.write(f'   Directorio: {get_archive_root()}')
+
+        devices = self._devices(options['device']) if options['device'] else None
+        device_ids = [device.id for device in devices] if devices is not None else None
+
+        if options['list']:
+            archives = MeasurementArchive.objects.select_related('device').order_by('device__name', 'month')
+            if device_ids is not None:
+                archives = archives.filter(device_id__in=device_ids)
+            self.stdout.write('\n📋 MESES ARCHIVADOS:')
+            for archive in archives:
+                self.stdout.write(
+                    f'   - {archive.device.name} {archive.month:%Y-%m}: {archive.sample_count} mediciones, '
+                    f'{archive.size_bytes / (1024 * 1024):.1f} MB ({archive.format})'
+                )
+            return
+
+        if options['restore']:
+            try:
+                month = datetime.strptime(options['restore'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--restore debe tener el formato YYYY-MM')
+            archives = MeasurementArchive.objects.filter(month=month)
+            if device_ids is not None:
+                archives = archives.filter(device_id__in=device_ids)
+            total = 0
+            for device_id in archives.values_list('device_id', flat=True):
+                restored = restore_device_month(device_id, month)
+                self.stdout.write(f'   ♻️  Dispositivo {device_id}: {restored} mediciones')
+                total += restored
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} mediciones restauradas de {month:%Y-%m}'))
+            return
+
+        if options['keep_months'] < 1:
+            raise CommandError('Indique --keep-months (al menos 1) o defina SCADA_ARCHIVE_KEEP_MONTHS')
+
+        summary = archive_closed_months(
+            keep_months=options['keep_months'],
+            device_ids=device_ids,
+            compress=options['compress'],
+            delete=not options['keep_rows'],
+        )
+        for device_id, month, error in summary['failed']:
+            self.stdout.write(self.style.ERROR(f'   ❌ Dispositivo {device_id}, {month:%Y-%m}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {summary['archived']} meses archivados ({summary['rows']} mediciones)"
+        ))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scada_proxy.ingest import backfill_typed_columns, TYPED_BACKFILL_BATCH_SIZE
+from scada_proxy.models import Device, MEASUREMENT_TYPED_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Rellena las columnas derivadas de las mediciones (local_date y variables tipadas) a partir de date y del JSON data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--device',
+            action='append',
+            help='scada_id o ID local de un dispositivo (se puede repetir)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TYPED_BACKFILL_BATCH_SIZE,
+            help='Rango de ids por lote',
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Solo mediciones sin local_date o con todas las columnas tipadas vacías',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🧮 RELLENO DE COLUMNAS DERIVADAS DE MEDICIONES'))
+        self.stdout.write(f"   Columnas: local_date, {', '.join(MEASUREMENT_TYPED_FIELDS)}")
+
+        device_ids = None
+        if options['device']:
+            device_ids = []
+            for identifier in options['device']:
+                device = Device.objects.filter(scada_id=identifier).first()
+                if device is None and identifier.isdigit():
+                    device = Device.objects.filter(id=int(identifier)).first()
+                if device is None:
+                    raise CommandError(f'Dispositivo no encontrado: {identifier}')
+                device_ids.append(device.id)
+                self.stdout.write(f'   - {device.name} ({device.scada_id})')
+
+        try:
+            updated = backfill_typed_columns(
+                batch_size=options['batch_size'],
+                device_ids=device_ids,
+                only_missing=options['only_missing'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {updated} mediciones actualizadas'))
@@ -0,0 +1,129 @@
+import os
+
+import pytz
+from django.core.management.base import BaseCommand, CommandError
+
+from scada_proxy.bulk_load import MeasurementFileLoader, DEFAULT_CHUNK_SIZE
+from scada_proxy.models import Device
+
+
+class Command(BaseCommand):
+    help = 'Carga exportaciones históricas (CSV o Excel) en la tabla de mediciones con COPY, sin pasar por la API de SCADA'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Archivos .csv o .xlsx a cargar')
+        parser.add_argument(
+            '--device',
+            help='scada_id o ID local del dispositivo al que pertenecen todas las filas',
+        )
+        parser.add_argument(
+            '--device-column',
+            help='Columna con el scada_id o ID local del dispositivo de cada fila',
+        )
+        parser.add_argument('--time-column', help='Columna con la fecha/hora (por defecto se detecta)')
+        parser.add_argument('--time-format', help='Formato strptime de la fecha (por defecto, ISO 8601)')
+        parser.add_argument(
+            '--timezone',
+            default='America/Bogota',
+            help='Zona horaria de las fechas sin zona (por defecto America/Bogota)',
+        )
+        parser.add_argument('--decimal', default='.', help="Separador decimal de los CSV ('.' o ',')")
+        parser.add_argument('--delimiter', help='Separador de columnas de los CSV (por defecto se detecta)')
+        parser.add_argument('--sheet', help='Hoja del Excel (por defecto, la activa)')
+        parser.add_argument(
+            '--map',
+            action='append',
+            default=[],
+            metavar='COLUMNA=clave',
+            help='Asigna una columna a una clave de data (se puede repetir)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Filas por bloque de COPY y transacción',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Lee y asigna las columnas sin escribir nada',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('📥 CARGA MASIVA DE MEDICIONES HISTÓRICAS'))
+
+        if bool(options['device']) == bool(options['device_column']):
+            raise CommandError('Indique --device o --device-column (uno de los dos)')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size debe ser al menos 1')
+        for path in options['paths']:
+            if not os.path.isfile(path):
+                raise CommandError(f'Archivo no encontrado: {path}')
+        try:
+            tz = pytz.timezone(options['timezone'])
+        except pytz.UnknownTimeZoneError:
+            raise CommandError(f"Zona horaria desconocida: {options['timezone']}")
+
+        overrides = {}
+        for item in options['map']:
+            column, _, key = item.partition('=')
+            if not column or not key:
+                raise CommandError(f'--map debe tener la forma COLUMNA=clave: {item}')
+            overrides[column] = key
+
+        device = None
+        if options['device']:
+            device = Device.objects.select_related('category').filter(scada_id=options['device']).first()
+            if device is None and options['device'].isdigit():
+                device = Device.objects.select_related('category').filter(id=int(options['device'])).first()
+            if device is None:
+                raise CommandError(f"Dispositivo no encontrado: {options['device']}")
+            self.stdout.write(f'📟 {device.name} ({device.scada_id})')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('⚠️  Modo simulación: no se escribe nada'))
+
+        try:
+            loader = MeasurementFileLoader(
+                device=device,
+                device_column=options['device_column'],
+                time_column=options['time_column'],
+                time_format=options['time_format'],
+                tz=tz,
+                decimal=options['decimal'],
+                overrides=overrides,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                progress=self._progress,
+            )
+            for path in options['paths']:
+                self.stdout.write(f'📄 {path}')
+                loader.load_file(path, sheet=options['sheet'], delimiter=options['delimiter'])
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+
+        summary = loader.summary
+        names = dict(Device.objects.filter(id__in=summary['unmapped']).values_list('id', 'name'))
+        for device_id, columns in summary['unmapped'].items():
+            if columns:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  {names.get(device_id, device_id)}: columnas sin asignar (use --map): {', '.join(columns)}"
+                ))
+        for error in summary['errors'][:20]:
+            self.stdout.write(self.style.ERROR(f'   ❌ {error}'))
+        if summary['archived']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  {summary['archived']} filas omitidas por pertenecer a meses archivados "
+                f"(restáurelos con archive_measurements --restore)"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {summary['read']} filas leídas, {summary['loaded']} cargadas "
+            f"({summary['created']} nuevas, {summary['updated']} actualizadas), {summary['skipped']} descartadas"
+        ))
+
+    def _progress(self, summary):
+        rate = summary['loaded'] / summary['elapsed'] if summary['elapsed'] else 0
+        self.stdout.write(
+            f"   ⏳ {summary['loaded']} filas cargadas ({summary['created']} nuevas, "
+            f"{summary['updated']} actualizadas) · {rate:,.0f} filas/s"
+        )
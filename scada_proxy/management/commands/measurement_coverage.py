@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from scada_proxy.coverage import coverage_readable, rebuild_coverage, missing_windows, completeness, COLOMBIA_TZ
+from scada_proxy.models import Device, to_local_date
+from scada_proxy.tasks import backfill_measurement_gaps
+
+
+class Command(BaseCommand):
+    help = 'Cobertura de mediciones por dispositivo y día (DeviceDayCoverage): reconstrucción, huecos y recuperación'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--device',
+            action='append',
+            help='scada_id o ID local de un dispositivo (se puede repetir; por defecto, todos los activos)',
+        )
+        parser.add_argument('--from', dest='from_date', help='Primer día (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='to_date', help='Último día (YYYY-MM-DD)')
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Reconstruye la cobertura desde Measurement (sin --from/--to, todo el histórico)',
+        )
+        parser.add_argument(
+            '--gaps',
+            action='store_true',
+            help='Lista la completitud y los huecos de cada dispositivo en el rango (por defecto, últimos 7 días)',
+        )
+        parser.add_argument(
+            '--fetch',
+            action='store_true',
+            help='Pide ya a SCADA los huecos de los últimos SCADA_GAP_BACKFILL_DAYS días',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🧩 COBERTURA DE MEDICIONES'))
+
+        if not (options['rebuild'] or options['gaps'] or options['fetch']):
+            raise CommandError('Indique al menos una acción: --rebuild, --gaps o --fetch')
+
+        try:
+            first_day = date.fromisoformat(options['from_date']) if options['from_date'] else None
+            last_day = date.fromisoformat(options['to_date']) if options['to_date'] else None
+        except ValueError:
+            raise CommandError('Las fechas deben tener el formato YYYY-MM-DD')
+        if (first_day is None) != (last_day is None):
+            raise CommandError('--from y --to deben indicarse juntos')
+        if first_day and first_day > last_day:
+            raise CommandError('--from debe ser anterior o igual a --to')
+
+        devices = self._devices(options['device'])
+
+        if options['rebuild']:
+            self._rebuild(devices, first_day, last_day)
+        if options['gaps']:
+            today = to_local_date(timezone.now())
+            self._gaps(devices, first_day or today - timedelta(days=6), last_day or today)
+        if options['fetch']:
+            self._fetch()
+
+    def _devices(self, identifiers):
+        if not identifiers:
+            return list(Device.objects.filter(is_active=True).order_by('name'))
+        devices = []
+        for identifier in identifiers:
+            device = Device.objects.filter(scada_id=identifier).first()
+            if device is None and identifier.isdigit():
+                device = Device.objects.filter(id=int(identifier)).first()
+            if device is None:
+                raise CommandError(f'Dispositivo no encontrado: {identifier}')
+            devices.append(device)
+        return devices
+
+    def _rebuild(self, devices, first_day, last_day):
+        scope = f'{first_day} a {last_day}' if first_day else 'todo el histórico'
+        self.stdout.write(f'🔄 Reconstruyendo la cobertura de {len(devices)} dispositivos ({scope})')
+        total = 0
+        for device in devices:
+            days = rebuild_coverage(device.id, first_day, last_day)
+            total += days
+            self.stdout.write(f'   - {device.name} ({device.scada_id}): {days} días con mediciones')
+        self.stdout.write(self.style.SUCCESS(f'✅ Cobertura reconstruida: {total} días'))
+        if not coverage_readable():
+            self.stdout.write(self.style.WARNING(
+                '⚠️  SCADA_COVERAGE_READ está desactivado: actívelo para saltar días vacíos en los recálculos'
+            ))
+
+    def _gaps(self, devices, first_day, last_day):
+        min_gap_slots = max(1, int(getattr(settings, 'SCADA_GAP_MIN_MINUTES', 10) * 60) // 120)
+        self.stdout.write(f'🔍 Huecos de {first_day} a {last_day}')
+        per_device = completeness([device.id for device in devices], first_day, last_day)
+        for device in devices:
+            days = per_device[device.id]
+            slots = sum(day['slots'] for day in days)
+            expected = sum(day['expected_slots'] for day in days)
+            share = f'{slots / expected:.1%}' if expected else '-'
+            self.stdout.write(f'📟 {device.name} ({device.scada_id}): {share} completo')
+            windows = missing_windows(device.id, first_day, last_day, min_gap_slots=min_gap_slots)
+            for start, end in windows:
+                self.stdout.write(
+                    f'   - {start.astimezone(COLOMBIA_TZ):%Y-%m-%d %H:%M} → '
+                    f'{end.astimezone(COLOMBIA_TZ):%Y-%m-%d %H:%M}'
+                )
+
+    def _fetch(self):
+        self.stdout.write('📥 Recuperando huecos desde SCADA')
+        result = backfill_measurement_gaps()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['windows']} huecos pedidos, {result['created']} mediciones nuevas, "
+            f"{result['failed']} con error"
+        ))
@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from scada_proxy import json_indexes
+
+
+class Command(BaseCommand):
+    help = 'Propone o crea índices parciales para las claves del JSON de mediciones que envía cada categoría'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Días recientes de mediciones que se analizan',
+        )
+        parser.add_argument(
+            '--min-share',
+            type=float,
+            default=0.5,
+            help='Fracción mínima de mediciones de una categoría que deben traer la clave',
+        )
+        parser.add_argument(
+            '--create',
+            action='store_true',
+            help='Crea los índices propuestos (por defecto solo se muestran)',
+        )
+        parser.add_argument(
+            '--gin',
+            choices=sorted(json_indexes.GIN_OPCLASSES),
+            help="Crea además un índice GIN sobre data: 'ops' sirve a ? y @>; 'path_ops' es menor pero solo sirve a @>",
+        )
+        parser.add_argument(
+            '--drop',
+            action='append',
+            metavar='INDEX',
+            help='Elimina un índice creado por este comando (se puede repetir)',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Muestra los índices por clave existentes',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔎 ÍNDICES SOBRE CLAVES JSON DE MEDICIONES'))
+
+        if connection.vendor != 'postgresql':
+            raise CommandError('Los índices sobre claves JSON solo están disponibles en PostgreSQL.')
+
+        if options['list']:
+            model_keys = json_indexes.model_index_keys()
+            self.stdout.write('\n📋 ÍNDICES EXISTENTES:')
+            for key, name in sorted(json_indexes.existing_key_indexes().items()):
+                origin = 'modelo' if key in model_keys else 'comando'
+                self.stdout.write(f'   - {key}: {name} ({origin})')
+            if json_indexes.gin_index_exists():
+                self.stdout.write(f'   - GIN: {json_indexes.GIN_INDEX_NAME}')
+            return
+
+        if options['drop']:
+            for name in options['drop']:
+                try:
+                    json_indexes.drop_managed_index(name)
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f'   ➖ {name}')
+            return
+
+        self.stdout.write(f"📊 Analizando las claves de los últimos {options['days']} días...")
+        proposals = json_indexes.propose_key_indexes(days=options['days'], min_share=options['min_share'])
+
+        if not proposals:
+            self.stdout.write('ℹ️  No hay claves sin índice que superen el umbral')
+        for proposal in proposals:
+            self.stdout.write(
+                f"\n   🔑 {proposal['key']} — {', '.join(proposal['categories'])}\n"
+                f"      {proposal['rows']} mediciones ({proposal['selectivity']:.1%} de la tabla)\n"
+                f"      {proposal['sql']};"
+            )
+            if options['create']:
+                json_indexes.create_index(proposal['sql'])
+                self.stdout.write(self.style.SUCCESS(f"      ✅ {proposal['name']} creado"))
+
+        if options['gin']:
+            sql = json_indexes.gin_index_sql(options['gin'])
+            self.stdout.write(f'\n   🧭 {sql};')
+            if options['create']:
+                json_indexes.create_index(sql)
+                self.stdout.write(self.style.SUCCESS(f'      ✅ {json_indexes.GIN_INDEX_NAME} creado'))
+
+        if proposals and not options['create']:
+            self.stdout.write(self.style.WARNING('\n⚠️  Use --create para crear los índices propuestos'))
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scada_proxy.blocks import blocks_enabled, pack_closed_days
+from scada_proxy.models import Device
+
+
+class Command(BaseCommand):
+    help = 'Empaqueta las mediciones de los días cerrados en bloques diarios por dispositivo (MeasurementDayBlock)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--device',
+            action='append',
+            help='scada_id o ID local de un dispositivo (se puede repetir; por defecto, todos los activos)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'SCADA_DAY_BLOCKS_LOOKBACK_DAYS', 7),
+            help='Días cerrados hacia atrás que se revisan (por defecto SCADA_DAY_BLOCKS_LOOKBACK_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('📦 EMPAQUETADO DE MEDICIONES EN BLOQUES DIARIOS'))
+
+        if options['days'] < 1:
+            raise CommandError('--days debe ser al menos 1')
+        if not blocks_enabled():
+            self.stdout.write(self.style.WARNING(
+                '⚠️  SCADA_DAY_BLOCKS_ENABLED está desactivado: los bloques se crean pero no se leen'
+            ))
+
+        device_ids = None
+        if options['device']:
+            device_ids = []
+            for identifier in options['device']:
+                device = Device.objects.filter(scada_id=identifier).first()
+                if device is None and identifier.isdigit():
+                    device = Device.objects.filter(id=int(identifier)).first()
+                if device is None:
+                    raise CommandError(f'Dispositivo no encontrado: {identifier}')
+                device_ids.append(device.id)
+                self.stdout.write(f'   - {device.name} ({device.scada_id})')
+
+        summary = pack_closed_days(device_ids=device_ids, lookback_days=options['days'])
+
+        for device_id, day, error in summary['failed']:
+            self.stdout.write(self.style.ERROR(f'   ❌ Dispositivo {device_id}, {day}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {summary['packed']} bloques empaquetados, {summary['empty']} días sin mediciones"
+        ))
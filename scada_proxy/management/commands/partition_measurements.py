@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scada_proxy import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Gestiona el particionado mensual de la tabla de mediciones (conversión, particiones futuras y retención)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convierte la tabla de mediciones en una tabla particionada por mes (detener la ingesta antes)',
+        )
+        parser.add_argument(
+            '--drop-legacy',
+            action='store_true',
+            help='Con --convert, elimina la tabla original en lugar de conservarla como *_legacy',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=getattr(settings, 'SCADA_MEASUREMENT_PARTITION_MONTHS_AHEAD', 3),
+            help='Meses futuros para los que se crean particiones',
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            help='Retira las particiones anteriores a los últimos N meses',
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Con --retention-months, elimina las particiones en lugar de solo desanexarlas',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Muestra las particiones existentes',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🗂️  PARTICIONADO DE MEDICIONES'))
+
+        if options['convert']:
+            self.stdout.write('🔄 Convirtiendo la tabla de mediciones...')
+            try:
+                result = partitioning.convert_to_partitioned(
+                    months_ahead=options['months_ahead'],
+                    keep_legacy=not options['drop_legacy'],
+                )
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            if result['converted']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Tabla particionada: {len(result['partitions'])} particiones, "
+                    f"{result['rows']} mediciones copiadas"
+                ))
+                if not options['drop_legacy']:
+                    self.stdout.write(self.style.WARNING(
+                        f'⚠️  La tabla original se conserva como {partitioning.LEGACY_TABLE}; '
+                        f'elimínela cuando haya verificado los datos'
+                    ))
+            else:
+                self.stdout.write('ℹ️  La tabla ya estaba particionada')
+
+        if not partitioning.is_partitioned():
+            self.stdout.write(self.style.WARNING(
+                '⚠️  La tabla de mediciones no está particionada. Use --convert primero.'
+            ))
+            return
+
+        created = partitioning.ensure_future_partitions(months_ahead=options['months_ahead'])
+        if created:
+            for name in created:
+                self.stdout.write(f'   ➕ {name}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Particiones futuras al día ({len(created)} nuevas)'))
+
+        if options['retention_months'] is not None:
+            if options['retention_months'] < 1:
+                raise CommandError('--retention-months debe ser al menos 1')
+            removed = partitioning.apply_retention(options['retention_months'], drop=options['drop'])
+            action = 'eliminadas' if options['drop'] else 'desanexadas'
+            for name in removed:
+                self.stdout.write(f'   ➖ {name}')
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(removed)} particiones {action}'))
+
+        if options['list']:
+            self.stdout.write('\n📋 PARTICIONES:')
+            for month, name in partitioning.list_partitions():
+                self.stdout.write(f'   - {month:%Y-%m}: {name}')
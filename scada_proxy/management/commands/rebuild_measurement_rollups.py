@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from scada_proxy.models import Device, Measurement
+from scada_proxy.rollups import COLOMBIA_TZ, check_rollups_support, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups de mediciones (15 minutos, 1 hora y 1 día) a partir de las mediciones crudas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--device',
+            action='append',
+            help='scada_id o ID local de un dispositivo (se puede repetir; por defecto, todos los activos)',
+        )
+        parser.add_argument(
+            '--from',
+            dest='from_date',
+            help='Primer día a reconstruir (YYYY-MM-DD, hora Colombia)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='to_date',
+            help='Último día a reconstruir (YYYY-MM-DD, hora Colombia)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Reconstruye solo los últimos N días (ignora --from/--to)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=7,
+            help='Días recalculados por transacción',
+        )
+
+    def _parse_day(self, value, name):
+        try:
+            return COLOMBIA_TZ.localize(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError(f'{name} debe tener el formato YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🧱 RECONSTRUCCIÓN DE ROLLUPS DE MEDICIONES'))
+
+        try:
+            check_rollups_support()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        if options['device']:
+            devices = []
+            for identifier in options['device']:
+                device = Device.objects.filter(scada_id=identifier).first()
+                if device is None and identifier.isdigit():
+                    device = Device.objects.filter(id=int(identifier)).first()
+                if device is None:
+                    raise CommandError(f'Dispositivo no encontrado: {identifier}')
+                devices.append(device)
+        else:
+            devices = list(Device.objects.filter(is_active=True))
+
+        if options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days debe ser al menos 1')
+            end = timezone.now()
+            start = end - timedelta(days=options['days'])
+        else:
+            start = self._parse_day(options['from_date'], '--from') if options['from_date'] else None
+            end = self._parse_day(options['to_date'], '--to') if options['to_date'] else None
+
+        total = len(devices)
+        for index, device in enumerate(devices, start=1):
+            device_start, device_end = start, end
+            if device_start is None or device_end is None:
+                bounds = Measurement.objects.filter(device=device).aggregate(first=Min('date'), last=Max('date'))
+                if bounds['first'] is None:
+                    self.stdout.write(f'   [{index}/{total}] {device.name}: sin mediciones')
+                    continue
+                device_start = device_start or bounds['first']
+                device_end = device_end or bounds['last']
+
+            rebuild_rollups(device.id, device_start, device_end, chunk_days=options['chunk_days'])
+            self.stdout.write(
+                f'   [{index}/{total}] {device.name}: '
+                f'{device_start.astimezone(COLOMBIA_TZ):%Y-%m-%d} → {device_end.astimezone(COLOMBIA_TZ):%Y-%m-%d}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rollups reconstruidos para {total} dispositivos'))
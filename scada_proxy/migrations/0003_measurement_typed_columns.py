@@ -0,0 +1,33 @@
+# Generated manually: typed copies of the hottest Measurement.data variables
+
+from django.db import migrations, models
+
+# Columnas de MEASUREMENT_TYPED_FIELDS en el momento de esta migración
+TYPED_COLUMNS = [
+    'total_active_power', 'ac_power', 'dc_power',
+    'imported_active_power_low', 'imported_active_power_high',
+    'exported_active_power_low', 'exported_active_power_high',
+    'irradiance', 'temperature', 'humidity', 'wind_speed',
+]
+
+# Solo esquema: columnas nulas, sin reescribir la tabla durante migrate. Las
+# mediciones existentes se rellenan después con
+#   python manage.py backfill_measurement_columns
+# (ingest.backfill_typed_columns, por lotes de ids); la ingesta ya escribe las
+# columnas tipadas de las filas nuevas.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scada_proxy', '0002_deviceingestcursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name=column,
+            field=models.FloatField(blank=True, null=True),
+        )
+        for column in TYPED_COLUMNS
+    ]
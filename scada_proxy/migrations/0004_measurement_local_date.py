@@ -0,0 +1,73 @@
+# Generated manually: stored Colombia-day column for sargable daily filters
+
+from django.db import migrations, models
+
+# Solo esquema: local_date queda nulo en las mediciones existentes hasta
+# ejecutar `python manage.py backfill_measurement_columns`, que lo rellena en
+# la misma pasada por lotes que las columnas tipadas de 0003.
+INDEX_NAME = 'measurement_device_localdate'
+
+
+def _is_partitioned(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", [table])
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def create_local_date_index(apps, schema_editor):
+    """
+    Crea el índice (device_id, local_date) con CREATE INDEX CONCURRENTLY para
+    no bloquear la ingesta (la migración no es atómica). Sobre una tabla
+    particionada CONCURRENTLY no está permitido y se crea de forma normal.
+    """
+    Measurement = apps.get_model('scada_proxy', 'Measurement')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(Measurement, models.Index(fields=['device', 'local_date'], name=INDEX_NAME))
+        return
+
+    quote = schema_editor.quote_name
+    table = Measurement._meta.db_table
+    concurrently = '' if _is_partitioned(schema_editor, table) else 'CONCURRENTLY '
+    schema_editor.execute(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS {quote(INDEX_NAME)} ON {quote(table)} (device_id, local_date)"
+    )
+
+
+def drop_local_date_index(apps, schema_editor):
+    Measurement = apps.get_model('scada_proxy', 'Measurement')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(Measurement, models.Index(fields=['device', 'local_date'], name=INDEX_NAME))
+        return
+
+    concurrently = '' if _is_partitioned(schema_editor, Measurement._meta.db_table) else 'CONCURRENTLY '
+    schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {schema_editor.quote_name(INDEX_NAME)}")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('scada_proxy', '0003_measurement_typed_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='local_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_local_date_index, drop_local_date_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='measurement',
+                    index=models.Index(fields=['device', 'local_date'], name=INDEX_NAME),
+                ),
+            ],
+        ),
+    ]
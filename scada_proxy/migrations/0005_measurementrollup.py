@@ -0,0 +1,34 @@
+# Generated manually for multi-resolution measurement rollups
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scada_proxy', '0004_measurement_local_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variable', models.CharField(max_length=64)),
+                ('resolution', models.CharField(choices=[('15m', '15 minutos'), ('1h', '1 hora'), ('1d', '1 día')], max_length=3)),
+                ('bucket', models.DateTimeField()),
+                ('sample_count', models.IntegerField()),
+                ('value_sum', models.FloatField()),
+                ('value_min', models.FloatField()),
+                ('value_max', models.FloatField()),
+                ('value_first', models.FloatField()),
+                ('value_last', models.FloatField()),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='scada_proxy.device')),
+            ],
+            options={
+                'unique_together': {('device', 'variable', 'resolution', 'bucket')},
+                'indexes': [models.Index(fields=['resolution', 'variable', 'bucket'], name='rollup_res_var_bucket')],
+            },
+        ),
+    ]
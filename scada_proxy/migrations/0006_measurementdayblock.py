@@ -0,0 +1,31 @@
+# Generated manually for per-device-day packed measurement blocks
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scada_proxy', '0005_measurementrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementDayBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('local_date', models.DateField()),
+                ('sample_count', models.IntegerField()),
+                ('variables', models.JSONField(default=list)),
+                ('timestamps', models.BinaryField()),
+                ('values', models.BinaryField()),
+                ('is_stale', models.BooleanField(default=False)),
+                ('packed_at', models.DateTimeField(auto_now=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_blocks', to='scada_proxy.device')),
+            ],
+            options={
+                'unique_together': {('device', 'local_date')},
+            },
+        ),
+    ]
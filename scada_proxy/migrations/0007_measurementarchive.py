@@ -0,0 +1,32 @@
+# Generated manually for the cold archive of raw measurements
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scada_proxy', '0006_measurementdayblock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('path', models.CharField(max_length=500)),
+                ('format', models.CharField(choices=[('npy', 'NumPy sin comprimir (mmap)'), ('npz', 'NumPy comprimido')], max_length=3)),
+                ('sample_count', models.IntegerField()),
+                ('first_date', models.DateTimeField()),
+                ('last_date', models.DateTimeField()),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='scada_proxy.device')),
+            ],
+            options={
+                'unique_together': {('device', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated manually for partial indexes on frequently filtered JSON keys
+
+from django.db import migrations, models
+
+# Claves sin columna tipada que filtra DailySummaryMeasurementsView
+# (variables de las estaciones meteorológicas); ver MEASUREMENT_INDEXED_JSON_KEYS
+INDEXED_KEYS = {
+    'windDirection': 'meas_key_winddirection',
+    'precipitation': 'meas_key_precipitation',
+}
+
+
+def _is_partitioned(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", [table])
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def create_key_indexes(apps, schema_editor):
+    """
+    Crea los índices con CREATE INDEX CONCURRENTLY para no bloquear la ingesta
+    mientras se construyen (la migración no es atómica). Sobre una tabla
+    particionada CONCURRENTLY no está permitido y se crean de forma normal.
+    """
+    Measurement = apps.get_model('scada_proxy', 'Measurement')
+    if schema_editor.connection.vendor != 'postgresql':
+        for key, name in INDEXED_KEYS.items():
+            schema_editor.add_index(
+                Measurement,
+                models.Index(condition=models.Q(data__has_key=key), fields=['device', 'date'], name=name),
+            )
+        return
+
+    quote = schema_editor.quote_name
+    table = Measurement._meta.db_table
+    concurrently = '' if _is_partitioned(schema_editor, table) else 'CONCURRENTLY '
+    for key, name in INDEXED_KEYS.items():
+        schema_editor.execute(
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {quote(name)} "
+            f"ON {quote(table)} (device_id, date) WHERE data ? '{key}'"
+        )
+
+
+def drop_key_indexes(apps, schema_editor):
+    Measurement = apps.get_model('scada_proxy', 'Measurement')
+    if schema_editor.connection.vendor != 'postgresql':
+        for key, name in INDEXED_KEYS.items():
+            schema_editor.remove_index(
+                Measurement,
+                models.Index(condition=models.Q(data__has_key=key), fields=['device', 'date'], name=name),
+            )
+        return
+
+    quote = schema_editor.quote_name
+    concurrently = '' if _is_partitioned(schema_editor, Measurement._meta.db_table) else 'CONCURRENTLY '
+    for name in INDEXED_KEYS.values():
+        schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {quote(name)}")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('scada_proxy', '0007_measurementarchive'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_key_indexes, drop_key_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='measurement',
+                    index=models.Index(condition=models.Q(('data__has_key', key)), fields=['device', 'date'], name=name),
+                )
+                for key, name in INDEXED_KEYS.items()
+            ],
+        ),
+    ]
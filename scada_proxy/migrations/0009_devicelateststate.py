@@ -0,0 +1,47 @@
+# Generated manually for the per-device latest measurement snapshot
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_latest_state(apps, schema_editor):
+    """Toma la última medición de cada dispositivo usando el índice único (device, date)."""
+    Device = apps.get_model('scada_proxy', 'Device')
+    Measurement = apps.get_model('scada_proxy', 'Measurement')
+    DeviceLatestState = apps.get_model('scada_proxy', 'DeviceLatestState')
+
+    states = []
+    for device_id in Device.objects.values_list('id', flat=True):
+        latest = (
+            Measurement.objects.filter(device_id=device_id)
+            .order_by('-date')
+            .values('date', 'data')
+            .first()
+        )
+        if latest is not None:
+            states.append(DeviceLatestState(
+                device_id=device_id,
+                last_measurement_date=latest['date'],
+                data=latest['data'],
+            ))
+    DeviceLatestState.objects.bulk_create(states, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scada_proxy', '0008_measurement_json_key_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceLatestState',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_state', serialize=False, to='scada_proxy.device')),
+                ('last_measurement_date', models.DateTimeField()),
+                ('data', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_latest_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated manually for per-device-day coverage bitmaps
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scada_proxy', '0009_devicelateststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceDayCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('local_date', models.DateField()),
+                ('slots', models.BinaryField()),
+                ('slot_count', models.IntegerField(default=0)),
+                ('sample_count', models.IntegerField(default=0)),
+                ('first_date', models.DateTimeField(blank=True, null=True)),
+                ('last_date', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_coverage', to='scada_proxy.device')),
+            ],
+            options={
+                'unique_together': {('device', 'local_date')},
+            },
+        ),
+    ]
@@ -1,8 +1,13 @@
 from django.db import models
 from django.contrib.postgres.fields import JSONField # Si usas Django < 3.1, para 3.1+ es models.JSONField
 from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+import pytz
 import uuid
 
+# Zona horaria de Colombia
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
 # =========================
 # Instituciones
 # =========================
@@ -61,18 +66,292 @@ class Device(models.Model):
 # =========================
 # Mediciones históricas
 # =========================
+def to_local_date(value):
+    """Día en hora de Colombia de una fecha/hora (o la fecha misma si ya es un date)."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(COLOMBIA_TZ)
+        return value.date()
+    return value
+
+
+class MeasurementQuerySet(models.QuerySet):
+    """
+    Filtros por día/mes sin funciones sobre las columnas: usan `local_date`
+    (índice device, local_date) y, de forma redundante, un rango sobre `date`
+    para que con la tabla particionada PostgreSQL solo lea las particiones
+    de los meses implicados. Los días y meses se interpretan en hora de Colombia.
+    """
+
+    def in_range(self, start, end):
+        """Mediciones con start <= date < end."""
+        return self.filter(date__gte=start, date__lt=end)
+
+    def for_local_day(self, day):
+        """Mediciones de un día (hora Colombia)."""
+        day = to_local_date(day)
+        start = COLOMBIA_TZ.localize(datetime.combine(day, time.min))
+        return self.in_range(start, start + timedelta(days=1)).filter(local_date=day)
+
+    def for_local_days(self, first_day, last_day):
+        """Mediciones entre dos días inclusive (hora Colombia)."""
+        first_day, last_day = to_local_date(first_day), to_local_date(last_day)
+        start = COLOMBIA_TZ.localize(datetime.combine(first_day, time.min))
+        end = COLOMBIA_TZ.localize(datetime.combine(last_day + timedelta(days=1), time.min))
+        return self.in_range(start, end).filter(local_date__range=(first_day, last_day))
+
+    def for_local_month(self, year, month):
+        """Mediciones de un mes (hora Colombia)."""
+        first_day = date(year, month, 1)
+        next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return self.for_local_days(first_day, next_month - timedelta(days=1))
+
+
+# Variables más consultadas, copiadas de `data` a columnas numéricas
+# (columna -> clave en el JSON de SCADA). Se llenan en la ingesta.
+MEASUREMENT_TYPED_FIELDS = {
+    'total_active_power': 'totalActivePower',
+    'ac_power': 'acPower',
+    'dc_power': 'dcPower',
+    'imported_active_power_low': 'importedActivePowerLow',
+    'imported_active_power_high': 'importedActivePowerHigh',
+    'exported_active_power_low': 'exportedActivePowerLow',
+    'exported_active_power_high': 'exportedActivePowerHigh',
+    'irradiance': 'irradiance',
+    'temperature': 'temperature',
+    'humidity': 'humidity',
+    'wind_speed': 'windSpeed',
+}
+
+# Clave del JSON -> columna tipada
+MEASUREMENT_TYPED_KEYS = {key: field for field, key in MEASUREMENT_TYPED_FIELDS.items()}
+
+
+# Claves del JSON sin columna tipada que DailySummaryMeasurementsView filtra
+# por existencia (data__<clave>__isnull=False, es decir `data ? 'clave'`).
+# Cada una tiene un índice parcial (device, date) WHERE data ? 'clave', que
+# encarece cada inserción: los indicadores leen con load_series y no filtran
+# por clave, así que las demás se gestionan con measurement_json_indexes.
+MEASUREMENT_INDEXED_JSON_KEYS = [
+    'windDirection',
+    'precipitation',
+]
+
+
+def json_key_index_name(key):
+    """Nombre del índice parcial de una clave del JSON (máximo 30 caracteres)."""
+    return f"meas_key_{key.lower()}"[:30]
+
+
+def extract_typed_values(data):
+    """
+    Devuelve {columna: valor} para las variables de MEASUREMENT_TYPED_FIELDS.
+    Solo se aceptan valores numéricos del JSON; cualquier otro queda en None.
+    """
+    values = {}
+    for field, key in MEASUREMENT_TYPED_FIELDS.items():
+        value = data.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[field] = float(value)
+        else:
+            values[field] = None
+    return values
+
+
 class Measurement(models.Model):
     device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='measurements')
     date = models.DateTimeField(db_index=True)  # Fecha/hora exacta de la medición (compatible con la API)
     data = models.JSONField()  # Datos completos en formato JSON
+    local_date = models.DateField(null=True, blank=True)  # Día de la medición en hora Colombia
+
+    # Copias tipadas de las variables más usadas en los indicadores (ver MEASUREMENT_TYPED_FIELDS)
+    total_active_power = models.FloatField(null=True, blank=True)
+    ac_power = models.FloatField(null=True, blank=True)
+    dc_power = models.FloatField(null=True, blank=True)
+    imported_active_power_low = models.FloatField(null=True, blank=True)
+    imported_active_power_high = models.FloatField(null=True, blank=True)
+    exported_active_power_low = models.FloatField(null=True, blank=True)
+    exported_active_power_high = models.FloatField(null=True, blank=True)
+    irradiance = models.FloatField(null=True, blank=True)
+    temperature = models.FloatField(null=True, blank=True)
+    humidity = models.FloatField(null=True, blank=True)
+    wind_speed = models.FloatField(null=True, blank=True)
+
+    objects = MeasurementQuerySet.as_manager()
 
     class Meta:
         unique_together = ('device', 'date')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['device', 'local_date'], name='measurement_device_localdate'),
+        ] + [
+            models.Index(
+                fields=['device', 'date'],
+                condition=models.Q(data__has_key=key),
+                name=json_key_index_name(key),
+            )
+            for key in MEASUREMENT_INDEXED_JSON_KEYS
+        ]
 
     def __str__(self):
         return f"{self.device.name} - {self.date}"
-    
+
+
+# =========================
+# Cursores de ingesta
+# =========================
+class DeviceIngestCursor(models.Model):
+    """
+    Marca de agua de ingesta por dispositivo: fecha de la última medición
+    almacenada con éxito. La tarea horaria solo pide a SCADA lo posterior
+    a esta fecha (menos un pequeño solape).
+    """
+    device = models.OneToOneField(Device, on_delete=models.CASCADE, primary_key=True, related_name='ingest_cursor')
+    last_measurement_date = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.device.name} - {self.last_measurement_date}"
+
+# =========================
+# Último estado por dispositivo
+# =========================
+class DeviceLatestState(models.Model):
+    """
+    Última medición almacenada de cada dispositivo (fecha y JSON completo).
+    Se actualiza en la ingesta junto con el cursor, de modo que leer el estado
+    actual es una búsqueda por clave primaria en lugar de ordenar Measurement.
+    """
+    device = models.OneToOneField(Device, on_delete=models.CASCADE, primary_key=True, related_name='latest_state')
+    last_measurement_date = models.DateTimeField()
+    data = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.device.name} - {self.last_measurement_date}"
+
+# =========================
+# Cobertura por dispositivo y día
+# =========================
+class DeviceDayCoverage(models.Model):
+    """
+    Qué intervalos de 2 minutos de un día (hora Colombia) tienen al menos una
+    medición: un mapa de 720 bits (90 bytes; el bit i es el intervalo que
+    empieza i*2 minutos después de medianoche), más el número de mediciones y
+    la primera y última fecha. Se actualiza en la ingesta; ver
+    scada_proxy/coverage.py.
+    """
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='day_coverage')
+    local_date = models.DateField()
+    slots = models.BinaryField()
+    slot_count = models.IntegerField(default=0)  # Intervalos con datos
+    sample_count = models.IntegerField(default=0)
+    first_date = models.DateTimeField(null=True, blank=True)
+    last_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('device', 'local_date')
+
+    def __str__(self):
+        return f"{self.device.name} - {self.local_date} ({self.slot_count}/720)"
+
+
+# =========================
+# Agregados por intervalo (rollups)
+# =========================
+class MeasurementRollup(models.Model):
+    """
+    Estadísticas de una variable de un dispositivo en un intervalo de 15
+    minutos, 1 hora o 1 día. Los intervalos están alineados a la hora de
+    Colombia (los diarios empiezan a medianoche local). Se recalculan después
+    de cada página ingerida; ver scada_proxy/rollups.py.
+    """
+    RESOLUTION_CHOICES = [
+        ('15m', '15 minutos'),
+        ('1h', '1 hora'),
+        ('1d', '1 día'),
+    ]
+
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='rollups')
+    variable = models.CharField(max_length=64)  # Clave de la variable en el JSON de SCADA
+    resolution = models.CharField(max_length=3, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()  # Inicio del intervalo
+    sample_count = models.IntegerField()
+    value_sum = models.FloatField()
+    value_min = models.FloatField()
+    value_max = models.FloatField()
+    value_first = models.FloatField()
+    value_last = models.FloatField()
+
+    class Meta:
+        unique_together = ('device', 'variable', 'resolution', 'bucket')
+        indexes = [
+            models.Index(fields=['resolution', 'variable', 'bucket'], name='rollup_res_var_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.device.name} - {self.variable} {self.resolution} {self.bucket}"
+
+
+# =========================
+# Bloques diarios empaquetados
+# =========================
+class MeasurementDayBlock(models.Model):
+    """
+    Todas las mediciones de un dispositivo en un día (hora Colombia) en una
+    sola fila: las marcas de tiempo y cada variable numérica del JSON se
+    guardan como arreglos binarios comprimidos. Se escriben al cerrar el día
+    como caché de lectura: las mediciones crudas se conservan. Ver
+    scada_proxy/blocks.py.
+    """
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='day_blocks')
+    local_date = models.DateField()
+    sample_count = models.IntegerField()
+    variables = models.JSONField(default=list)  # Claves del JSON, en el orden de las filas de `values`
+    timestamps = models.BinaryField()  # int64 (segundos epoch), codificados en diferencias y comprimidos
+    values = models.BinaryField()  # float64 de forma (variables, muestras), NaN si falta el dato
+    is_stale = models.BooleanField(default=False)  # Llegaron mediciones del día después de empaquetarlo
+    packed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('device', 'local_date')
+
+    def __str__(self):
+        return f"{self.device.name} - {self.local_date} ({self.sample_count})"
+
+
+# =========================
+# Archivo frío de mediciones
+# =========================
+class MeasurementArchive(models.Model):
+    """
+    Mes (hora Colombia) de mediciones crudas de un dispositivo exportado a
+    archivos columnares en disco y eliminado de la tabla de mediciones.
+    Ver scada_proxy/archive.py.
+    """
+    FORMAT_CHOICES = [
+        ('npy', 'NumPy sin comprimir (mmap)'),
+        ('npz', 'NumPy comprimido'),
+    ]
+
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='archives')
+    month = models.DateField()  # Primer día del mes
+    path = models.CharField(max_length=500)  # Directorio relativo a SCADA_ARCHIVE_ROOT
+    format = models.CharField(max_length=3, choices=FORMAT_CHOICES)
+    sample_count = models.IntegerField()
+    first_date = models.DateTimeField()
+    last_date = models.DateTimeField()
+    size_bytes = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('device', 'month')
+
+    def __str__(self):
+        return f"{self.device.name} - {self.month:%Y-%m} ({self.sample_count})"
+
+
 class TaskProgress(models.Model):
     task_id = models.CharField(max_length=255, unique=True)
     status = models.CharField(max_length=50, default='PENDING')  # PENDING, IN_PROGRESS, SUCCESS, FAILURE, CANCELLED
@@ -0,0 +1,255 @@
+"""
+Particionado mensual de la tabla de mediciones (PostgreSQL).
+
+La tabla scada_proxy_measurement se convierte en una tabla particionada por
+rango sobre `date`, con una partición por mes (hora Colombia) más una
+partición por defecto que solo debería recibir filas fuera de los meses
+creados. Las consultas con rangos de fecha (ver MeasurementQuerySet) solo
+tocan las particiones de los meses implicados.
+
+Diferencias con la tabla original, necesarias para particionar:
+- La clave primaria pasa a ser (id, date); Django sigue usando `id`.
+- `id` toma sus valores de una secuencia independiente.
+- La unicidad (device_id, date) se mantiene: incluye la clave de partición,
+  por lo que INSERT ... ON CONFLICT (device_id, date) sigue funcionando.
+"""
+
+import logging
+from datetime import date, datetime
+
+import pytz
+from django.db import connection, transaction
+
+from .models import Measurement
+
+logger = logging.getLogger(__name__)
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+TABLE = Measurement._meta.db_table
+LEGACY_TABLE = f'{TABLE}_legacy'
+SEQUENCE = f'{TABLE}_part_id_seq'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month, months):
+    index = month.year * 12 + (month.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Nombre de la partición de un mes, p. ej. scada_proxy_measurement_p2025_03."""
+    return f'{TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def _month_bound(month):
+    """Inicio del mes a medianoche en hora Colombia, como literal timestamptz."""
+    return COLOMBIA_TZ.localize(datetime(month.year, month.month, 1)).isoformat()
+
+
+def is_partitioned():
+    """Indica si la tabla de mediciones ya es una tabla particionada."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s",
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """
+    Devuelve las particiones mensuales existentes como lista ordenada de
+    tuplas (mes, nombre). No incluye la partición por defecto.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f'{TABLE}_p'
+    partitions = []
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        try:
+            year, month = name[len(prefix):].split('_')
+            partitions.append((date(int(year), int(month), 1), name))
+        except ValueError:
+            continue
+    return sorted(partitions)
+
+
+def create_month_partition(month):
+    """
+    Crea la partición de un mes si no existe. Devuelve True si se creó.
+    Falla si la partición por defecto ya contiene filas de ese mes; por eso
+    las particiones futuras se crean con antelación (ensure_future_partitions).
+    """
+    month = _month_start(month)
+    name = partition_name(month)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [_month_bound(month), _month_bound(_add_months(month, 1))]
+        )
+    logger.info(f"Partición {name} creada.")
+    return True
+
+
+def ensure_future_partitions(months_ahead=3, today=None):
+    """Garantiza que existan las particiones del mes actual y de los months_ahead siguientes."""
+    if not is_partitioned():
+        logger.warning(f"La tabla {TABLE} no está particionada; no se crean particiones.")
+        return []
+
+    current = _month_start(today or datetime.now(COLOMBIA_TZ).date())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if create_month_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def convert_to_partitioned(months_ahead=3, keep_legacy=True, batch_months=1):
+    """
+    Convierte la tabla de mediciones en una tabla particionada por mes.
+
+    Pasos (en una sola transacción):
+    1. Renombra la tabla actual a *_legacy.
+    2. Crea la tabla particionada con la misma estructura, la secuencia de ids
+       y la partición por defecto.
+    3. Crea una partición por cada mes con datos y los meses futuros.
+    4. Copia los datos mes a mes y ajusta la secuencia.
+    5. Elimina la tabla antigua salvo keep_legacy=True.
+
+    La copia mantiene un bloqueo exclusivo sobre la tabla: debe ejecutarse con
+    la ingesta detenida.
+    """
+    if connection.vendor != 'postgresql':
+        raise RuntimeError("El particionado solo está disponible en PostgreSQL.")
+    if is_partitioned():
+        logger.info(f"La tabla {TABLE} ya está particionada.")
+        return {'converted': False, 'partitions': [], 'rows': 0}
+
+    quote = connection.ops.quote_name
+    device_table = quote(Measurement._meta.get_field('device').related_model._meta.db_table)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {quote(TABLE)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(LEGACY_TABLE)}")
+
+            cursor.execute(f"SELECT min(date), max(date), coalesce(max(id), 0) FROM {quote(LEGACY_TABLE)}")
+            min_date, max_date, max_id = cursor.fetchone()
+
+            # Los nombres de restricciones e índices se fijan explícitamente porque
+            # la tabla antigua conserva los suyos tras el RENAME
+            cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {quote(SEQUENCE)}")
+            # LIKE copia todas las columnas actuales (incluidas las tipadas) con sus NOT NULL
+            cursor.execute(
+                f"CREATE TABLE {quote(TABLE)} ("
+                f"LIKE {quote(LEGACY_TABLE)} INCLUDING DEFAULTS, "
+                f"CONSTRAINT {quote(TABLE + '_part_pkey')} PRIMARY KEY (id, date), "
+                f"CONSTRAINT {quote(TABLE + '_part_device_date_uniq')} UNIQUE (device_id, date), "
+                f"CONSTRAINT {quote(TABLE + '_part_device_fk')} FOREIGN KEY (device_id) "
+                f"REFERENCES {device_table} (id) DEFERRABLE INITIALLY DEFERRED"
+                f") PARTITION BY RANGE (date)"
+            )
+            cursor.execute(f"ALTER TABLE {quote(TABLE)} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+            cursor.execute(f"ALTER SEQUENCE {quote(SEQUENCE)} OWNED BY {quote(TABLE)}.id")
+            cursor.execute(f"CREATE INDEX {quote(TABLE + '_part_date_idx')} ON {quote(TABLE)} (date)")
+            cursor.execute(f"CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {quote(TABLE)} DEFAULT")
+
+            # Índices declarados en Meta.indexes: se recrean con el mismo nombre en
+            # la tabla nueva (el de la tabla antigua se renombra con sufijo _legacy)
+            for index in Measurement._meta.indexes:
+                cursor.execute(f"ALTER INDEX IF EXISTS {quote(index.name)} RENAME TO {quote(index.name + '_legacy')}")
+
+        with connection.schema_editor(atomic=False) as schema_editor:
+            for index in Measurement._meta.indexes:
+                schema_editor.add_index(Measurement, index)
+
+        now = datetime.now(COLOMBIA_TZ)
+        first_month = _month_start((min_date or now).astimezone(COLOMBIA_TZ))
+        last_month = _month_start((max_date or now).astimezone(COLOMBIA_TZ))
+        current = _month_start(now)
+        horizon = max(last_month, _add_months(current, months_ahead))
+
+        created = []
+        month = first_month
+        while month <= horizon:
+            if create_month_partition(month):
+                created.append(partition_name(month))
+            month = _add_months(month, 1)
+
+        copied = 0
+        month = first_month
+        with connection.cursor() as cursor:
+            while min_date is not None and month <= last_month:
+                upper = _add_months(month, batch_months)
+                cursor.execute(
+                    f"INSERT INTO {quote(TABLE)} "
+                    f"SELECT * FROM {quote(LEGACY_TABLE)} "
+                    f"WHERE date >= %s AND date < %s",
+                    [_month_bound(month), _month_bound(upper)]
+                )
+                copied += cursor.rowcount
+                logger.info(f"Copiadas {cursor.rowcount} mediciones de {month:%Y-%m}.")
+                month = upper
+
+            cursor.execute("SELECT setval(%s, %s)", [SEQUENCE, max(max_id, 1)])
+            if not keep_legacy:
+                cursor.execute(f"DROP TABLE {quote(LEGACY_TABLE)}")
+
+    logger.info(f"Tabla {TABLE} particionada: {len(created)} particiones, {copied} mediciones copiadas.")
+    return {'converted': True, 'partitions': created, 'rows': copied}
+
+
+def apply_retention(keep_months, drop=False, today=None):
+    """
+    Retira las particiones de meses anteriores a los últimos keep_months.
+    Por defecto se desanexan (DETACH) y quedan como tablas independientes para
+    archivarlas; con drop=True se eliminan. En ambos casos es una operación de
+    metadatos, sin DELETE fila a fila.
+
+    Returns:
+        Lista de nombres de las particiones retiradas
+    """
+    if not is_partitioned():
+        logger.warning(f"La tabla {TABLE} no está particionada; no se aplica retención.")
+        return []
+
+    cutoff = _add_months(_month_start(today or datetime.now(COLOMBIA_TZ).date()), -keep_months)
+    quote = connection.ops.quote_name
+    removed = []
+
+    for month, name in list_partitions():
+        if month >= cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+        removed.append(name)
+        logger.info(f"Partición {name} {'eliminada' if drop else 'desanexada'}.")
+
+    return removed
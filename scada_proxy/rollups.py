@@ -0,0 +1,262 @@
+"""
+Pirámide de agregados (rollups) de mediciones: 15 minutos, 1 hora y 1 día.
+
+Por cada dispositivo y variable tipada (MEASUREMENT_TYPED_FIELDS) se guardan
+conteo, suma, mínimo, máximo, primer y último valor de cada intervalo. Los de
+15 minutos se calculan desde las mediciones crudas, los horarios desde los de
+15 minutos y los diarios desde los horarios. Tras cada página ingerida solo se
+recalculan los días afectados.
+
+select_resolution elige la resolución más gruesa que sirve para un rango y una
+granularidad; si ninguna sirve, el llamador debe leer las mediciones crudas.
+
+Los intervalos se calculan con date_bin, que requiere PostgreSQL 14 o
+superior; con un servidor anterior los rollups quedan desactivados.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Sum, Min, Max
+from django.db.models.functions import TruncDate
+
+from .models import Measurement, MeasurementRollup, MEASUREMENT_TYPED_FIELDS, to_local_date
+
+logger = logging.getLogger(__name__)
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+
+# Origen de los intervalos: medianoche en Colombia (sin horario de verano)
+ROLLUP_ORIGIN = COLOMBIA_TZ.localize(datetime(2000, 1, 1))
+
+RESOLUTIONS = {
+    '15m': timedelta(minutes=15),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+# Cada nivel se calcula a partir del anterior
+PYRAMID = [('15m', None), ('1h', '15m'), ('1d', '1h')]
+
+
+# date_bin existe desde PostgreSQL 14 (server_version_num)
+MIN_POSTGRES_VERSION = 140000
+
+_server_supported = None
+
+
+def check_rollups_support():
+    """
+    Lanza ImproperlyConfigured si la base de datos es un PostgreSQL anterior
+    a la 14 (sin date_bin). Otros motores no calculan rollups y no fallan.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    version = connection.pg_version
+    if version < MIN_POSTGRES_VERSION:
+        raise ImproperlyConfigured(
+            f"Los rollups de mediciones requieren PostgreSQL 14 o superior (date_bin); "
+            f"el servidor informa server_version_num={version}. Desactive SCADA_ROLLUPS_ENABLED."
+        )
+
+
+def _server_supports_rollups():
+    global _server_supported
+    if _server_supported is None:
+        try:
+            check_rollups_support()
+            _server_supported = True
+        except ImproperlyConfigured as e:
+            logger.error(f"{e} Los rollups quedan desactivados.")
+            _server_supported = False
+    return _server_supported
+
+
+def rollups_enabled():
+    """
+    Mantener los rollups al ingerir (SCADA_ROLLUPS_ENABLED). Siempre falso con
+    un PostgreSQL sin date_bin (anterior a la 14).
+    """
+    return getattr(settings, 'SCADA_ROLLUPS_ENABLED', True) and _server_supports_rollups()
+
+
+def rollups_readable():
+    """Leer de los rollups en tareas y vistas (SCADA_ROLLUPS_READ), una vez reconstruidos."""
+    return rollups_enabled() and getattr(settings, 'SCADA_ROLLUPS_READ', False)
+
+
+def _interval(resolution):
+    return f"{int(RESOLUTIONS[resolution].total_seconds())} seconds"
+
+
+def _day_bounds(start, end):
+    """Amplía [start, end] a días completos en hora Colombia: [medianoche, medianoche)."""
+    first_day = to_local_date(start)
+    last_day = to_local_date(end)
+    return (
+        COLOMBIA_TZ.localize(datetime.combine(first_day, time.min)),
+        COLOMBIA_TZ.localize(datetime.combine(last_day + timedelta(days=1), time.min)),
+    )
+
+
+_UPSERT_SET = (
+    "sample_count = EXCLUDED.sample_count, value_sum = EXCLUDED.value_sum, "
+    "value_min = EXCLUDED.value_min, value_max = EXCLUDED.value_max, "
+    "value_first = EXCLUDED.value_first, value_last = EXCLUDED.value_last"
+)
+_COLUMNS = (
+    "device_id, variable, resolution, bucket, sample_count, "
+    "value_sum, value_min, value_max, value_first, value_last"
+)
+
+
+def _delete_rollups(cursor, device_id, resolution, start, end):
+    rollup_table = connection.ops.quote_name(MeasurementRollup._meta.db_table)
+    cursor.execute(
+        f"DELETE FROM {rollup_table} "
+        f"WHERE device_id = %s AND resolution = %s AND bucket >= %s AND bucket < %s",
+        [device_id, resolution, start, end]
+    )
+
+
+def _rollup_from_raw(cursor, device_id, resolution, start, end):
+    quote = connection.ops.quote_name
+    rollup_table = quote(MeasurementRollup._meta.db_table)
+    measurement_table = quote(Measurement._meta.db_table)
+    variables = ', '.join(
+        f"('{key}', m.{column})" for column, key in MEASUREMENT_TYPED_FIELDS.items()
+    )
+    cursor.execute(
+        f"INSERT INTO {rollup_table} ({_COLUMNS}) "
+        f"SELECT m.device_id, v.variable, %s, date_bin(%s::interval, m.date, %s::timestamptz) AS b, "
+        f"count(*), sum(v.value), min(v.value), max(v.value), "
+        f"(array_agg(v.value ORDER BY m.date))[1], (array_agg(v.value ORDER BY m.date DESC))[1] "
+        f"FROM {measurement_table} m "
+        f"CROSS JOIN LATERAL (VALUES {variables}) AS v(variable, value) "
+        f"WHERE m.device_id = %s AND m.date >= %s AND m.date < %s AND v.value IS NOT NULL "
+        f"GROUP BY m.device_id, v.variable, b "
+        f"ON CONFLICT (device_id, variable, resolution, bucket) DO UPDATE SET {_UPSERT_SET}",
+        [resolution, _interval(resolution), ROLLUP_ORIGIN, device_id, start, end]
+    )
+
+
+def _rollup_from_child(cursor, device_id, resolution, child, start, end):
+    rollup_table = connection.ops.quote_name(MeasurementRollup._meta.db_table)
+    cursor.execute(
+        f"INSERT INTO {rollup_table} ({_COLUMNS}) "
+        f"SELECT device_id, variable, %s, date_bin(%s::interval, bucket, %s::timestamptz) AS b, "
+        f"sum(sample_count), sum(value_sum), min(value_min), max(value_max), "
+        f"(array_agg(value_first ORDER BY bucket))[1], (array_agg(value_last ORDER BY bucket DESC))[1] "
+        f"FROM {rollup_table} "
+        f"WHERE device_id = %s AND resolution = %s AND bucket >= %s AND bucket < %s "
+        f"GROUP BY device_id, variable, b "
+        f"ON CONFLICT (device_id, variable, resolution, bucket) DO UPDATE SET {_UPSERT_SET}",
+        [resolution, _interval(resolution), ROLLUP_ORIGIN, device_id, child, start, end]
+    )
+
+
+def refresh_rollups(device_id, start, end):
+    """
+    Recalcula los rollups de un dispositivo para los días (hora Colombia) que
+    contienen [start, end]. Es idempotente: se puede repetir sobre el mismo rango.
+
+    Los intervalos del rango se borran antes de recalcularlos (en la misma
+    transacción), para que no queden valores viejos en los intervalos cuyas
+    mediciones desaparecieron o quedaron en null.
+    """
+    if connection.vendor != 'postgresql':
+        return
+
+    day_start, day_end = _day_bounds(start, end)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for resolution, child in PYRAMID:
+            _delete_rollups(cursor, device_id, resolution, day_start, day_end)
+            if child is None:
+                _rollup_from_raw(cursor, device_id, resolution, day_start, day_end)
+            else:
+                _rollup_from_child(cursor, device_id, resolution, child, day_start, day_end)
+
+
+def _is_aligned(value, size):
+    return (value - ROLLUP_ORIGIN) % size == timedelta(0)
+
+
+def select_resolution(start, end, granularity=None):
+    """
+    Devuelve la resolución más gruesa cuyos intervalos caben en la granularidad
+    pedida y con la que [start, end) queda cubierto exactamente (inicio y fin
+    alineados). Devuelve None si hay que usar las mediciones crudas.
+    """
+    for resolution in ('1d', '1h', '15m'):
+        size = RESOLUTIONS[resolution]
+        if granularity is not None and size > granularity:
+            continue
+        if _is_aligned(start, size) and _is_aligned(end, size):
+            return resolution
+    return None
+
+
+def rollup_queryset(device_ids, variable, start, end, resolution):
+    """Rollups de una variable para varios dispositivos en [start, end)."""
+    return MeasurementRollup.objects.filter(
+        device_id__in=device_ids,
+        variable=variable,
+        resolution=resolution,
+        bucket__gte=start,
+        bucket__lt=end,
+    )
+
+
+def daily_summary(device_ids, variable, start, end, resolution):
+    """
+    Resumen diario (hora Colombia) de una variable a partir de los rollups.
+    Devuelve una lista ordenada de dicts con date, average, max, min, sum y count.
+    """
+    rows = (
+        rollup_queryset(device_ids, variable, start, end, resolution)
+        .annotate(day=TruncDate('bucket', tzinfo=COLOMBIA_TZ))
+        .values('day')
+        .annotate(
+            count=Sum('sample_count'),
+            total=Sum('value_sum'),
+            minimum=Min('value_min'),
+            maximum=Max('value_max'),
+        )
+        .order_by('day')
+    )
+    return [
+        {
+            'date': row['day'],
+            'average': row['total'] / row['count'] if row['count'] else None,
+            'max': row['maximum'],
+            'min': row['minimum'],
+            'sum': row['total'],
+            'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def range_totals(device_ids, variable, start, end, resolution):
+    """Suma y número de muestras de una variable en [start, end) a partir de los rollups."""
+    totals = rollup_queryset(device_ids, variable, start, end, resolution).aggregate(
+        total=Sum('value_sum'),
+        count=Sum('sample_count'),
+    )
+    return totals['total'] or 0.0, totals['count'] or 0
+
+
+def rebuild_rollups(device_id, start, end, chunk_days=7):
+    """Recalcula los rollups de un dispositivo en bloques de chunk_days días."""
+    check_rollups_support()
+    day_start, day_end = _day_bounds(start, end)
+    chunk = timedelta(days=chunk_days)
+    current = day_start
+    while current < day_end:
+        chunk_end = min(current + chunk, day_end)
+        refresh_rollups(device_id, current, chunk_end - timedelta(microseconds=1))
+        current = chunk_end
@@ -1,8 +1,264 @@
+import logging
 import os
+import queue
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Configuración de la conexión HTTP con SCADA
+SCADA_POOL_SIZE = int(os.getenv('SCADA_POOL_SIZE', 20))
+SCADA_CONNECT_TIMEOUT = float(os.getenv('SCADA_CONNECT_TIMEOUT', 5))
+SCADA_READ_TIMEOUT = float(os.getenv('SCADA_READ_TIMEOUT', 60))
+SCADA_MAX_RETRIES = int(os.getenv('SCADA_MAX_RETRIES', 4))
+SCADA_RETRY_BACKOFF = float(os.getenv('SCADA_RETRY_BACKOFF', 0.5))
+SCADA_RETRY_JITTER = float(os.getenv('SCADA_RETRY_JITTER', 0.5))
+# Peticiones por segundo permitidas hacia cada host SCADA (0 = sin límite)
+SCADA_RATE_LIMIT_PER_SECOND = float(os.getenv('SCADA_RATE_LIMIT_PER_SECOND', 20))
+SCADA_RATE_LIMIT_BURST = int(os.getenv('SCADA_RATE_LIMIT_BURST', 10))
+# Tamaño de página por defecto de los generadores iter_* y páginas pedidas por adelantado
+SCADA_PAGE_SIZE = int(os.getenv('SCADA_PAGE_SIZE', 1000))
+SCADA_PREFETCH_PAGES = int(os.getenv('SCADA_PREFETCH_PAGES', 2))
+
+# Errores transitorios que se reintentan dentro de la misma página
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Token SCADA compartido entre procesos (caché 'scada', respaldada por Redis)
+SCADA_TOKEN_CACHE_ALIAS = os.getenv('SCADA_TOKEN_CACHE_ALIAS', 'scada')
+SCADA_TOKEN_CACHE_KEY = 'scada:auth:token'
+SCADA_TOKEN_LOCK_KEY = 'scada:auth:token:lock'
+SCADA_TOKEN_TTL = timedelta(hours=23)
+# Se refresca antes de expirar para que nadie use un token a punto de caducar
+SCADA_TOKEN_REFRESH_MARGIN = timedelta(minutes=int(os.getenv('SCADA_TOKEN_REFRESH_MARGIN_MINUTES', 10)))
+SCADA_TOKEN_LOCK_TIMEOUT = int(os.getenv('SCADA_TOKEN_LOCK_TIMEOUT', 30))  # segundos
+SCADA_TOKEN_WAIT_TIMEOUT = float(os.getenv('SCADA_TOKEN_WAIT_TIMEOUT', 15))  # segundos
+SCADA_TOKEN_WAIT_INTERVAL = 0.25  # segundos
+
+_rate_limiters: Dict[str, "RateLimiter"] = {}
+_rate_limiters_lock = threading.Lock()
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Devuelve la sesión HTTP compartida del proceso.
+
+    La sesión mantiene un pool de conexiones keep-alive hacia SCADA, de modo que
+    las páginas sucesivas reutilizan la conexión TCP+TLS. Los errores transitorios
+    (conexión, 429 y 5xx) se reintentan por petición con backoff exponencial y
+    jitter, sin reiniciar la descarga desde el offset 0.
+    Se recrea tras un fork (workers prefork de Celery, gunicorn) porque los
+    sockets no deben compartirse entre procesos.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            retry = Retry(
+                total=SCADA_MAX_RETRIES,
+                connect=SCADA_MAX_RETRIES,
+                read=SCADA_MAX_RETRIES,
+                status=SCADA_MAX_RETRIES,
+                backoff_factor=SCADA_RETRY_BACKOFF,
+                backoff_jitter=SCADA_RETRY_JITTER,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=frozenset({"GET", "POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,  # Devuelve la última respuesta; raise_for_status decide
+            )
+            adapter = HTTPAdapter(
+                pool_connections=SCADA_POOL_SIZE,
+                pool_maxsize=SCADA_POOL_SIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Connection": "keep-alive"})
+            _session = session
+            _session_pid = pid
+
+    return _session
+
+
+class RateLimiter:
+    """
+    Token bucket seguro entre hilos. acquire() bloquea hasta que haya un
+    permiso disponible, de modo que varios hilos descargando en paralelo no
+    superen la tasa configurada contra el mismo host.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_rate_limiter(url: str) -> RateLimiter:
+    """Devuelve el limitador de tasa del host de la URL (uno por proceso y host)."""
+    host = urlsplit(url).netloc
+    limiter = _rate_limiters.get(host)
+    if limiter is None:
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.setdefault(
+                host, RateLimiter(SCADA_RATE_LIMIT_PER_SECOND, SCADA_RATE_LIMIT_BURST)
+            )
+    return limiter
+
+
+_END_OF_PAGES = object()
+
+
+def prefetch_pages(pages: Iterable[Any], max_prefetch: int) -> Iterator[Any]:
+    """
+    Consume un iterable de páginas en un hilo productor y las entrega a
+    través de una cola acotada, de modo que la página N+1 se descarga mientras
+    la página N se procesa. La cola limita la memoria a max_prefetch páginas.
+
+    Los errores del productor se relanzan en el consumidor. Si el consumidor
+    deja de iterar (error o cierre), el productor se detiene.
+    """
+    if max_prefetch <= 0:
+        yield from pages
+        return
+
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=max_prefetch)
+    stop = threading.Event()
+
+    def _put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for page in pages:
+                if not _put(page):
+                    return
+        except BaseException as e:
+            _put(e)
+            return
+        _put(_END_OF_PAGES)
+
+    producer = threading.Thread(target=_produce, name='scada-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_PAGES:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join(timeout=5)
+
+
+def _get_token_cache():
+    from django.core.cache import caches
+    from django.core.cache.backends.base import InvalidCacheBackendError
+
+    try:
+        return caches[SCADA_TOKEN_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _read_cached_token() -> Optional[Dict[str, Any]]:
+    try:
+        return _get_token_cache().get(SCADA_TOKEN_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"No se pudo leer el token SCADA de la caché: {e}")
+        return None
+
+
+def _entry_is_usable(entry: Dict[str, Any]) -> bool:
+    """El token aún no ha expirado."""
+    return bool(entry.get("token")) and time.time() < entry.get("expires_at", 0)
+
+
+def _entry_is_fresh(entry: Dict[str, Any]) -> bool:
+    """El token no ha entrado en el margen de refresco."""
+    margin = SCADA_TOKEN_REFRESH_MARGIN.total_seconds()
+    return bool(entry.get("token")) and time.time() < entry.get("expires_at", 0) - margin
+
+
+def _acquire_refresh_lock() -> Optional[str]:
+    """
+    Candado distribuido (SET NX con expiración) para que un solo proceso haga
+    login a la vez. Devuelve el identificador con el que se tomó el candado
+    (None si lo tiene otro proceso). Si la caché falla, se permite el login
+    para no bloquear.
+    """
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    try:
+        if _get_token_cache().add(SCADA_TOKEN_LOCK_KEY, owner, timeout=SCADA_TOKEN_LOCK_TIMEOUT):
+            return owner
+        return None
+    except Exception as e:
+        logger.warning(f"No se pudo adquirir el candado del token SCADA: {e}")
+        return owner
+
+
+def _release_refresh_lock(owner: str) -> None:
+    """
+    Libera el candado solo si sigue siendo de `owner`: si el login tardó más
+    que SCADA_TOKEN_LOCK_TIMEOUT el candado expiró y puede ser de otro proceso.
+    """
+    try:
+        cache = _get_token_cache()
+        if cache.get(SCADA_TOKEN_LOCK_KEY) == owner:
+            cache.delete(SCADA_TOKEN_LOCK_KEY)
+    except Exception as e:
+        logger.warning(f"No se pudo liberar el candado del token SCADA: {e}")
+
+
+def _wait_for_cached_token() -> Optional[Dict[str, Any]]:
+    """Espera a que el proceso que tiene el candado publique un token nuevo."""
+    deadline = time.monotonic() + SCADA_TOKEN_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(SCADA_TOKEN_WAIT_INTERVAL)
+        entry = _read_cached_token()
+        if entry and _entry_is_fresh(entry):
+            return entry
+    return None
+
 
 class ScadaConnectorClient:
     """
@@ -11,22 +267,87 @@ class ScadaConnectorClient:
     """
     # Usar variable de entorno para la URL base
     base_url: str = os.getenv('SCADA_BASE_URL')
+    # Timeouts (conexión, lectura) en segundos
+    timeout = (SCADA_CONNECT_TIMEOUT, SCADA_READ_TIMEOUT)
 
     def __init__(self) -> None:
         self._token: Optional[str] = None
         self._token_expiration: Optional[datetime] = None
+        # Último token rechazado por SCADA: los llamadores que lo siguen pasando
+        # (p. ej. los generadores paginados) usan el token vigente en su lugar
+        self._rejected_token: Optional[str] = None
 
     def _is_token_valid(self) -> bool:
         return (
             self._token
             and self._token_expiration
-            and datetime.now(timezone.utc) < self._token_expiration
+            and datetime.now(timezone.utc) < self._token_expiration - SCADA_TOKEN_REFRESH_MARGIN
         )
 
     def get_token(self) -> str:
+        """
+        Devuelve un token SCADA válido.
+
+        El token se comparte entre procesos a través de la caché 'scada' (Redis):
+        solo el proceso que consigue el candado de refresco hace login, el resto
+        reutiliza el token anterior mientras no haya expirado o espera a que el
+        nuevo aparezca en la caché. Si la caché no está disponible se hace login
+        directamente, como antes.
+        """
         if self._is_token_valid():
             return self._token
 
+        entry = _read_cached_token()
+        if entry and _entry_is_fresh(entry):
+            return self._remember_token(entry)
+
+        lock_owner = _acquire_refresh_lock()
+        if lock_owner:
+            try:
+                # Otro proceso pudo refrescar entre la lectura y el candado
+                entry = _read_cached_token()
+                if entry and _entry_is_fresh(entry):
+                    return self._remember_token(entry)
+                return self._remember_token(self._login())
+            finally:
+                _release_refresh_lock(lock_owner)
+
+        # Otro proceso está refrescando: reutilizar el token anterior si sigue vigente
+        if entry and _entry_is_usable(entry):
+            return self._remember_token(entry)
+
+        entry = _wait_for_cached_token()
+        if entry:
+            return self._remember_token(entry)
+
+        logger.warning("No se obtuvo el token SCADA compartido a tiempo; iniciando sesión directamente.")
+        return self._remember_token(self._login())
+
+    def invalidate_token(self, token: str) -> None:
+        """
+        Descarta un token rechazado por SCADA (401), tanto en memoria como en la
+        caché compartida, para que la siguiente llamada a get_token haga login.
+        Solo se borra la caché si todavía contiene ese mismo token.
+        """
+        self._rejected_token = token
+        if self._token == token:
+            self._token = None
+            self._token_expiration = None
+
+        entry = _read_cached_token()
+        if entry and entry.get("token") == token:
+            try:
+                _get_token_cache().delete(SCADA_TOKEN_CACHE_KEY)
+            except Exception as e:
+                logger.warning(f"No se pudo invalidar el token SCADA en caché: {e}")
+
+    def _remember_token(self, entry: Dict[str, Any]) -> str:
+        self._token = entry["token"]
+        self._token_expiration = datetime.fromtimestamp(entry["expires_at"], timezone.utc)
+        return self._token
+
+    def _login(self) -> Dict[str, Any]:
+        """Inicia sesión en SCADA y publica el token en la caché compartida."""
         # Accede a las variables de entorno
         username = os.getenv("SCADA_USERNAME")
         password = os.getenv("SCADA_PASSWORD")
@@ -37,23 +358,56 @@ class ScadaConnectorClient:
         url = f"{self.base_url}/auth/login"
         headers = {"accept": "application/json", "Content-Type": "application/json"}
         data = {"username": username, "password": password}
-        response = requests.post(url, headers=headers, json=data)
+        get_rate_limiter(url).acquire()
+        response = get_session().post(url, headers=headers, json=data, timeout=self.timeout)
+        response.raise_for_status()
 
-        if response.status_code == 200:
-            auth_data = response.json()
-            self._token = auth_data.get("accessToken")
-            self._token_expiration = datetime.now(timezone.utc) + timedelta(hours=23)
-            return self._token
-        else:
-            response.raise_for_status()
+        auth_data = response.json()
+        if not auth_data.get("accessToken"):
+            # No se publica un token nulo en la caché compartida
+            raise requests.exceptions.HTTPError("SCADA no devolvió accessToken al iniciar sesión.", response=response)
+        expires_at = datetime.now(timezone.utc) + SCADA_TOKEN_TTL
+        entry = {"token": auth_data.get("accessToken"), "expires_at": expires_at.timestamp()}
 
-    def get_institutions(self, token: str) -> Dict[str, Any]:
-        url = f"{self.base_url}/institution"
+        try:
+            _get_token_cache().set(
+                SCADA_TOKEN_CACHE_KEY,
+                entry,
+                timeout=int(SCADA_TOKEN_TTL.total_seconds())
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el token SCADA en caché: {e}")
+
+        return entry
+
+    def _authorized_get(self, url: str, token: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET autenticado. Si SCADA responde 401 (token revocado o expirado antes
+        de tiempo) se invalida el token, se obtiene uno nuevo y se reintenta una vez.
+        Si `token` ya fue invalidado se usa directamente el token vigente, sin
+        pagar otro 401 por cada página.
+        """
+        if token == self._rejected_token:
+            token = self.get_token()
         headers = {"accept": "application/json", "Authorization": f"Bearer {token}"}
-        response = requests.get(url, headers=headers)
+        limiter = get_rate_limiter(url)
+        limiter.acquire()
+        response = get_session().get(url, headers=headers, params=params, timeout=self.timeout)
+
+        if response.status_code == 401:
+            logger.warning("Token SCADA rechazado (401); renovando y reintentando.")
+            self.invalidate_token(token)
+            headers["Authorization"] = f"Bearer {self.get_token()}"
+            limiter.acquire()
+            response = get_session().get(url, headers=headers, params=params, timeout=self.timeout)
+
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         return response.json()
 
+    def get_institutions(self, token: str) -> Dict[str, Any]:
+        url = f"{self.base_url}/institution"
+        return self._authorized_get(url, token)
+
     def get_device_categories(
         self,
         token: str,
@@ -62,11 +416,8 @@ class ScadaConnectorClient:
         offset: Optional[int] = None,
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/device-category"
-        headers = {"accept": "application/json", "Authorization": f"Bearer {token}"}
         params = {k: v for k, v in {"name": name, "limit": limit, "offset": offset}.items() if v is not None}
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._authorized_get(url, token, params)
 
     def get_devices(
         self,
@@ -80,7 +431,6 @@ class ScadaConnectorClient:
         offset: Optional[int] = None,
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/device"
-        headers = {"accept": "application/json", "Authorization": f"Bearer {token}"}
         params = {}
         # Priorizar filtro por SCADA ID de categoría si se proporciona
         if category_scada_id:
@@ -104,9 +454,7 @@ class ScadaConnectorClient:
         if offset is not None:
             params["offset"] = offset
 
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._authorized_get(url, token, params)
 
     def get_measurements(
         self,
@@ -119,7 +467,6 @@ class ScadaConnectorClient:
         offset: Optional[int] = None,
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/measurement/device/{device_id}"
-        headers = {"accept": "application/json", "Authorization": f"Bearer {token}"}
         params = {k: v for k, v in {
             "from": from_date,
             "to": to_date,
@@ -127,6 +474,117 @@ class ScadaConnectorClient:
             "limit": limit,
             "offset": offset,
         }.items() if v is not None}
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
\ No newline at end of file
+        return self._authorized_get(url, token, params)
+
+    # ------------------------------------------------------------------
+    # Generadores paginados
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _iter_pages(fetch_page: Callable[[int, int], Dict[str, Any]], page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre un endpoint paginado con limit/offset y genera la lista 'data'
+        de cada página. Termina con la primera página vacía o incompleta, o si
+        una página empieza igual que la anterior (servidor que ignora offset).
+        """
+        offset = 0
+        previous_first = None
+        while True:
+            page = fetch_page(page_size, offset).get("data", [])
+            if not page:
+                return
+            if page[0] == previous_first:
+                logger.warning(
+                    f"SCADA devolvió la misma página con offset {offset}; se detiene la paginación."
+                )
+                return
+            previous_first = page[0]
+            yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def iter_device_pages(
+        self,
+        token: str,
+        page_size: int = SCADA_PAGE_SIZE,
+        prefetch: int = SCADA_PREFETCH_PAGES,
+        **filters: Any,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Genera páginas de dispositivos; acepta los mismos filtros que get_devices."""
+        pages = self._iter_pages(
+            lambda limit, offset: self.get_devices(token, limit=limit, offset=offset, **filters),
+            page_size,
+        )
+        return prefetch_pages(pages, prefetch)
+
+    def iter_devices(
+        self,
+        token: str,
+        page_size: int = SCADA_PAGE_SIZE,
+        prefetch: int = SCADA_PREFETCH_PAGES,
+        **filters: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Genera los dispositivos de SCADA uno a uno, pidiendo las páginas de forma
+        perezosa (y prefetch páginas por adelantado), con memoria constante.
+        """
+        for page in self.iter_device_pages(token, page_size=page_size, prefetch=prefetch, **filters):
+            yield from page
+
+    def iter_device_categories(
+        self,
+        token: str,
+        page_size: int = SCADA_PAGE_SIZE,
+        prefetch: int = SCADA_PREFETCH_PAGES,
+        name: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Genera las categorías de dispositivos de SCADA una a una."""
+        pages = self._iter_pages(
+            lambda limit, offset: self.get_device_categories(token, name=name, limit=limit, offset=offset),
+            page_size,
+        )
+        for page in prefetch_pages(pages, prefetch):
+            yield from page
+
+    def iter_measurement_pages(
+        self,
+        token: str,
+        device_id: Union[str, int],
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        order_by: str = "date asc",
+        page_size: int = SCADA_PAGE_SIZE,
+        prefetch: int = SCADA_PREFETCH_PAGES,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Genera páginas de mediciones de un dispositivo (por defecto en orden ascendente)."""
+        pages = self._iter_pages(
+            lambda limit, offset: self.get_measurements(
+                token,
+                device_id=device_id,
+                from_date=from_date,
+                to_date=to_date,
+                order_by=order_by,
+                limit=limit,
+                offset=offset,
+            ),
+            page_size,
+        )
+        return prefetch_pages(pages, prefetch)
+
+    def iter_measurements(
+        self,
+        token: str,
+        device_id: Union[str, int],
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        order_by: str = "date asc",
+        page_size: int = SCADA_PAGE_SIZE,
+        prefetch: int = SCADA_PREFETCH_PAGES,
+    ) -> Iterator[Dict[str, Any]]:
+        """Genera las mediciones de un dispositivo una a una, con prefetch de páginas."""
+        for page in self.iter_measurement_pages(
+            token, device_id, from_date=from_date, to_date=to_date,
+            order_by=order_by, page_size=page_size, prefetch=prefetch,
+        ):
+            yield from page
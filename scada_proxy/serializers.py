@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from drf_spectacular.utils import OpenApiExample
-from .models import DeviceCategory, Device, Measurement, Institution, TaskProgress
+from .models import DeviceCategory, Device, Measurement, Institution, TaskProgress, DeviceLatestState
 
 # ========================= Institution =========================
 
@@ -74,13 +74,34 @@ class MeasurementSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Measurement
-        fields = '__all__'  # Esto incluirá todos los campos del modelo Measurement
+        # Lista explícita: las columnas tipadas son internas y no forman parte de la API
+        fields = ['id', 'device', 'device_name', 'scada_id', 'date', 'data']
         extra_kwargs = {
             'variable_key': {'help_text': 'Clave de la variable medida'},
             'value': {'help_text': 'Valor medido'},
             'timestamp': {'help_text': 'Marca de tiempo de la medición en formato ISO 8601'},
         }
 
+# ========================= DeviceLatestState =========================
+
+class DeviceLatestStateSerializer(serializers.ModelSerializer):
+    """
+    Serializador del último estado (última medición) de cada dispositivo.
+    """
+    device_name = serializers.CharField(source='device.name', read_only=True)
+    scada_id = serializers.CharField(source='device.scada_id', read_only=True)
+    category = serializers.CharField(source='device.category.name', read_only=True, default=None)
+    institution = serializers.IntegerField(source='device.institution_id', read_only=True)
+    status = serializers.CharField(source='device.status', read_only=True)
+    date = serializers.DateTimeField(source='last_measurement_date', read_only=True)
+
+    class Meta:
+        model = DeviceLatestState
+        fields = ['device', 'device_name', 'scada_id', 'category', 'institution', 'status', 'date', 'data']
+        extra_kwargs = {
+            'data': {'help_text': 'Datos completos de la última medición en formato JSON'},
+        }
+
 # ========================= TaskProgress =========================
 
 class TaskProgressSerializer(serializers.ModelSerializer):
@@ -0,0 +1,364 @@
+"""
+Sincronización de metadatos SCADA (instituciones, categorías y dispositivos).
+
+El estado local se carga una sola vez en diccionarios indexados por scada_id,
+se calcula la diferencia contra la respuesta de SCADA y se aplica con
+bulk_create / bulk_update y una desactivación en bloque. Si la respuesta es
+idéntica a la última sincronizada (mismo hash), no se escribe nada.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.db import transaction
+
+from .models import Institution, DeviceCategory, Device
+
+logger = logging.getLogger(__name__)
+
+METADATA_HASH_CACHE_KEY = 'scada:metadata:hash'
+# Aunque el payload no cambie, se fuerza una comparación completa cada día
+METADATA_HASH_TTL = 24 * 60 * 60
+BULK_BATCH_SIZE = 500
+# Tamaño de página al listar dispositivos en SCADA
+DEVICE_PAGE_SIZE = 500
+
+
+def _get_sync_cache():
+    from django.core.cache import caches
+    from django.core.cache.backends.base import InvalidCacheBackendError
+
+    try:
+        return caches['scada']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _hash_item(hasher, item):
+    hasher.update(json.dumps(item, sort_keys=True, default=str).encode('utf-8'))
+    hasher.update(b'\n')
+
+
+def update_payload_hash(hasher, items):
+    """
+    Añade una sección de la respuesta de SCADA al hash, elemento a elemento
+    (independiente del orden de las claves y de cómo se paginó la respuesta).
+    """
+    for item in items:
+        _hash_item(hasher, item)
+    hasher.update(b'\x1e')  # Fin de sección
+
+
+def payload_hash(institutions_data, categories_data, devices_data):
+    """Hash estable de la respuesta de SCADA (independiente del orden de las claves)."""
+    hasher = hashlib.sha256()
+    for items in (institutions_data, categories_data, devices_data):
+        update_payload_hash(hasher, items)
+    return hasher.hexdigest()
+
+
+def _related_scada_id(device_data, name):
+    """
+    Obtiene el scada_id de la categoría o institución de un dispositivo.
+    SCADA lo devuelve anidado ({'category': {'id': ...}}); se acepta también
+    la forma plana ('category_id').
+    """
+    related = device_data.get(name)
+    if isinstance(related, dict) and related.get('id'):
+        return str(related['id'])
+    if device_data.get(f'{name}_id'):
+        return str(device_data[f'{name}_id'])
+    if related:
+        logger.warning(f"Dispositivo {device_data.get('name', 'N/A')} tiene formato de {name} inesperado: {related}")
+    return None
+
+
+def _sync_simple(model, items, fields, build_values):
+    """
+    Aplica la diferencia de un modelo sin relaciones (Institution, DeviceCategory).
+
+    Returns:
+        Tupla (mapa scada_id -> pk, creados, actualizados)
+    """
+    existing = {obj.scada_id: obj for obj in model.objects.all()}
+    to_create, to_update = [], []
+
+    for item in items:
+        scada_id = str(item['id'])
+        values = build_values(item)
+        obj = existing.get(scada_id)
+        if obj is None:
+            obj = model(scada_id=scada_id, **values)
+            to_create.append(obj)
+            existing[scada_id] = obj
+            continue
+        changed = False
+        for field, value in values.items():
+            if getattr(obj, field) != value:
+                setattr(obj, field, value)
+                changed = True
+        if changed:
+            to_update.append(obj)
+
+    if to_create:
+        model.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    if to_update:
+        model.objects.bulk_update(to_update, fields, batch_size=BULK_BATCH_SIZE)
+
+    return {scada_id: obj.pk for scada_id, obj in existing.items()}, len(to_create), len(to_update)
+
+
+def _sync_devices(devices_data, category_ids, institution_ids):
+    """
+    Aplica la diferencia de dispositivos. Si la categoría o institución de un
+    dispositivo no se puede resolver, se conserva la relación que ya tenía.
+    Los dispositivos que SCADA ya no lista se desactivan.
+
+    devices_data son los dispositivos reducidos por _collect_devices
+    (category_id e institution_id son scada_id de SCADA).
+    """
+    fields = ['name', 'status', 'is_active', 'category_id', 'institution_id']
+    existing = {
+        device['scada_id']: device
+        for device in Device.objects.values('id', 'scada_id', *fields)
+    }
+    to_create, to_update = [], []
+    fetched_ids = set()
+    complete, incomplete = 0, 0
+
+    for device_data in devices_data:
+        scada_id = str(device_data['id'])
+        fetched_ids.add(scada_id)
+        current = existing.get(scada_id)
+
+        category_scada_id = device_data['category_id']
+        category_id = category_ids.get(category_scada_id) if category_scada_id else None
+        if category_scada_id and category_id is None:
+            logger.warning(f"Categoría {category_scada_id} no encontrada para el dispositivo {device_data['name']}")
+
+        institution_scada_id = device_data['institution_id']
+        institution_id = institution_ids.get(institution_scada_id) if institution_scada_id else None
+        if institution_scada_id and institution_id is None:
+            logger.warning(f"Institución {institution_scada_id} no encontrada para el dispositivo {device_data['name']}")
+
+        values = {
+            'name': device_data['name'],
+            'status': device_data['status'],
+            'is_active': True,
+            # IMPORTANTE: no borrar relaciones existentes si no se pudieron resolver
+            'category_id': category_id if category_id is not None else (current or {}).get('category_id'),
+            'institution_id': institution_id if institution_id is not None else (current or {}).get('institution_id'),
+        }
+
+        if values['category_id'] and values['institution_id']:
+            complete += 1
+        else:
+            incomplete += 1
+
+        if current is None:
+            to_create.append(Device(scada_id=scada_id, **values))
+        elif any(current[field] != value for field, value in values.items()):
+            to_update.append(Device(id=current['id'], scada_id=scada_id, **values))
+
+    if to_create:
+        Device.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    if to_update:
+        Device.objects.bulk_update(to_update, fields, batch_size=BULK_BATCH_SIZE)
+
+    deactivated = 0
+    if fetched_ids:
+        to_deactivate = [
+            scada_id for scada_id, device in existing.items()
+            if device['is_active'] and scada_id not in fetched_ids
+        ]
+        if to_deactivate:
+            deactivated = Device.objects.filter(scada_id__in=to_deactivate).update(is_active=False)
+    else:
+        # Una lista vacía suele ser un fallo de la API, no la baja de todos los dispositivos
+        logger.warning("SCADA no devolvió dispositivos; no se desactiva ninguno.")
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deactivated': deactivated,
+        'complete': complete,
+        'incomplete': incomplete,
+    }
+
+
+def _collect_devices(hasher, devices_data):
+    """
+    Recorre los dispositivos de SCADA (lista o generador paginado) y los añade
+    al hash. De cada uno solo se conservan los campos que usa _sync_devices,
+    con las relaciones ya reducidas a su scada_id.
+    """
+    devices = []
+    for device_data in devices_data:
+        _hash_item(hasher, device_data)
+        devices.append({
+            'id': device_data['id'],
+            'name': device_data['name'],
+            'status': device_data.get('status', ''),
+            'category_id': _related_scada_id(device_data, 'category'),
+            'institution_id': _related_scada_id(device_data, 'institution'),
+        })
+    hasher.update(b'\x1e')  # Fin de sección
+    return devices
+
+
+def sync_metadata(institutions_data, categories_data, devices_data, force=False):
+    """
+    Sincroniza instituciones, categorías y dispositivos con la respuesta de SCADA.
+
+    Los dispositivos se recorren (y, si es un generador, se descargan) antes
+    de abrir la transacción: así el hash del payload se conoce antes de
+    escribir y la descarga no mantiene una transacción abierta.
+
+    Args:
+        institutions_data, categories_data: listas 'data' de la API
+        devices_data: iterable de dispositivos (lista o generador paginado)
+        force: ignorar el hash y comparar siempre contra la base de datos
+
+    Returns:
+        Dict con el resumen; 'skipped' es True si el payload no cambió y no
+        se escribió nada.
+    """
+    hasher = hashlib.sha256()
+    update_payload_hash(hasher, institutions_data)
+    update_payload_hash(hasher, categories_data)
+    devices_data = _collect_devices(hasher, devices_data)
+    digest = hasher.hexdigest()
+    cache = _get_sync_cache()
+
+    if not force:
+        try:
+            if cache.get(METADATA_HASH_CACHE_KEY) == digest:
+                logger.info("Metadatos SCADA sin cambios desde la última sincronización; se omite la escritura.")
+                return {'skipped': True}
+        except Exception as e:
+            logger.warning(f"No se pudo leer el hash de metadatos: {e}")
+
+    with transaction.atomic():
+        institution_ids, inst_created, inst_updated = _sync_simple(
+            Institution,
+            institutions_data,
+            ['name'],
+            lambda item: {'name': item['name']}
+        )
+        category_ids, cat_created, cat_updated = _sync_simple(
+            DeviceCategory,
+            categories_data,
+            ['name', 'description'],
+            lambda item: {'name': item['name'], 'description': item.get('description', '')}
+        )
+        devices = _sync_devices(devices_data, category_ids, institution_ids)
+
+    def _store_hash():
+        try:
+            cache.set(METADATA_HASH_CACHE_KEY, digest, timeout=METADATA_HASH_TTL)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el hash de metadatos: {e}")
+
+    # Solo se recuerda el payload si la transacción (incluida la del llamador) se confirma
+    transaction.on_commit(_store_hash)
+
+    summary = {
+        'skipped': False,
+        'institutions': {'created': inst_created, 'updated': inst_updated},
+        'categories': {'created': cat_created, 'updated': cat_updated},
+        'devices': devices,
+    }
+    logger.info(
+        f"Metadatos sincronizados: instituciones +{inst_created}/~{inst_updated}, "
+        f"categorías +{cat_created}/~{cat_updated}, dispositivos +{devices['created']}/"
+        f"~{devices['updated']}/-{devices['deactivated']}"
+    )
+    return summary
+
+
+def fetch_and_sync_metadata(client, token=None, force=False):
+    """
+    Descarga los metadatos de SCADA y los sincroniza con sync_metadata. Los
+    dispositivos se piden página a página; la transacción se abre al terminar
+    la descarga, así que no debe llamarse dentro de transaction.atomic.
+    """
+    token = token or client.get_token()
+    institutions_data = client.get_institutions(token).get('data', [])
+    categories_data = list(client.iter_device_categories(token, page_size=DEVICE_PAGE_SIZE))
+    devices_data = fetch_all_devices(client, token)
+    return sync_metadata(institutions_data, categories_data, devices_data, force=force)
+
+
+def fetch_all_devices(client, token, page_size=DEVICE_PAGE_SIZE):
+    """
+    Genera el listado completo de dispositivos de SCADA, pidiendo las páginas
+    a medida que se consumen (no se guarda la respuesta completa en memoria).
+    """
+    return client.iter_devices(token, page_size=page_size)
+
+
+def refresh_device_status(devices_data):
+    """
+    Actualiza nombre, estado y relaciones de los dispositivos activos a partir
+    de un listado completo de SCADA, emparejando por scada_id en memoria.
+    Solo se escriben los dispositivos y campos que cambiaron, en un bulk_update.
+    Las relaciones solo se cambian si SCADA trae una categoría/institución que
+    existe localmente; nunca se ponen a null.
+
+    devices_data puede ser un generador: se recorre una sola vez contra los
+    dispositivos activos locales, sin guardar la respuesta de SCADA.
+
+    Returns:
+        Dict con 'matched', 'updated' y 'missing' (activos que SCADA no listó)
+    """
+    active_devices = {
+        device.scada_id: device
+        for device in Device.objects.filter(is_active=True).only(
+            'id', 'scada_id', 'name', 'status', 'category_id', 'institution_id'
+        )
+    }
+    category_ids = dict(DeviceCategory.objects.values_list('scada_id', 'id'))
+    institution_ids = dict(Institution.objects.values_list('scada_id', 'id'))
+
+    to_update = []
+    changed_fields = set()
+    matched_ids = set()
+
+    for device_data in devices_data:
+        device = active_devices.get(str(device_data['id']))
+        if device is None or device.scada_id in matched_ids:
+            continue
+        matched_ids.add(device.scada_id)
+
+        values = {
+            'name': device_data.get('name', device.name),
+            'status': device_data.get('status', device.status),
+        }
+        category_scada_id = _related_scada_id(device_data, 'category')
+        if category_scada_id:
+            if category_scada_id in category_ids:
+                values['category_id'] = category_ids[category_scada_id]
+            else:
+                logger.warning(f"Categoría SCADA {category_scada_id} no encontrada para {device.name}")
+        institution_scada_id = _related_scada_id(device_data, 'institution')
+        if institution_scada_id:
+            if institution_scada_id in institution_ids:
+                values['institution_id'] = institution_ids[institution_scada_id]
+            else:
+                logger.warning(f"Institución SCADA {institution_scada_id} no encontrada para {device.name}")
+
+        device_changed = False
+        for field, value in values.items():
+            if getattr(device, field) != value:
+                setattr(device, field, value)
+                changed_fields.add(field)
+                device_changed = True
+        if device_changed:
+            to_update.append(device)
+
+    if to_update:
+        Device.objects.bulk_update(to_update, sorted(changed_fields), batch_size=BULK_BATCH_SIZE)
+
+    matched = len(matched_ids)
+    return {'matched': matched, 'updated': len(to_update), 'missing': len(active_devices) - matched}
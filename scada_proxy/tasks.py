@@ -1,17 +1,24 @@
 import logging
 from celery import shared_task
-from django.utils.dateparse import parse_datetime
-from django.utils.timezone import make_aware, is_naive
 import requests
-from django.db import transaction, IntegrityError
-from datetime import datetime, timedelta, timezone as dt_timezone
+from datetime import datetime, timedelta
 from django.utils import timezone as dj_timezone
 import pytz
 from django.db import models
+from django.conf import settings
 
 # Importa tu cliente SCADA y tus modelos
 from .scada_client import ScadaConnectorClient
-from .models import Institution, DeviceCategory, Device, Measurement, TaskProgress
+from .models import Institution, DeviceCategory, Device, TaskProgress, DeviceIngestCursor
+from . import partitioning
+from .blocks import blocks_enabled, pack_closed_days
+from .archive import archive_closed_months
+from .coverage import missing_windows
+from .sync import fetch_and_sync_metadata, fetch_all_devices, refresh_device_status
+from .ingest import (
+    get_ingest_start, get_ingest_window, split_time_windows,
+    ingest_device_range, ingest_devices_concurrently,
+)
 
 logger = logging.getLogger(__name__)
 scada_client = ScadaConnectorClient()
@@ -26,84 +33,13 @@ def get_colombia_now():
 # Tarea para sincronizar metadatos (instituciones y categorías de dispositivos)
 @shared_task(bind=True, retry_backoff=60, max_retries=3)
 def sync_scada_metadata(self):
+    """
+    Sincroniza instituciones, categorías y dispositivos con SCADA.
+    Solo se escriben las diferencias; si SCADA devuelve lo mismo que en la
+    última ejecución no se toca la base de datos.
+    """
     try:
-        token = scada_client.get_token()
-
-        # Sincronizar Instituciones
-        institutions_data = scada_client.get_institutions(token).get('data', [])
-        for inst_data in institutions_data:
-            Institution.objects.update_or_create(
-                scada_id=str(inst_data['id']), # Asegura que sea string si el campo es CharField
-                defaults={
-                    'name': inst_data['name'],
-                    'description': inst_data.get('description', '')
-                }
-            )
-        logger.info(f"Sincronizadas {len(institutions_data)} instituciones.")
-
-        # Sincronizar Categorías de Dispositivos
-        categories_data = scada_client.get_device_categories(token).get('data', [])
-        for cat_data in categories_data:
-            DeviceCategory.objects.update_or_create(
-                scada_id=str(cat_data['id']),
-                defaults={
-                    'name': cat_data['name'],
-                    'description': cat_data.get('description', '')
-                }
-            )
-        logger.info(f"Sincronizadas {len(categories_data)} categorías de dispositivos.")
-
-        # Sincronizar Dispositivos (todos los que la API SCADA liste)
-        # Puede que necesites paginar esta llamada si hay muchos dispositivos
-        all_devices_data = scada_client.get_devices(token).get('data', []) # Asume que esta llamada no necesita category/institution_id para listar todos
-        existing_scada_device_ids = set(Device.objects.values_list('scada_id', flat=True))
-        fetched_scada_device_ids = set()
-
-        for device_data in all_devices_data:
-            fetched_scada_device_ids.add(str(device_data['id']))
-            category_obj = None
-            if device_data.get('category_id'): # Asume que la API de dispositivos devuelve 'category_id'
-                try:
-                    category_obj = DeviceCategory.objects.get(scada_id=str(device_data['category_id']))
-                except DeviceCategory.DoesNotExist:
-                    logger.warning(f"Categoría {device_data['category_id']} no encontrada para el dispositivo {device_data['name']}. Sincroniza las categorías primero.")
-
-            institution_obj = None
-            if device_data.get('institution_id'): # Asume que la API de dispositivos devuelve 'institution_id'
-                try:
-                    institution_obj = Institution.objects.get(scada_id=str(device_data['institution_id']))
-                except Institution.DoesNotExist:
-                    logger.warning(f"Institución {device_data['institution_id']} no encontrada para el dispositivo {device_data['name']}. Sincroniza las instituciones primero.")
-
-            device, created = Device.objects.update_or_create(
-                scada_id=str(device_data['id']),
-                defaults={
-                    'name': device_data['name'],
-                    'status': device_data.get('status', ''),
-                    'is_active': True, # Asumimos que los dispositivos fetched están activos
-                    # IMPORTANTE: Solo incluir category e institution si tenemos objetos válidos
-                }
-            )
-            
-            # Actualizar relaciones solo si tenemos objetos válidos
-            if category_obj:
-                device.category = category_obj
-            if institution_obj:
-                device.institution = institution_obj
-            
-            # Solo guardar si hubo cambios en las relaciones
-            if category_obj or institution_obj:
-                device.save()
-            
-            if created:
-                logger.info(f"Dispositivo '{device.name}' ({device.scada_id}) creado/actualizado.")
-
-        # Desactivar dispositivos que ya no existen en la API SCADA
-        devices_to_deactivate = existing_scada_device_ids - fetched_scada_device_ids
-        if devices_to_deactivate:
-            Device.objects.filter(scada_id__in=list(devices_to_deactivate)).update(is_active=False)
-            logger.info(f"Desactivados {len(devices_to_deactivate)} dispositivos que ya no se encuentran en la API SCADA.")
-
+        return fetch_and_sync_metadata(scada_client)
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Error de red/API al sincronizar metadatos: {e}")
@@ -118,7 +54,9 @@ def fetch_and_save_measurements_for_device(self, device_scada_id: str, django_de
     """
     Obtiene y guarda mediciones para un dispositivo SCADA.
     Cada medición se guarda como un solo JSON por timestamp.
-    Usa update_or_create para evitar duplicados.
+    Con SCADA_BULK_INGEST activo cada página se escribe con un único
+    INSERT ... ON CONFLICT; en caso contrario se usa update_or_create por fila.
+    Tras cada página se avanza el cursor de ingesta del dispositivo.
     """
     try:
         token = scada_client.get_token()
@@ -141,57 +79,15 @@ def fetch_and_save_measurements_for_device(self, device_scada_id: str, django_de
 
         logger.info(f"Obteniendo mediciones para dispositivo {device_scada_id} desde {from_dt} hasta {to_dt} (hora Colombia)")
 
-        page_size = 1000
-        offset = 0
-        total_created, total_updated = 0, 0
-
-        while True:
-            measurements_response = scada_client.get_measurements(
-                token,
-                device_id=device_scada_id,
-                from_date=from_dt.isoformat(timespec='seconds'),
-                to_date=to_dt.isoformat(timespec='seconds'),
-                limit=page_size,
-                offset=offset
-            )
-            measurements_data = measurements_response.get('data', [])
-
-            if not measurements_data:
-                break
-
-            for measurement_entry in measurements_data:
-                date_str = measurement_entry.get('date')
-                data_dict = measurement_entry.get('data', {})
-
-                if not date_str or not data_dict:
-                    logger.warning(f"Medición incompleta: {measurement_entry}")
-                    continue
-
-                dt = parse_datetime(date_str)
-                if dt is None:
-                    logger.warning(f"Fecha inválida: {date_str}")
-                    continue
-
-                if is_naive(dt):  # Hacer aware si está en naive
-                    dt = make_aware(dt, timezone=COLOMBIA_TZ)
-                else:
-                    # Convertir a zona horaria de Colombia si ya tiene timezone
-                    dt = dt.astimezone(COLOMBIA_TZ)
-
-                _, created = Measurement.objects.update_or_create(
-                    device=device_instance,
-                    date=dt,
-                    defaults={"data": data_dict}
-                )
-
-                if created:
-                    total_created += 1
-                else:
-                    total_updated += 1
-
-            if len(measurements_data) < page_size:
-                break
-            offset += page_size
+        total_created, total_updated = ingest_device_range(
+            scada_client,
+            token,
+            device_instance.id,
+            device_scada_id,
+            from_dt,
+            to_dt,
+            bulk=getattr(settings, 'SCADA_BULK_INGEST', True)
+        )
 
         logger.info(f"Dispositivo {device_scada_id}: {total_created} nuevas, {total_updated} actualizadas")
 
@@ -202,10 +98,21 @@ def fetch_and_save_measurements_for_device(self, device_scada_id: str, django_de
         raise
 
 @shared_task
-def fetch_historical_measurements_for_all_devices(time_range_seconds: int):
+def fetch_historical_measurements_for_all_devices(time_range_seconds: int, use_cursors: bool = False):
     """
     Lanza subtareas para obtener mediciones históricas de todos los dispositivos en el rango dado.
     Permite cancelar la ejecución a través de la tabla TaskProgress.
+
+    Con use_cursors=True cada dispositivo con cursor de ingesta se consulta solo
+    desde su última medición almacenada (menos SCADA_INGEST_CURSOR_OVERLAP_MINUTES).
+    Si se perdió alguna ejecución, el rango se amplía solo hasta recuperar el hueco,
+    con un máximo de SCADA_INGEST_MAX_CATCHUP_DAYS. Los dispositivos sin cursor
+    usan el rango time_range_seconds.
+
+    Con cursores se encola una sola subtarea por dispositivo que recorre sus
+    ventanas en orden: el cursor solo avanza sobre el tramo ya completo y lo
+    que falle se vuelve a pedir en la siguiente ejecución. Sin cursores
+    (backfills explícitos) las ventanas se reparten entre varios workers.
     """
     time_range = timedelta(seconds=time_range_seconds)
 
@@ -227,6 +134,13 @@ def fetch_historical_measurements_for_all_devices(time_range_seconds: int):
     from celery import current_task
     task_progress = TaskProgress.objects.filter(task_id=current_task.request.id).first() if current_task else None
 
+    cursors = {}
+    if use_cursors:
+        cursors = dict(DeviceIngestCursor.objects.values_list('device_id', 'last_measurement_date'))
+    overlap = timedelta(minutes=getattr(settings, 'SCADA_INGEST_CURSOR_OVERLAP_MINUTES', 10))
+    max_catchup = timedelta(days=getattr(settings, 'SCADA_INGEST_MAX_CATCHUP_DAYS', 7))
+    ingest_window = get_ingest_window()
+
     for device in devices:
         # Verificar si se canceló la tarea
         if task_progress:
@@ -238,16 +152,24 @@ def fetch_historical_measurements_for_all_devices(time_range_seconds: int):
                 task_progress.save(update_fields=['status', 'message'])
                 return
 
-        # Encolar subtarea por dispositivo
-        fetch_and_save_measurements_for_device.delay(
-            device_scada_id=device.scada_id,
-            django_device_id=device.id,
-            from_datetime_str=from_date.isoformat(),
-            to_datetime_str=now_colombia.isoformat()
-        )
+        device_from_date = get_ingest_start(device.id, cursors, from_date, overlap, max_catchup)
+
+        # Con cursores, una subtarea por dispositivo (ventanas en orden); en un
+        # backfill explícito, una por ventana para repartir el rango entre workers
+        if use_cursors:
+            device_windows = [(device_from_date, now_colombia)]
+        else:
+            device_windows = split_time_windows(device_from_date, now_colombia, ingest_window)
+        for window_start, window_end in device_windows:
+            fetch_and_save_measurements_for_device.delay(
+                device_scada_id=device.scada_id,
+                django_device_id=device.id,
+                from_datetime_str=window_start.isoformat(),
+                to_datetime_str=window_end.isoformat()
+            )
         logger.info(
             f"Tarea creada para dispositivo {device.name} ({device.scada_id}) "
-            f"desde {from_date} hasta {now_colombia} (hora Colombia)."
+            f"desde {device_from_date} hasta {now_colombia} (hora Colombia)."
         )
 
         # Actualizar progreso
@@ -262,6 +184,191 @@ def fetch_historical_measurements_for_all_devices(time_range_seconds: int):
 
     logger.info("Todas las subtareas para obtener mediciones han sido encoladas.")
 
+@shared_task
+def fetch_measurements_for_all_devices_concurrently(time_range_seconds: int, use_cursors: bool = True):
+    """
+    Alternativa a fetch_historical_measurements_for_all_devices que no encola una
+    subtarea por dispositivo: descarga todos los dispositivos activos desde esta
+    misma tarea con un pool de hilos (SCADA_INGEST_CONCURRENCY descargas
+    simultáneas). El cliente limita la tasa de peticiones por host con
+    SCADA_RATE_LIMIT_PER_SECOND.
+    Los rangos por dispositivo se calculan igual que en la tarea original.
+    """
+    time_range = timedelta(seconds=time_range_seconds)
+    now_colombia = get_colombia_now()
+    from_date = now_colombia - time_range
+
+    devices = list(Device.objects.filter(is_active=True).only('id', 'scada_id'))
+    if not devices:
+        logger.warning("No hay dispositivos activos registrados en la base de datos.")
+        return
+
+    cursors = {}
+    if use_cursors:
+        cursors = dict(DeviceIngestCursor.objects.values_list('device_id', 'last_measurement_date'))
+    overlap = timedelta(minutes=getattr(settings, 'SCADA_INGEST_CURSOR_OVERLAP_MINUTES', 10))
+    max_catchup = timedelta(days=getattr(settings, 'SCADA_INGEST_MAX_CATCHUP_DAYS', 7))
+
+    jobs = [
+        (
+            device.id,
+            device.scada_id,
+            get_ingest_start(device.id, cursors, from_date, overlap, max_catchup),
+            now_colombia,
+        )
+        for device in devices
+    ]
+
+    max_workers = getattr(settings, 'SCADA_INGEST_CONCURRENCY', 8)
+    logger.info(
+        f"Ingesta concurrente de {len(jobs)} dispositivos con {max_workers} hilos "
+        f"hasta {now_colombia} (hora Colombia)"
+    )
+
+    summary = ingest_devices_concurrently(
+        scada_client,
+        jobs,
+        max_workers=max_workers,
+        bulk=getattr(settings, 'SCADA_BULK_INGEST', True),
+        # Con cursores las ventanas de cada dispositivo van en orden
+        split_windows=not use_cursors,
+    )
+
+    logger.info(
+        f"Ingesta concurrente finalizada: {summary['devices']} dispositivos, "
+        f"{summary['created']} nuevas, {summary['updated']} actualizadas, "
+        f"{len(summary['failed'])} con error"
+    )
+    return {
+        'devices': summary['devices'],
+        'created': summary['created'],
+        'updated': summary['updated'],
+        'failed': sorted({failure[0] for failure in summary['failed']}),
+    }
+
+@shared_task
+def maintain_measurement_partitions():
+    """
+    Crea por adelantado las particiones mensuales de mediciones y, si
+    SCADA_MEASUREMENT_RETENTION_MONTHS está definido, retira las antiguas
+    (DETACH, o DROP con SCADA_MEASUREMENT_RETENTION_DROP).
+    No hace nada si la tabla no está particionada.
+    """
+    if not partitioning.is_partitioned():
+        logger.info("La tabla de mediciones no está particionada; se omite el mantenimiento.")
+        return
+
+    created = partitioning.ensure_future_partitions(
+        months_ahead=getattr(settings, 'SCADA_MEASUREMENT_PARTITION_MONTHS_AHEAD', 3)
+    )
+    removed = []
+    retention_months = getattr(settings, 'SCADA_MEASUREMENT_RETENTION_MONTHS', 0)
+    if retention_months:
+        removed = partitioning.apply_retention(
+            retention_months,
+            drop=getattr(settings, 'SCADA_MEASUREMENT_RETENTION_DROP', False)
+        )
+
+    logger.info(f"Mantenimiento de particiones: {len(created)} creadas, {len(removed)} retiradas.")
+    return {'created': created, 'removed': removed}
+
+@shared_task
+def pack_measurement_day_blocks(lookback_days: int = None):
+    """
+    Empaqueta en MeasurementDayBlock los días cerrados de cada dispositivo
+    activo que aún no tienen bloque o cuyo bloque quedó desactualizado.
+    No hace nada si SCADA_DAY_BLOCKS_ENABLED está desactivado.
+    """
+    if not blocks_enabled():
+        logger.info("Bloques diarios desactivados (SCADA_DAY_BLOCKS_ENABLED); se omite el empaquetado.")
+        return
+
+    summary = pack_closed_days(lookback_days=lookback_days)
+    return {
+        'packed': summary['packed'],
+        'empty': summary['empty'],
+        'failed': len(summary['failed']),
+    }
+
+@shared_task
+def archive_old_measurements(keep_months: int = None):
+    """
+    Exporta a archivos en disco los meses de mediciones crudas anteriores a los
+    últimos SCADA_ARCHIVE_KEEP_MONTHS y los elimina de la base de datos.
+    No hace nada si no hay retención configurada.
+    """
+    if keep_months is None:
+        keep_months = getattr(settings, 'SCADA_ARCHIVE_KEEP_MONTHS', 0)
+    if not keep_months:
+        logger.info("Archivo frío desactivado (SCADA_ARCHIVE_KEEP_MONTHS=0); se omite.")
+        return
+
+    summary = archive_closed_months(keep_months=keep_months)
+    return {
+        'archived': summary['archived'],
+        'rows': summary['rows'],
+        'failed': len(summary['failed']),
+    }
+
+def build_gap_jobs(devices, days, min_gap_minutes, max_windows):
+    """
+    Trabajos de ingesta (device_id, scada_id, desde, hasta) para los huecos de
+    cobertura de los últimos `days` días de cada dispositivo. Solo se miran
+    fechas anteriores al cursor de ingesta: lo posterior aún no se ha pedido.
+    Si un dispositivo tiene más de max_windows huecos, se pide un único rango
+    desde el primero hasta el último.
+    """
+    now_colombia = get_colombia_now()
+    first_day = (now_colombia - timedelta(days=days)).date()
+    cursors = dict(DeviceIngestCursor.objects.values_list('device_id', 'last_measurement_date'))
+    min_gap_slots = max(1, int(min_gap_minutes * 60) // 120)
+
+    jobs = []
+    for device in devices:
+        cursor = cursors.get(device.id)
+        if cursor is None:
+            continue
+        windows = missing_windows(
+            device.id, first_day, cursor.astimezone(COLOMBIA_TZ).date(),
+            until=cursor, min_gap_slots=min_gap_slots
+        )
+        if len(windows) > max_windows:
+            windows = [(windows[0][0], windows[-1][1])]
+        jobs.extend((device.id, device.scada_id, start, end) for start, end in windows)
+    return jobs
+
+@shared_task
+def backfill_measurement_gaps(days: int = None):
+    """
+    Vuelve a pedir a SCADA solo los intervalos sin mediciones de los últimos
+    días (según DeviceDayCoverage), con la ingesta concurrente.
+    """
+    days = days or getattr(settings, 'SCADA_GAP_BACKFILL_DAYS', 2)
+    devices = list(Device.objects.filter(is_active=True).only('id', 'scada_id'))
+    jobs = build_gap_jobs(
+        devices,
+        days,
+        min_gap_minutes=getattr(settings, 'SCADA_GAP_MIN_MINUTES', 10),
+        max_windows=getattr(settings, 'SCADA_GAP_MAX_WINDOWS', 12),
+    )
+    if not jobs:
+        logger.info("Sin huecos de cobertura que recuperar.")
+        return {'windows': 0, 'created': 0, 'failed': 0}
+
+    logger.info(f"Recuperando {len(jobs)} huecos de cobertura de {len({job[0] for job in jobs})} dispositivos.")
+    summary = ingest_devices_concurrently(
+        scada_client,
+        jobs,
+        max_workers=getattr(settings, 'SCADA_INGEST_CONCURRENCY', 8),
+        bulk=getattr(settings, 'SCADA_BULK_INGEST', True),
+        # Los huecos son anteriores al cursor: sus ventanas pueden ir en paralelo
+        split_windows=True,
+    )
+    logger.info(
+        f"Huecos recuperados: {summary['created']} mediciones nuevas, {len(summary['failed'])} ventanas con error"
+    )
+    return {'windows': len(jobs), 'created': summary['created'], 'failed': len(summary['failed'])}
+
 @shared_task(bind=True, retry_backoff=30, max_retries=3)
 def check_devices_status(self):
     """
@@ -271,60 +378,19 @@ def check_devices_status(self):
     try:
         token = scada_client.get_token()
         logger.info("Iniciando verificación de estado de dispositivos")
-        
-        # Obtener dispositivos activos
-        active_devices = Device.objects.filter(is_active=True)
-        updated_count = 0
-        
-        for device in active_devices:
-            try:
-                # Obtener información actualizada del dispositivo desde SCADA
-                # Nota: Esto asume que tienes un endpoint para obtener un dispositivo específico
-                # Si no lo tienes, puedes usar get_devices con filtros
-                devices_data = scada_client.get_devices(
-                    token, 
-                    device_name=device.name
-                ).get('data', [])
-                
-                if devices_data:
-                    device_data = devices_data[0]  # Tomar el primer resultado
-                    
-                    # Actualizar solo campos básicos sin tocar las relaciones
-                    # IMPORTANTE: Preservar category e institution existentes
-                    device.name = device_data.get('name', device.name)
-                    device.status = device_data.get('status', device.status)
-                    
-                    # NO actualizar category e institution aquí para evitar sobrescribirlos como null
-                    # Solo actualizar si realmente tenemos datos válidos de SCADA
-                    if device_data.get('category') and isinstance(device_data['category'], dict):
-                        category_scada_id = str(device_data['category'].get('id'))
-                        if category_scada_id:
-                            try:
-                                category_obj = DeviceCategory.objects.get(scada_id=category_scada_id)
-                                device.category = category_obj
-                                logger.debug(f"Actualizada categoría para {device.name}: {category_obj.name}")
-                            except DeviceCategory.DoesNotExist:
-                                logger.warning(f"Categoría SCADA {category_scada_id} no encontrada para {device.name}")
-                    
-                    if device_data.get('institution') and isinstance(device_data['institution'], dict):
-                        institution_scada_id = str(device_data['institution'].get('id'))
-                        if institution_scada_id:
-                            try:
-                                institution_obj = Institution.objects.get(scada_id=institution_scada_id)
-                                device.institution = institution_obj
-                                logger.debug(f"Actualizada institución para {device.name}: {institution_obj.name}")
-                            except Institution.DoesNotExist:
-                                logger.warning(f"Institución SCADA {institution_scada_id} no encontrada para {device.name}")
-                    
-                    device.save()
-                    updated_count += 1
-                    
-            except Exception as e:
-                logger.warning(f"Error al actualizar dispositivo {device.name}: {e}")
-                continue
-        
-        logger.info(f"Verificación completada. {updated_count} dispositivos actualizados.")
-        
+
+        # Un único listado paginado en lugar de una consulta a SCADA por dispositivo
+        devices_data = fetch_all_devices(scada_client, token)
+        result = refresh_device_status(devices_data)
+
+        if result['missing']:
+            logger.warning(f"{result['missing']} dispositivos activos no aparecen en el listado de SCADA.")
+        logger.info(
+            f"Verificación completada. {result['matched']} dispositivos verificados, "
+            f"{result['updated']} actualizados."
+        )
+        return result
+
     except Exception as e:
         logger.error(f"Error en verificación de dispositivos: {e}")
         raise self.retry(exc=e, countdown=self.request.retries * 30)
@@ -332,102 +398,16 @@ def check_devices_status(self):
 @shared_task(bind=True, retry_backoff=60, max_retries=3)
 def sync_scada_metadata_enhanced(self):
     """
-    Versión mejorada de la sincronización que maneja mejor las relaciones
-    y proporciona más información de logging.
+    Versión de la sincronización que siempre compara contra la base de datos
+    (ignora el hash del último payload), conservando las relaciones existentes
+    cuando SCADA no permite resolverlas.
     """
     try:
-        token = scada_client.get_token()
         logger.info("Iniciando sincronización mejorada de metadatos SCADA")
-        
-        with transaction.atomic():
-            # 1. Sincronizar categorías primero
-            categories_data = scada_client.get_device_categories(token).get('data', [])
-            category_map = {}
-            for cat_data in categories_data:
-                category_obj, created = DeviceCategory.objects.update_or_create(
-                    scada_id=str(cat_data['id']),
-                    defaults={
-                        'name': cat_data['name'],
-                        'description': cat_data.get('description', '')
-                    }
-                )
-                category_map[str(cat_data['id'])] = category_obj
-                if created:
-                    logger.info(f"Nueva categoría creada: {cat_data['name']}")
-            
-            # 2. Sincronizar instituciones
-            institutions_data = scada_client.get_institutions(token).get('data', [])
-            institution_map = {}
-            for inst_data in institutions_data:
-                institution_obj, created = Institution.objects.update_or_create(
-                    scada_id=str(inst_data['id']),
-                    defaults={
-                        'name': inst_data['name']
-                    }
-                )
-                institution_map[str(inst_data['id'])] = institution_obj
-                if created:
-                    logger.info(f"Nueva institución creada: {inst_data['name']}")
-            
-            # 3. Sincronizar dispositivos con relaciones
-            devices_data = scada_client.get_devices(token).get('data', [])
-            existing_device_ids = set(Device.objects.values_list('scada_id', flat=True))
-            fetched_device_ids = set()
-            
-            for device_data in devices_data:
-                device_scada_id = str(device_data['id'])
-                fetched_device_ids.add(device_scada_id)
-                
-                # Obtener categoría e institución
-                category_obj = None
-                institution_obj = None
-                
-                if device_data.get('category'):
-                    category_scada_id = str(device_data['category']['id'])
-                    category_obj = category_map.get(category_scada_id)
-                    if not category_obj:
-                        logger.warning(f"Categoría no encontrada para dispositivo {device_data['name']}")
-                
-                if device_data.get('institution'):
-                    institution_scada_id = str(device_data['institution']['id'])
-                    institution_obj = institution_map.get(institution_scada_id)
-                    if not institution_obj:
-                        logger.warning(f"Institución no encontrada para dispositivo {device_data['name']}")
-                
-                # Crear o actualizar dispositivo
-                device, created = Device.objects.update_or_create(
-                    scada_id=device_scada_id,
-                    defaults={
-                        'name': device_data['name'],
-                        'status': device_data.get('status', ''),
-                        'is_active': True
-                        # IMPORTANTE: Solo incluir category e institution si tenemos objetos válidos
-                    }
-                )
-                
-                # Actualizar relaciones solo si tenemos objetos válidos
-                if category_obj:
-                    device.category = category_obj
-                if institution_obj:
-                    device.institution = institution_obj
-                
-                # Solo guardar si hubo cambios en las relaciones
-                if category_obj or institution_obj:
-                    device.save()
-                
-                if created:
-                    logger.info(f"Nuevo dispositivo creado: {device.name}")
-                elif device.category != category_obj or device.institution != institution_obj:
-                    logger.info(f"Relaciones actualizadas para dispositivo: {device.name}")
-            
-            # 4. Desactivar dispositivos que ya no existen
-            devices_to_deactivate = existing_device_ids - fetched_device_ids
-            if devices_to_deactivate:
-                Device.objects.filter(scada_id__in=list(devices_to_deactivate)).update(is_active=False)
-                logger.info(f"Desactivados {len(devices_to_deactivate)} dispositivos obsoletos")
-        
+        summary = fetch_and_sync_metadata(scada_client, force=True)
         logger.info("Sincronización mejorada completada exitosamente")
-        
+        return summary
+
     except Exception as e:
         logger.error(f"Error en sincronización mejorada: {e}")
         raise self.retry(exc=e, countdown=self.request.retries * 60)
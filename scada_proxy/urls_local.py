@@ -6,6 +6,8 @@ from .views import (
     LocalInstitutionListView,           # Vista para listar las instituciones locales registradas
     LocalDeviceCategoryListView,        # Vista para listar las categorías de dispositivos disponibles localmente
     LocalDeviceListView,                # Vista para listar los dispositivos locales
+    DeviceLatestStateView,              # Vista con la última medición de cada dispositivo
+    DeviceCoverageView,                 # Vista con la completitud de datos por dispositivo y día
     HistoricalMeasurementsView,         # Vista para consultar mediciones históricas de los dispositivos locales
     DailySummaryMeasurementsView,       # Vista para obtener un resumen diario de mediciones locales
     SyncLocalDevicesView,               # Vista encargada de sincronizar dispositivos locales con una fuente externa
@@ -23,6 +25,12 @@ urlpatterns = [
     # Ruta para obtener los dispositivos registrados en el entorno local
     path('devices/', LocalDeviceListView.as_view(), name='local-devices'),
 
+    # Ruta para obtener la última medición de cada dispositivo (estado actual)
+    path('devices/latest/', DeviceLatestStateView.as_view(), name='local-devices-latest'),
+
+    # Ruta para consultar la completitud de los datos (intervalos de 2 min con mediciones) y sus huecos
+    path('devices/coverage/', DeviceCoverageView.as_view(), name='local-devices-coverage'),
+
     # Ruta para acceder a las mediciones históricas locales de los dispositivos
     path('measurements/', HistoricalMeasurementsView.as_view(), name='local-measurements'),
 
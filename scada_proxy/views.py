@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 import logging
 import requests
 import uuid # ¡Importar el módulo uuid!
@@ -10,7 +10,7 @@ from django.utils.decorators import method_decorator
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, generics, filters
+from rest_framework import status, generics, filters, serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
@@ -19,13 +19,18 @@ from celery.result import AsyncResult
 from celery import current_app
 
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, OpenApiResponse, OpenApiTypes
-from .models import Institution, DeviceCategory, Device, Measurement, TaskProgress
+from .models import Institution, DeviceCategory, Device, Measurement, TaskProgress, DeviceLatestState, MEASUREMENT_TYPED_KEYS, to_local_date
 from .serializers import (
     InstitutionSerializer, DeviceCategorySerializer, DeviceSerializer,
     MeasurementSerializer, TaskProgressSerializer, SCADAResponseSerializer,
+    DeviceLatestStateSerializer,
 )
 from .scada_client import ScadaConnectorClient
 from .tasks import fetch_historical_measurements_for_all_devices
+from .sync import fetch_and_sync_metadata
+from .rollups import daily_summary, rollups_readable, select_resolution
+from .archive import archives_in_range, archived_rows
+from .coverage import completeness, missing_windows
 
 logger = logging.getLogger(__name__)
 scada_client = ScadaConnectorClient()
@@ -157,6 +162,13 @@ class DevicesView(ScadaProxyView):
             if request.query_params.get('offset'):
                 scada_client_params["offset"] = request.query_params.get('offset')
 
+            # Sin paginación explícita se recorren todas las páginas de SCADA.
+            # Aquí sí se materializa la lista: la respuesta es un único JSON con
+            # 'total', y quien necesite memoria acotada debe paginar con limit/offset.
+            if "limit" not in scada_client_params and "offset" not in scada_client_params:
+                devices = list(scada_client.iter_devices(token, **scada_client_params))
+                return Response({"data": devices, "total": len(devices)})
+
             # Llamar a scada_client.get_devices con los parámetros correctamente mapeados
             resp = scada_client.get_devices(token, **scada_client_params)
             return Response({"data": resp.get("data", []), "total": resp.get("total", 0)})
@@ -381,12 +393,162 @@ class HistoricalMeasurementsView(generics.ListAPIView):
 
         return qs
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+
+        # Los meses archivados en disco ya no están en la tabla: se leen del archivo
+        device_param = request.query_params.get('device')
+        if device_param:
+            if device_param.isdigit():
+                device_ids = [int(device_param)]
+            else:
+                device_ids = list(Device.objects.filter(scada_id=device_param).values_list('id', flat=True))
+        else:
+            device_ids = None
+        from_date = self._parse_date(request.query_params.get('from_date'))
+        to_date = self._parse_date(request.query_params.get('to_date'))
+
+        if not archives_in_range(device_ids, from_date, to_date).exists() or not isinstance(response.data, list):
+            return response
+
+        date_field = serializers.DateTimeField()
+        results = list(response.data)
+        seen = {(item['device'], item['date']) for item in results}
+        for archive, pk, date, data in archived_rows(device_ids, from_date, to_date):
+            item = {
+                'id': pk,
+                'device': archive.device_id,
+                'device_name': archive.device.name,
+                'scada_id': archive.device.scada_id,
+                'date': date_field.to_representation(date),
+                'data': data,
+            }
+            if (item['device'], item['date']) not in seen:
+                results.append(item)
+
+        # Mismo orden por defecto que Measurement (más recientes primero)
+        results.sort(key=lambda item: item['date'], reverse=True)
+        response.data = results
+        return response
+
     def _parse_date(self, date_str):
         try:
             return datetime.fromisoformat(date_str).astimezone(timezone.utc)
         except (ValueError, TypeError):
             return None
 
+@extend_schema(
+    tags=["Datos Locales"],
+    description="Última medición de cada dispositivo activo, leída de la tabla de estado actualizada en la ingesta.",
+    parameters=[
+        OpenApiParameter("device", str, OpenApiParameter.QUERY, description="ID o SCADA_ID de un dispositivo (se puede repetir)"),
+        OpenApiParameter("category", str, OpenApiParameter.QUERY, description="ID o nombre de la categoría"),
+        OpenApiParameter("institution", int, OpenApiParameter.QUERY, description="ID de la institución"),
+    ],
+    responses={200: DeviceLatestStateSerializer(many=True)}
+)
+class DeviceLatestStateView(generics.ListAPIView):
+    serializer_class = DeviceLatestStateSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = DeviceLatestState.objects.filter(device__is_active=True).select_related('device', 'device__category')
+
+        devices = self.request.query_params.getlist('device')
+        if devices:
+            ids = [int(value) for value in devices if value.isdigit()]
+            scada_ids = [value for value in devices if not value.isdigit()]
+            qs = qs.filter(Q(device_id__in=ids) | Q(device__scada_id__in=scada_ids))
+
+        category = self.request.query_params.get('category')
+        if category:
+            if category.isdigit():
+                qs = qs.filter(device__category_id=int(category))
+            else:
+                qs = qs.filter(device__category__name=category)
+
+        institution = self.request.query_params.get('institution')
+        if institution and institution.isdigit():
+            qs = qs.filter(device__institution_id=int(institution))
+
+        return qs.order_by('device__name')
+
+@extend_schema(
+    tags=["Datos Locales"],
+    description=(
+        "Completitud de los datos por dispositivo y día: intervalos de 2 minutos con mediciones "
+        "frente a los esperados, y opcionalmente los huecos."
+    ),
+    parameters=[
+        OpenApiParameter("device", str, OpenApiParameter.QUERY, description="ID o SCADA_ID de un dispositivo (se puede repetir)"),
+        OpenApiParameter("category", str, OpenApiParameter.QUERY, description="ID o nombre de la categoría"),
+        OpenApiParameter("institution", int, OpenApiParameter.QUERY, description="ID de la institución"),
+        OpenApiParameter("from_date", str, OpenApiParameter.QUERY, description="Primer día (YYYY-MM-DD); por defecto hace 7 días"),
+        OpenApiParameter("to_date", str, OpenApiParameter.QUERY, description="Último día (YYYY-MM-DD); por defecto hoy"),
+        OpenApiParameter("include_gaps", bool, OpenApiParameter.QUERY, description="Incluir los huecos (desde/hasta)"),
+    ],
+)
+class DeviceCoverageView(APIView):
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 92
+
+    def get(self, request, *args, **kwargs):
+        today = to_local_date(datetime.now(timezone.utc))
+        try:
+            to_day = date.fromisoformat(request.query_params['to_date']) if request.query_params.get('to_date') else today
+            from_day = (
+                date.fromisoformat(request.query_params['from_date'])
+                if request.query_params.get('from_date') else to_day - timedelta(days=6)
+            )
+        except ValueError:
+            return Response({"detail": "Las fechas deben tener el formato YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if from_day > to_day or (to_day - from_day).days >= self.MAX_DAYS:
+            return Response(
+                {"detail": f"Rango inválido: from_date <= to_date y como máximo {self.MAX_DAYS} días."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        devices = Device.objects.filter(is_active=True)
+        device_params = request.query_params.getlist('device')
+        if device_params:
+            ids = [int(value) for value in device_params if value.isdigit()]
+            scada_ids = [value for value in device_params if not value.isdigit()]
+            devices = devices.filter(Q(id__in=ids) | Q(scada_id__in=scada_ids))
+        category = request.query_params.get('category')
+        if category:
+            devices = devices.filter(category_id=int(category)) if category.isdigit() else devices.filter(category__name=category)
+        institution = request.query_params.get('institution')
+        if institution and institution.isdigit():
+            devices = devices.filter(institution_id=int(institution))
+        devices = list(devices.order_by('name'))
+
+        include_gaps = request.query_params.get('include_gaps', '').lower() in ('1', 'true', 'yes')
+        per_device = completeness([device.id for device in devices], from_day, to_day)
+
+        result = []
+        for device in devices:
+            days = per_device[device.id]
+            slots = sum(day['slots'] for day in days)
+            expected = sum(day['expected_slots'] for day in days)
+            item = {
+                'device': device.id,
+                'device_name': device.name,
+                'scada_id': device.scada_id,
+                'completeness': min(1.0, slots / expected) if expected else None,
+                'days': [
+                    {**day, 'date': day['date'].isoformat()}
+                    for day in days
+                ],
+            }
+            if include_gaps:
+                item['gaps'] = [
+                    {'from': start.isoformat(), 'to': end.isoformat()}
+                    for start, end in missing_windows(device.id, from_day, to_day)
+                ]
+            result.append(item)
+
+        return Response(result)
+
 @extend_schema(
     tags=["Datos Locales"],
     description="Obtiene un resumen diario (promedio, máximo, mínimo y suma) de las mediciones de un dispositivo.",
@@ -424,12 +586,25 @@ class DailySummaryMeasurementsView(ScadaProxyView):
             )
 
         try:
-            # Construye el filtro dinámico para JSONField
-            value_field = Cast(F(f"data__{variable_key}"), FloatField())
+            # Variables tipadas con rollups diarios/horarios: se leen de ellos si el
+            # rango cubre días (u horas) completos
+            if variable_key in MEASUREMENT_TYPED_KEYS and rollups_readable():
+                summary = self._summary_from_rollups(device_id, variable_key, from_date, to_date)
+                if summary is not None:
+                    return Response(summary)
+
+            # Las variables con columna tipada se leen de ella; el resto, del JSONField
+            typed_field = MEASUREMENT_TYPED_KEYS.get(variable_key)
+            if typed_field:
+                value_field = F(typed_field)
+                not_null_filter = {f"{typed_field}__isnull": False}
+            else:
+                value_field = Cast(F(f"data__{variable_key}"), FloatField())
+                not_null_filter = {f"data__{variable_key}__isnull": False}
 
             queryset = Measurement.objects.filter(
                 date__range=(from_date, to_date),
-                **{f"data__{variable_key}__isnull": False}
+                **not_null_filter
             )
 
             # Si es un entero, filtra por device_id; de lo contrario, por scada_id
@@ -467,6 +642,32 @@ class DailySummaryMeasurementsView(ScadaProxyView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _summary_from_rollups(self, device_id, variable_key, from_date, to_date):
+        """
+        Resumen diario desde los rollups. El rango de la vista es inclusivo;
+        se usa [from_date, to_date + 1 s) redondeado al segundo para alinearlo.
+        Devuelve None si ninguna resolución cubre el rango exactamente.
+        """
+        end = (to_date + timedelta(seconds=1)).replace(microsecond=0)
+        resolution = select_resolution(from_date, end, granularity=timedelta(days=1))
+        if resolution is None:
+            return None
+
+        if device_id.isdigit():
+            device_ids = [int(device_id)]
+        else:
+            device_ids = list(Device.objects.filter(scada_id=device_id).values_list('id', flat=True))
+
+        return [
+            {
+                'date': row['date'].isoformat(),
+                'average': row['average'],
+                'max': row['max'],
+                'min': row['min'],
+                'sum': row['sum']
+            } for row in daily_summary(device_ids, variable_key, from_date, end, resolution)
+        ]
+
     def _parse_date(self, date_str):
         try:
             return datetime.fromisoformat(date_str).astimezone(timezone.utc)
@@ -666,79 +867,13 @@ class SyncLocalDevicesView(APIView):
                             status=status.HTTP_502_BAD_GATEWAY)
 
         try:
-            with transaction.atomic():
-                # 1. Sincronizar categorías
-                scada_categories = scada_client.get_device_categories(token).get("data", [])
-                category_map = {}
-                for cat in scada_categories:
-                    category_obj, _ = DeviceCategory.objects.update_or_create(
-                        scada_id=cat["id"],
-                        defaults={"name": cat["name"], "description": cat.get("description", "")}
-                    )
-                    category_map[cat["id"]] = category_obj
-                    logger.info(f"Categoría sincronizada: {cat['name']} (SCADA ID: {cat['id']}) -> Local ID: {category_obj.id}")
-
-                # 2. Sincronizar instituciones
-                scada_institutions = scada_client.get_institutions(token).get("data", [])
-                institution_map = {}
-                for inst in scada_institutions:
-                    institution_obj, _ = Institution.objects.update_or_create(
-                        scada_id=inst["id"],
-                        defaults={"name": inst["name"]}
-                    )
-                    institution_map[inst["id"]] = institution_obj
-                    logger.info(f"Institución sincronizada: {inst['name']} (SCADA ID: {inst['id']}) -> Local ID: {institution_obj.id}")
-
-                # 3. Sincronizar dispositivos
-                scada_devices = scada_client.get_devices(token).get("data", [])
-                devices_updated = 0
-                devices_with_issues = 0
-                
-                for dev in scada_devices:
-                    # Extraer información de categoría e institución con mejor manejo de errores
-                    category_obj = None
-                    institution_obj = None
-                    
-                    # Manejar categoría
-                    if dev.get("category") and isinstance(dev["category"], dict) and dev["category"].get("id"):
-                        category_obj = category_map.get(dev["category"]["id"])
-                        if not category_obj:
-                            logger.warning(f"Dispositivo {dev.get('name', 'N/A')} tiene categoría SCADA ID {dev['category']['id']} que no se encontró en el mapeo local")
-                    elif dev.get("category"):
-                        logger.warning(f"Dispositivo {dev.get('name', 'N/A')} tiene formato de categoría inesperado: {dev['category']}")
-                    
-                    # Manejar institución
-                    if dev.get("institution") and isinstance(dev["institution"], dict) and dev["institution"].get("id"):
-                        institution_obj = institution_map.get(dev["institution"]["id"])
-                        if not institution_obj:
-                            logger.warning(f"Dispositivo {dev.get('name', 'N/A')} tiene institución SCADA ID {dev['institution']['id']} que no se encontró en el mapeo local")
-                    elif dev.get("institution"):
-                        logger.warning(f"Dispositivo {dev.get('name', 'N/A')} tiene formato de institución inesperado: {dev['institution']}")
-
-                    # Crear o actualizar dispositivo
-                    device_obj, created = Device.objects.update_or_create(
-                        scada_id=dev["id"],
-                        defaults={
-                            "name": dev["name"],
-                            "status": dev.get("status"),
-                            "category": category_obj,
-                            "institution": institution_obj,
-                            "is_active": True
-                        }
-                    )
-                    
-                    if created:
-                        logger.info(f"Dispositivo creado: {dev['name']} (SCADA ID: {dev['id']})")
-                    else:
-                        logger.info(f"Dispositivo actualizado: {dev['name']} (SCADA ID: {dev['id']})")
-                    
-                    # Verificar si se establecieron las relaciones correctamente
-                    if category_obj and institution_obj:
-                        devices_updated += 1
-                    else:
-                        devices_with_issues += 1
-                        logger.warning(f"Dispositivo {dev['name']} sincronizado con relaciones incompletas - Categoría: {category_obj}, Institución: {institution_obj}")
+            # 1-3. Sincronizar categorías, instituciones y dispositivos (solo diferencias);
+            # abre su propia transacción cuando termina la descarga de SCADA
+            summary = fetch_and_sync_metadata(scada_client, token=token, force=True)
+            devices_updated = summary['devices']['complete']
+            devices_with_issues = summary['devices']['incomplete']
 
+            with transaction.atomic():
                 # 4. Intentar reparar dispositivos con relaciones faltantes
                 repaired_devices = self._repair_missing_relationships()
                 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks de los núcleos vectorizados de indicators/kernels.py frente
+a los recorridos en Python que reemplazan. Cada caso comprueba primero que
+ambos den el mismo resultado con la cadencia nominal de 2 minutos.
+
+Ejecutar con: python tests/benchmark_kernels.py [--days 30] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import kernels  # noqa: E402
+
+
+def build_series(days, seed=42):
+    """Serie sintética cada 2 minutos: marcas de tiempo epoch y potencia en kW."""
+    rng = np.random.default_rng(seed)
+    count = days * 720
+    timestamps = 1735707600 + np.arange(count, dtype=np.int64) * kernels.SAMPLE_SECONDS
+    power = rng.uniform(10, 120, count)
+    return timestamps, power
+
+
+# -------------------------
+# Implementaciones en Python
+# -------------------------
+def python_peak_demand(values, window_size=7):
+    moving_averages = []
+    for i in range(len(values) - window_size + 1):
+        moving_averages.append(sum(values[i:i + window_size]) / window_size)
+    return max(moving_averages) if moving_averages else max(values)
+
+
+def python_energy(values, delta_t=2 / 60):
+    return sum(value * delta_t for value in values)
+
+
+def python_hourly_means(timestamps, values):
+    hourly = defaultdict(list)
+    for timestamp, value in zip(timestamps, values):
+        hourly[((timestamp + kernels.COLOMBIA_UTC_OFFSET_SECONDS) // 3600) % 24].append(value)
+    return [sum(hourly[hour]) / len(hourly[hour]) if hourly[hour] else None for hour in range(24)]
+
+
+# -------------------------
+# Casos
+# -------------------------
+def case_peak_demand(timestamps, power):
+    values = power.tolist()
+    expected = python_peak_demand(values)
+    actual = kernels.peak_rolling_mean(timestamps, power, 15 * 60)
+    assert abs(expected - actual) < 1e-6, (expected, actual)
+    return (
+        lambda: python_peak_demand(values),
+        lambda: kernels.peak_rolling_mean(timestamps, power, 15 * 60),
+    )
+
+
+def case_energy(timestamps, power):
+    values = power.tolist()
+    # El trapecio y el rectángulo solo difieren en los extremos
+    expected = python_energy(values)
+    actual = kernels.integrate(timestamps, power)
+    assert abs(expected - actual) / expected < 1e-2, (expected, actual)
+    return (
+        lambda: python_energy(values),
+        lambda: kernels.integrate(timestamps, power, max_gap_seconds=600),
+    )
+
+
+def case_hourly_means(timestamps, power):
+    stamps, values = timestamps.tolist(), power.tolist()
+    expected = python_hourly_means(stamps, values)
+    actual = kernels.bin_mean(kernels.local_hour(timestamps), power, 24)
+    assert np.allclose(expected, actual), (expected, actual)
+    return (
+        lambda: python_hourly_means(stamps, values),
+        lambda: kernels.bin_mean(kernels.local_hour(timestamps), power, 24),
+    )
+
+
+def case_resample_15min(timestamps, power):
+    start, end = int(timestamps[0]), int(timestamps[-1]) + kernels.SAMPLE_SECONDS
+    return (
+        None,
+        lambda: kernels.resample(timestamps, power, 15 * 60, start, end, how='mean'),
+    )
+
+
+CASES = [
+    ('Demanda pico (ventana 15 min)', case_peak_demand),
+    ('Energía (integración)', case_energy),
+    ('Promedios horarios', case_hourly_means),
+    ('Remuestreo a 15 min', case_resample_15min),
+]
+
+
+def best_time(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=30, help='Días de datos sintéticos (720 muestras por día)')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por caso (se toma la mejor)')
+    args = parser.parse_args()
+
+    timestamps, power = build_series(args.days)
+    print("=" * 80)
+    print(f"MICRO-BENCHMARKS DE NÚCLEOS ({len(power):,} muestras, {args.days} días)")
+    print("=" * 80)
+    print(f"{'Caso':<32}{'Python (ms)':>14}{'NumPy (ms)':>14}{'Aceleración':>14}")
+    for name, case in CASES:
+        python_function, numpy_function = case(timestamps, power)
+        numpy_ms = best_time(numpy_function, args.repeat) * 1000
+        if python_function is None:
+            print(f"{name:<32}{'-':>14}{numpy_ms:>14.3f}{'-':>14}")
+            continue
+        python_ms = best_time(python_function, args.repeat) * 1000
+        print(f"{name:<32}{python_ms:>14.3f}{numpy_ms:>14.3f}{python_ms / numpy_ms:>13.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Series sintéticas para las pruebas de paridad de los motores vectorizados
+(test_electric_engine, test_weather_engine, test_inverter_engine).
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytz
+
+COLOMBIA_TZ = pytz.timezone('America/Bogota')
+START = COLOMBIA_TZ.localize(datetime(2025, 3, 10))
+
+
+def build_rows(count, sample, seed=7, nulls=None, start=START):
+    """
+    Mediciones sintéticas cada 2 minutos (hora Colombia) como tuplas (fecha, data).
+
+    Args:
+        count: Número de muestras
+        sample: Función (rng, index) -> dict con las variables de una muestra
+        seed: Semilla del generador aleatorio
+        nulls: Diccionario {periodo: [claves]}; las claves quedan en null
+            (SCADA envía null cuando una variable no está disponible) en las
+            muestras cuyo índice es múltiplo del periodo
+        start: Fecha de la primera muestra
+    """
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        data = sample(rng, index)
+        for period, keys in (nulls or {}).items():
+            if index % period == 0:
+                for key in keys:
+                    data[key] = None
+        rows.append((start + timedelta(minutes=2 * index), data))
+    return rows
+
+
+class MeasurementList(list):
+    """Lista con los métodos de queryset que usan las funciones originales."""
+
+    def count(self):
+        return len(self)
+
+    def exists(self):
+        return bool(self)
+
+    def last(self):
+        return self[-1] if self else None
+
+
+def as_measurements(rows):
+    """Objetos con .date y .data como los Measurement que reciben las funciones originales."""
+    return MeasurementList(SimpleNamespace(date=date, data=data) for date, data in rows)
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from indicators.electric_engine import ELECTRIC_METER_KEYS, compute_electric_meter_indicators
+from indicators.tasks import _electric_meter_indicators_python
+from scada_proxy.blocks import _series_from_rows
+from synthetic_series import build_rows
+
+METER_NULLS = {
+    37: ['totalActivePower', 'voltagePhaseB', 'currentTHDPhaseC'],
+    53: ['totalPowerFactor', 'currentPhaseA'],
+}
+
+
+def meter_sampler():
+    """Muestras con todas las claves del medidor; los contadores de energía crecen."""
+    counters = {'imported_low': 1500.0, 'imported_high': 12.0, 'exported_low': 300.0, 'exported_high': 1.0}
+
+    def sample(rng, index):
+        counters['imported_low'] += rng.uniform(0, 5)
+        counters['exported_low'] += rng.uniform(0, 1)
+        if counters['imported_low'] >= 2000:
+            counters['imported_low'] -= 1000
+            counters['imported_high'] += 1
+        data = {
+            'importedActivePowerLow': counters['imported_low'],
+            'importedActivePowerHigh': counters['imported_high'],
+            'exportedActivePowerLow': counters['exported_low'],
+            'exportedActivePowerHigh': counters['exported_high'],
+            'totalActivePower': rng.uniform(10, 120),
+            'totalPowerFactor': rng.uniform(0.8, 1.0),
+        }
+        for phase in 'ABC':
+            data[f'voltagePhase{phase}'] = rng.uniform(115, 125)
+            data[f'currentPhase{phase}'] = rng.uniform(0, 50)
+            data[f'voltageTHDPhase{phase}'] = rng.uniform(0, 5)
+            data[f'currentTHDPhase{phase}'] = rng.uniform(0, 15)
+            data[f'currentTDDPhase{phase}'] = rng.uniform(0, 10)
+        return data
+
+    return sample
+
+
+def build_meter_rows(count, seed=7, with_nulls=True):
+    return build_rows(count, meter_sampler(), seed, nulls=METER_NULLS if with_nulls else None)
+
+
+def nominal_peak_demand(rows, window_size=7):
+    """
+    Demanda pico esperada del motor: promedio de los valores no nulos de cada
+    ventana de 7 muestras nominales (15 minutos) que empieza en una muestra
+    con potencia. La implementación original, en cambio, promedia 7 valores
+    no nulos consecutivos aunque un null los separe en el tiempo.
+    """
+    power = [data.get('totalActivePower') for _, data in rows]
+    means = []
+    for start in range(len(power) - window_size + 1):
+        if power[start] is None:
+            continue
+        window = [value for value in power[start:start + window_size] if value is not None]
+        means.append(sum(window) / len(window))
+    if means:
+        return max(means)
+    valid = [value for value in power if value is not None]
+    return max(valid) if valid else 0
+
+
+class ElectricEngineParityTestCase(SimpleTestCase):
+    """El motor vectorizado debe dar los mismos indicadores que la implementación original."""
+
+    def assert_parity(self, rows, time_range='daily'):
+        expected = _electric_meter_indicators_python(rows, time_range)
+        # Cambio intencionado: la demanda pico (y con ella el factor de carga)
+        # usa ventanas de 15 minutos; sin nulls coincide con la original
+        expected['peak_demand_kw'] = nominal_peak_demand(rows)
+        hours_in_period = 24 if time_range == 'daily' else 24 * 30
+        expected['load_factor_pct'] = (
+            expected['net_energy_consumption_kwh'] / (expected['peak_demand_kw'] * hours_in_period) * 100
+        )
+        series = _series_from_rows(rows, set(ELECTRIC_METER_KEYS))
+        actual = compute_electric_meter_indicators(series, time_range)
+
+        self.assertEqual(set(actual), set(expected))
+        self.assertEqual(actual['measurement_count'], expected['measurement_count'])
+        self.assertEqual(actual['last_measurement_date'], expected['last_measurement_date'])
+        for field, value in expected.items():
+            if field in ('measurement_count', 'last_measurement_date'):
+                continue
+            self.assertAlmostEqual(actual[field], value, places=6, msg=field)
+
+    def test_daily_parity(self):
+        self.assert_parity(build_meter_rows(720))
+
+    def test_monthly_parity(self):
+        self.assert_parity(build_meter_rows(720 * 30, seed=11), time_range='monthly')
+
+    def test_without_nulls(self):
+        self.assert_parity(build_meter_rows(300, seed=3, with_nulls=False))
+
+    def test_fewer_samples_than_demand_window(self):
+        self.assert_parity(build_meter_rows(5, seed=5, with_nulls=False))
+
+    def test_peak_demand_uses_15_minute_window(self):
+        rows = build_meter_rows(20, seed=1, with_nulls=False)
+        for index, (_, data) in enumerate(rows):
+            data['totalActivePower'] = 100.0 if 5 <= index < 12 else 10.0
+        series = _series_from_rows(rows, set(ELECTRIC_METER_KEYS))
+        self.assertAlmostEqual(compute_electric_meter_indicators(series)['peak_demand_kw'], 100.0)
+
+    def test_nominal_peak_demand_matches_original_without_nulls(self):
+        rows = build_meter_rows(300, seed=4, with_nulls=False)
+        self.assertAlmostEqual(
+            nominal_peak_demand(rows), _electric_meter_indicators_python(rows)['peak_demand_kw'], places=9
+        )
+
+    def test_peak_demand_with_null_power(self):
+        rows = build_meter_rows(20, seed=6, with_nulls=False)
+        for index, (_, data) in enumerate(rows):
+            data['totalActivePower'] = 100.0 if 5 <= index < 12 else 10.0
+        # Un null dentro del bloque alto: la ventana de 15 minutos que empieza
+        # en él conserva sus 6 muestras a 100; la original junta 7 valores no
+        # nulos y mete uno de 10 kW de fuera del bloque
+        rows[8][1]['totalActivePower'] = None
+        series = _series_from_rows(rows, set(ELECTRIC_METER_KEYS))
+        self.assertAlmostEqual(compute_electric_meter_indicators(series)['peak_demand_kw'], 100.0)
+        self.assertAlmostEqual(_electric_meter_indicators_python(rows)['peak_demand_kw'], (6 * 100.0 + 10.0) / 7)
+
+    def test_peak_demand_window_does_not_span_gaps(self):
+        rows = build_meter_rows(30, seed=2, with_nulls=False)
+        # Hueco de dos horas: las 4 muestras altas antes y las 3 después no
+        # forman una ventana de 15 minutos, ni las de antes del hueco una
+        # ventana incompleta
+        rows = rows[:15] + [(dt + timedelta(hours=2), data) for dt, data in rows[15:]]
+        for index, (_, data) in enumerate(rows):
+            data['totalActivePower'] = 100.0 if 11 <= index < 18 else 10.0
+        series = _series_from_rows(rows, set(ELECTRIC_METER_KEYS))
+        self.assertLess(compute_electric_meter_indicators(series)['peak_demand_kw'], 100.0)
+        self.assertEqual(_electric_meter_indicators_python(rows)['peak_demand_kw'], 100.0)
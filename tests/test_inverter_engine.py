@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from indicators.inverter_engine import INVERTER_KEYS, compute_inverter_indicators
+from indicators.tasks import _inverter_indicators_python
+from scada_proxy.blocks import _series_from_rows
+from synthetic_series import START, as_measurements, build_rows
+
+INVERTER_NULLS = {
+    37: ['acPower', 'acVoltagePhaseB', 'irradiance'],
+    53: ['powerFactor', 'acCurrentPhaseA', 'acFrequency'],
+}
+
+# Campos que el motor calcula igual que la implementación original; las
+# energías (y con ellas eficiencia y PR) se integran con el trapecio
+PARITY_FIELDS = [
+    'avg_irradiance_wm2', 'avg_temperature_c', 'max_power_w', 'min_power_w',
+    'avg_power_factor_pct', 'avg_reactive_power_var', 'avg_apparent_power_va',
+    'avg_frequency_hz', 'frequency_stability_pct',
+    'max_voltage_unbalance_pct', 'max_current_unbalance_pct',
+]
+
+
+def inverter_sample(rng, index):
+    """Muestra de inversor con eficiencia DC-AC entre 93 y 98 %."""
+    ac_power = rng.uniform(0, 5000)
+    data = {
+        'acPower': ac_power,
+        'dcPower': ac_power / rng.uniform(0.93, 0.98),
+        'reactivePower': rng.uniform(-200, 200),
+        'apparentPower': ac_power * rng.uniform(1.0, 1.1),
+        'powerFactor': rng.uniform(90, 100),
+        'acFrequency': rng.uniform(59.9, 60.1),
+        'irradiance': max(0.0, rng.uniform(-50, 1100)),
+        'temperature': rng.uniform(15, 45),
+    }
+    for phase in 'ABC':
+        data[f'acVoltagePhase{phase}'] = rng.uniform(115, 125)
+        data[f'acCurrentPhase{phase}'] = rng.uniform(0, 50)
+    return data
+
+
+def build_inverter_rows(count, seed=7, with_nulls=True, start=START):
+    return build_rows(count, inverter_sample, seed, nulls=INVERTER_NULLS if with_nulls else None, start=start)
+
+
+def constant_power_rows(count, ac_power=1000.0, start=START):
+    rows = build_inverter_rows(count, with_nulls=False, start=start)
+    for _, data in rows:
+        data['acPower'] = ac_power
+        data['dcPower'] = ac_power / 0.95
+    return rows
+
+
+class InverterEngineParityTestCase(SimpleTestCase):
+    """El motor vectorizado debe dar los mismos indicadores que la implementación original."""
+
+    def assert_parity(self, rows):
+        indicators, _ = compute_inverter_indicators(_series_from_rows(rows, set(INVERTER_KEYS)))
+        expected = _inverter_indicators_python(as_measurements(rows))
+
+        self.assertEqual(set(indicators), set(expected))
+        for field in PARITY_FIELDS:
+            self.assertAlmostEqual(indicators[field], expected[field], places=6, msg=field)
+        self.assertEqual(indicators['anomaly_score'], expected['anomaly_score'])
+        self.assertEqual(indicators['anomaly_details'], expected['anomaly_details'])
+        self.assertEqual(indicators['measurement_count'], expected['measurement_count'])
+        self.assertEqual(indicators['last_measurement_date'], expected['last_measurement_date'])
+
+    def test_daily_parity(self):
+        self.assert_parity(build_inverter_rows(720))
+
+    def test_monthly_parity(self):
+        self.assert_parity(build_inverter_rows(720 * 30, seed=11))
+
+    def test_without_nulls(self):
+        self.assert_parity(build_inverter_rows(300, seed=3, with_nulls=False))
+
+    def test_two_measurements(self):
+        # Mínimo para la desviación estándar de la frecuencia
+        self.assert_parity(build_inverter_rows(2, seed=5, with_nulls=False))
+
+    def test_energy_at_nominal_cadence(self):
+        # 31 muestras a 1 kW: 30 intervalos de 2 minutos (la original suma 31)
+        rows = constant_power_rows(31)
+        indicators, _ = compute_inverter_indicators(_series_from_rows(rows, set(INVERTER_KEYS)))
+        self.assertAlmostEqual(indicators['energy_ac_daily_kwh'], 30 * 2 / 60)
+        self.assertAlmostEqual(indicators['energy_dc_daily_kwh'], 30 * 2 / 60 / 0.95)
+        self.assertAlmostEqual(indicators['dc_ac_efficiency_pct'], 95.0)
+        self.assertAlmostEqual(
+            _inverter_indicators_python(as_measurements(rows))['energy_ac_daily_kwh'], 31 * 2 / 60
+        )
+
+    def test_energy_across_gap(self):
+        # Un hueco de dos horas no se integra: quedan 14 + 14 intervalos
+        rows = constant_power_rows(30)
+        rows = rows[:15] + [(date + timedelta(hours=2), data) for date, data in rows[15:]]
+        indicators, _ = compute_inverter_indicators(_series_from_rows(rows, set(INVERTER_KEYS)))
+        self.assertAlmostEqual(indicators['energy_ac_daily_kwh'], 28 * 2 / 60)
+        self.assertAlmostEqual(indicators['total_generated_energy_kwh'], 28 * 2 / 60)
+
+    def test_local_hour_bins(self):
+        # 08:10 a 08:18 hora Colombia (13:10 UTC): todo cae en la hora 8
+        rows = constant_power_rows(5, start=START + timedelta(hours=8, minutes=10))
+        _, chart_data = compute_inverter_indicators(_series_from_rows(rows, set(INVERTER_KEYS)))
+        for hour in range(24):
+            expected_power = 1000.0 if hour == 8 else 0.0
+            self.assertAlmostEqual(chart_data['hourly_ac_power'][hour], expected_power, msg=hour)
+        # Energía de la hora: 4 intervalos de 2 minutos a 1 kW
+        self.assertAlmostEqual(chart_data['hourly_generation'][8], 4 * 2 / 60)
+        self.assertAlmostEqual(sum(chart_data['hourly_generation']), 4 * 2 / 60)
@@ -0,0 +1,44 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from indicators import kernels
+
+WINDOW_SECONDS = 15 * 60
+
+
+def stamps(*minutes):
+    return np.array(minutes, dtype=np.int64) * 60
+
+
+class RollingMeanTestCase(SimpleTestCase):
+    """Ventanas de tiempo de kernels.rolling_mean."""
+
+    def test_nominal_cadence_uses_seven_samples(self):
+        timestamps = stamps(*range(0, 30, 2))
+        values = np.arange(len(timestamps), dtype=np.float64)
+        means = kernels.rolling_mean(timestamps, values, WINDOW_SECONDS)
+        expected = [values[i:i + 7].mean() for i in range(len(values) - 6)]
+        np.testing.assert_allclose(means, expected)
+
+    def test_one_missing_sample_is_tolerated(self):
+        # Falta la muestra del minuto 6: la ventana que empieza en 0 tiene 6
+        timestamps = stamps(0, 2, 4, 8, 10, 12, 14, 16)
+        values = np.array([10.0, 10.0, 10.0, 10.0, 10.0, 10.0, 40.0, 40.0])
+        means = kernels.rolling_mean(timestamps, values, WINDOW_SECONDS)
+        self.assertAlmostEqual(means[0], 10.0)
+
+    def test_window_with_interior_gap_is_dropped(self):
+        # Hueco de 10 minutos dentro de la ventana que empieza en 0: solo
+        # 0, 2 y 12 caen en ella y no debe promediarse
+        timestamps = stamps(0, 2, 12, 14, 16, 18, 20, 22, 24)
+        values = np.array([100.0, 100.0, 10.0, 10.0, 10.0, 10.0, 10.0, 10.0, 10.0])
+        means = kernels.rolling_mean(timestamps, values, WINDOW_SECONDS)
+        np.testing.assert_allclose(means, [10.0])
+        self.assertAlmostEqual(kernels.peak_rolling_mean(timestamps, values, WINDOW_SECONDS), 10.0)
+
+    def test_nan_samples_count_as_missing(self):
+        timestamps = stamps(*range(0, 16, 2))
+        values = np.array([20.0, np.nan, np.nan, np.nan, 20.0, 20.0, 20.0, 20.0])
+        self.assertEqual(len(kernels.rolling_mean(timestamps, values, WINDOW_SECONDS)), 0)
+        # Sin ventanas completas, peak_rolling_mean devuelve el máximo simple
+        self.assertAlmostEqual(kernels.peak_rolling_mean(timestamps, values, WINDOW_SECONDS), 20.0)
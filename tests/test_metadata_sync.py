@@ -0,0 +1,51 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from scada_proxy import sync
+
+INSTITUTIONS = [{'id': 1, 'name': 'Universidad de Nariño'}]
+CATEGORIES = [{'id': 2, 'name': 'inverter', 'description': ''}]
+DEVICES = [
+    {'id': 10, 'name': 'Inversor 1', 'status': 'online', 'category': {'id': 2}, 'institution': {'id': 1}},
+    {'id': 11, 'name': 'Inversor 2', 'status': 'offline', 'category_id': 2, 'institution_id': 1},
+]
+
+
+def device_pages():
+    """Dispositivos como los genera client.iter_devices (página a página)."""
+    yield from DEVICES
+
+
+class SyncMetadataSkipTestCase(SimpleTestCase):
+    """Un payload idéntico al último sincronizado no abre transacción ni escribe."""
+
+    def test_unchanged_payload_skips_before_writing(self):
+        cache = MagicMock()
+        cache.get.return_value = sync.payload_hash(INSTITUTIONS, CATEGORIES, DEVICES)
+        with patch.object(sync, '_get_sync_cache', return_value=cache), \
+                patch.object(sync.transaction, 'atomic') as atomic, \
+                patch.object(sync, '_sync_simple') as sync_simple:
+            summary = sync.sync_metadata(INSTITUTIONS, CATEGORIES, device_pages())
+
+        self.assertEqual(summary, {'skipped': True})
+        atomic.assert_not_called()
+        sync_simple.assert_not_called()
+        cache.set.assert_not_called()
+
+    def test_force_ignores_hash(self):
+        cache = MagicMock()
+        cache.get.return_value = sync.payload_hash(INSTITUTIONS, CATEGORIES, DEVICES)
+        with patch.object(sync, '_get_sync_cache', return_value=cache), \
+                patch.object(sync.transaction, 'atomic'), \
+                patch.object(sync.transaction, 'on_commit'), \
+                patch.object(sync, '_sync_simple', return_value=({}, 0, 0)), \
+                patch.object(sync, '_sync_devices') as sync_devices:
+            sync_devices.return_value = {'created': 0, 'updated': 0, 'deactivated': 0, 'complete': 2, 'incomplete': 0}
+            summary = sync.sync_metadata(INSTITUTIONS, CATEGORIES, device_pages(), force=True)
+
+        self.assertFalse(summary['skipped'])
+        devices = sync_devices.call_args[0][0]
+        # Relaciones reducidas a su scada_id, anidadas o planas
+        self.assertEqual([device['category_id'] for device in devices], ['2', '2'])
+        self.assertEqual([device['institution_id'] for device in devices], ['1', '1'])
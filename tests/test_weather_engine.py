@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from indicators.tasks import (
+    calculate_single_day_weather_chart_data,
+    calculate_single_day_weather_indicators,
+    calculate_single_month_weather_indicators,
+    calculate_wind_direction_distribution,
+    calculate_wind_speed_distribution,
+)
+from indicators.weather_engine import (
+    WEATHER_KEYS,
+    compute_monthly_weather_indicators,
+    compute_weather_indicators,
+    wind_direction_distribution,
+    wind_speed_distribution,
+)
+from scada_proxy.blocks import _series_from_rows
+from synthetic_series import START, as_measurements, build_rows
+
+WEATHER_NULLS = {
+    37: ['windDirection', 'humidity'],
+    53: ['precipitation', 'temperature'],
+}
+
+
+def weather_sampler():
+    """Muestras de estación meteorológica; la precipitación es un acumulador diario."""
+    accumulated = {'precipitation': 0.0}
+
+    def sample(rng, index):
+        if index % 720 == 0:
+            accumulated['precipitation'] = 0.0  # El acumulador se reinicia cada día
+        accumulated['precipitation'] += rng.choice([0.0, 0.0, 0.0, rng.uniform(0, 0.05)])
+        return {
+            'irradiance': max(0.0, rng.uniform(-50, 1100)),
+            'temperature': rng.uniform(12, 30),
+            'humidity': rng.uniform(40, 100),
+            'windSpeed': rng.uniform(0, 40),
+            # Incluye los bordes de los sectores y 360°
+            'windDirection': rng.choice([0.0, 22.5, 337.5, 360.0, rng.uniform(0, 360)]),
+            'precipitation': accumulated['precipitation'],
+        }
+
+    return sample
+
+
+def build_weather_rows(count, seed=7, with_nulls=True):
+    return build_rows(count, weather_sampler(), seed, nulls=WEATHER_NULLS if with_nulls else None)
+
+
+def trapezoid_irradiance_kwh_m2(rows, max_gap_seconds=10 * 60):
+    """
+    Irradiancia acumulada esperada del motor: trapecio entre lecturas
+    consecutivas, sin los intervalos con un null ni los huecos largos.
+    La implementación original suma las lecturas × 2 minutos.
+    """
+    total = 0.0
+    for (previous_date, previous), (date, current) in zip(rows, rows[1:]):
+        a, b = previous.get('irradiance'), current.get('irradiance')
+        seconds = (date - previous_date).total_seconds()
+        if a is None or b is None or seconds > max_gap_seconds:
+            continue
+        total += (a + b) / 2 * seconds / 3600
+    return total / 1000
+
+
+class WeatherEngineParityTestCase(SimpleTestCase):
+    """El motor vectorizado debe dar los mismos datos que la implementación original."""
+
+    def assert_same(self, actual, expected):
+        self.assertEqual(set(actual), set(expected))
+        for field, value in expected.items():
+            if isinstance(value, list):
+                self.assertEqual(len(actual[field]), len(value), msg=field)
+                for actual_item, expected_item in zip(actual[field], value):
+                    self.assertAlmostEqual(actual_item, expected_item, places=6, msg=field)
+            elif isinstance(value, float):
+                self.assertAlmostEqual(actual[field], value, places=6, msg=field)
+            else:
+                self.assertEqual(actual[field], value, msg=field)
+
+    def assert_daily_parity(self, rows):
+        measurements = as_measurements(rows)
+        indicators, chart_data = compute_weather_indicators(_series_from_rows(rows, set(WEATHER_KEYS)))
+
+        expected_indicators = calculate_single_day_weather_indicators(measurements)
+        expected_chart = calculate_single_day_weather_chart_data(measurements)
+        # Cambio intencionado: la irradiancia se integra con el trapecio
+        irradiance = trapezoid_irradiance_kwh_m2(rows)
+        if 'daily_irradiance_kwh_m2' in expected_indicators:
+            expected_indicators['daily_irradiance_kwh_m2'] = irradiance
+            expected_indicators['daily_hsp_hours'] = irradiance
+        expected_chart['daily_irradiance_kwh_m2'] = irradiance
+
+        self.assert_same(indicators, expected_indicators)
+        self.assert_same(chart_data, expected_chart)
+
+    def test_daily_parity(self):
+        self.assert_daily_parity(build_weather_rows(720))
+
+    def test_without_nulls(self):
+        self.assert_daily_parity(build_weather_rows(300, seed=3, with_nulls=False))
+
+    def test_partial_day(self):
+        # Solo algunas horas: las demás quedan en 0 en el gráfico
+        self.assert_daily_parity(build_weather_rows(45, seed=5))
+
+    def test_missing_variables(self):
+        rows = build_weather_rows(200, seed=9)
+        for _, data in rows:
+            del data['windDirection']
+            data['precipitation'] = None
+        self.assert_daily_parity(rows)
+
+    def test_monthly_parity(self):
+        rows = build_weather_rows(720 * 30, seed=11)
+        actual = compute_monthly_weather_indicators(_series_from_rows(rows, set(WEATHER_KEYS)))
+
+        expected = calculate_single_month_weather_indicators(as_measurements(rows))
+        days = {}
+        for date, data in rows:
+            days.setdefault(date.date(), []).append((date, data))
+        daily_irradiance = [trapezoid_irradiance_kwh_m2(day_rows) for day_rows in days.values()]
+        expected['daily_irradiance_kwh_m2'] = sum(daily_irradiance) / len(daily_irradiance)
+        expected['daily_hsp_hours'] = expected['daily_irradiance_kwh_m2']
+        self.assert_same(actual, expected)
+
+    def test_irradiance_integration(self):
+        rows = build_weather_rows(60, seed=13, with_nulls=False)
+        for _, data in rows:
+            data['irradiance'] = 1000.0
+        series = _series_from_rows(rows, set(WEATHER_KEYS))
+        # Cadencia nominal: 59 intervalos de 2 minutos a 1 kW/m²
+        indicators, chart_data = compute_weather_indicators(series)
+        self.assertAlmostEqual(indicators['daily_irradiance_kwh_m2'], 59 * 2 / 60)
+        self.assertAlmostEqual(chart_data['daily_irradiance_kwh_m2'], 59 * 2 / 60)
+        self.assertAlmostEqual(
+            calculate_single_day_weather_indicators(as_measurements(rows))['daily_irradiance_kwh_m2'], 60 * 2 / 60
+        )
+
+        # Un hueco de dos horas no se integra
+        rows = rows[:30] + [(date + timedelta(hours=2), data) for date, data in rows[30:]]
+        indicators, _ = compute_weather_indicators(_series_from_rows(rows, set(WEATHER_KEYS)))
+        self.assertAlmostEqual(indicators['daily_irradiance_kwh_m2'], 58 * 2 / 60)
+
+    def test_wind_distributions(self):
+        directions = [0.0, 10.0, 22.5, 67.4, 67.5, 180.0, 337.4, 337.5, 359.9, 360.0, -1.0, 361.0]
+        speeds = [0.0, 4.99, 5.0, 9.9, 10.0, 19.9, 20.0, 29.9, 30.0, 80.0, -1.0]
+        series = _series_from_rows([
+            (START + timedelta(minutes=2 * index), {'windDirection': value})
+            for index, value in enumerate(directions)
+        ])
+        self.assertEqual(
+            wind_direction_distribution(series.get('windDirection')),
+            calculate_wind_direction_distribution(directions),
+        )
+        series = _series_from_rows([
+            (START + timedelta(minutes=2 * index), {'windSpeed': value})
+            for index, value in enumerate(speeds)
+        ])
+        self.assertEqual(
+            wind_speed_distribution(series.get('windSpeed')),
+            calculate_wind_speed_distribution(speeds),
+        )